@@ -0,0 +1,319 @@
+"""
+Columnar analytics snapshot behind the margin, ABC and dead-stock reports.
+
+export() copies products and any sales added since its last run out of the live database
+into Parquet files under one directory:
+
+    state.json                            what has been exported, and when
+    products.parquet                      every store's products, rewritten on each run
+    sales/*.parquet                       sale lines joined with their transaction's store,
+                                          time and payment, in part files listed in state.json
+
+Sales are append-only, so a run reads only transactions above the last exported id (a
+primary-key range scan). Ids are handed out before commit, so a sale can become visible
+after a higher id was exported; the ids a run finds missing are kept in state.json as gaps
+and re-read on every run for GAP_RETRY, after which a gap is taken to be a rollback. Each
+run adds a small part file, so once COMPACT_PARTS of them pile up they are merged into one.
+The API runs export() every ANALYTICS_SNAPSHOT_INTERVAL seconds; export_analytics.py runs
+it from cron, and --full rebuilds from scratch after sales history was deleted.
+
+The reports read only these files, with vectorized pandas/numpy, so a year-long ABC run
+never touches the tables checkout writes to. Figures are as of the snapshot, and margins
+use the snapshot's cost prices (cost at the time of sale isn't recorded). pandas, numpy
+and pyarrow are imported on first use, not with this module.
+"""
+import asyncio
+import contextlib
+import datetime
+import functools
+import json
+import logging
+import os
+import time
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analytics")
+GAP_RETRY = datetime.timedelta(hours=1)   # how long missing ids are re-read before they count as rolled back
+PART_TRANSACTIONS = 250_000               # transaction ids per sales part file
+COMPACT_ROWS = 200_000                    # part files with fewer sale lines than this are "small"...
+COMPACT_PARTS = 8                         # ...and merged into one once there are this many
+LOCK_STALE = 3600.0                        # seconds after which a crashed export's lock is ignored
+ABC_SHARES = (0.80, 0.95)                  # cumulative revenue share closing classes A and B
+UNCATEGORISED = "Uncategorised"
+
+SALES_SQL = text("""
+    SELECT ti.transaction_id, t.store_id, t.timestamp, t.payment_method, ti.product_sku AS sku, ti.quantity, ti.price_at_sale
+    FROM transactions t JOIN transaction_items ti ON ti.transaction_id = t.id
+    WHERE t.id > :after AND t.id <= :upto
+""")
+PRODUCTS_SQL = text("SELECT store_id, sku, name, category, cost_price, selling_price, stock_quantity FROM products")
+
+log = logging.getLogger("nexus.analytics")
+
+
+# --- export ---
+def read_state(directory: str) -> dict:
+    """The snapshot's state.json, or {} before the first export."""
+    try:
+        with open(os.path.join(directory, "state.json")) as f: return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _replace(path: str, write):
+    tmp = path + ".tmp"
+    write(tmp)
+    os.replace(tmp, path)  # readers only ever see whole files
+
+
+def _write_json(path: str, data: dict):
+    with open(path, "w") as f: json.dump(data, f, indent=1)
+
+
+@contextlib.contextmanager
+def export_lock(directory: str):
+    """Yields True for the one export allowed to run (several API workers share a directory), else False."""
+    path = os.path.join(directory, "export.lock")
+    with contextlib.suppress(OSError):
+        if time.time() - os.path.getmtime(path) > LOCK_STALE: os.remove(path)
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        yield False
+        return
+    try: yield True
+    finally: os.remove(path)
+
+
+def _holes(ids, after: int, upto: int, seen: str) -> list:
+    """Runs of ids in (after, upto] without a sale line in `ids`, as [first, last, seen]."""
+    import numpy as np
+    missing = np.setdiff1d(np.arange(after + 1, upto + 1), ids.to_numpy())
+    if not len(missing): return []
+    breaks = np.flatnonzero(np.diff(missing) > 1)
+    firsts, lasts = np.append(missing[0], missing[breaks + 1]), np.append(missing[breaks], missing[-1])
+    return [[int(first), int(last), seen] for first, last in zip(firsts, lasts)]
+
+
+def _read_gaps(conn, gaps: list, now: datetime.datetime):
+    """(sale lines that have appeared in earlier runs' gaps or None, the gaps still empty and younger than GAP_RETRY)."""
+    import pandas as pd
+    found, still = [], []
+    for first, last, seen in gaps:
+        if now - datetime.datetime.fromisoformat(seen) > GAP_RETRY: continue
+        sales = pd.read_sql(SALES_SQL, conn, params={"after": first - 1, "upto": last}, parse_dates=["timestamp"])
+        if not sales.empty: found.append(sales)
+        still += _holes(sales["transaction_id"], first - 1, last, seen)
+    return (pd.concat(found, ignore_index=True) if found else None), still
+
+
+def _compact(sales_dir: str, parts: list, version: int):
+    """(parts, retired): the small part files merged into one once there are COMPACT_PARTS of them."""
+    import pandas as pd
+    import pyarrow.parquet as pq
+    small = [p for p in parts if pq.read_metadata(os.path.join(sales_dir, p)).num_rows < COMPACT_ROWS]
+    if len(small) < COMPACT_PARTS: return parts, []
+    merged = pd.concat([pd.read_parquet(os.path.join(sales_dir, p)) for p in small], ignore_index=True)
+    merged = merged.sort_values("transaction_id", kind="stable")
+    name = f"merged-{merged['transaction_id'].iloc[0]:012d}-{merged['transaction_id'].iloc[-1]:012d}-v{version}.parquet"
+    _replace(os.path.join(sales_dir, name), lambda tmp: merged.to_parquet(tmp, index=False))
+    return [p for p in parts if p not in small] + [name], small
+
+
+def export(engine, directory: str = DEFAULT_DIR, full: bool = False):
+    """Bring the snapshot up to date; returns the new state, or None if another export is running."""
+    import pandas as pd
+    sales_dir = os.path.join(directory, "sales")
+    os.makedirs(sales_dir, exist_ok=True)
+    with export_lock(directory) as locked:
+        if not locked: return None
+        start = time.perf_counter()
+        previous = read_state(directory)
+        # Files the previous run merged away; readers of the state before it have had an interval to finish
+        for name in previous.get("retired", []):
+            with contextlib.suppress(FileNotFoundError): os.remove(os.path.join(sales_dir, name))
+        state = {} if full else previous
+        version = previous.get("version", 0) + 1
+        after, parts, rows, gaps = state.get("last_transaction_id", 0), list(state.get("parts", [])), state.get("sales_rows", 0), state.get("gaps", [])
+        now = datetime.datetime.utcnow()
+        with engine.connect() as conn:
+            upto = conn.execute(text("SELECT MAX(id) FROM transactions")).scalar() or 0
+            late, gaps = _read_gaps(conn, gaps, now)
+            if late is not None:  # sales that committed after a higher id had been exported
+                name = f"late-{late['transaction_id'].min():012d}-{late['transaction_id'].max():012d}-v{version}.parquet"
+                _replace(os.path.join(sales_dir, name), lambda tmp: late.to_parquet(tmp, index=False))
+                parts.append(name)
+                rows += len(late)
+            for lo in range(after, upto, PART_TRANSACTIONS):
+                hi = min(lo + PART_TRANSACTIONS, upto)
+                sales = pd.read_sql(SALES_SQL, conn, params={"after": lo, "upto": hi}, parse_dates=["timestamp"])
+                gaps += _holes(sales["transaction_id"], lo, hi, now.isoformat())
+                if sales.empty: continue
+                name = f"part-{lo + 1:012d}-{hi:012d}.parquet"
+                _replace(os.path.join(sales_dir, name), lambda tmp: sales.to_parquet(tmp, index=False))
+                parts.append(name)
+                rows += len(sales)
+            products = pd.read_sql(PRODUCTS_SQL, conn)
+        parts, retired = _compact(sales_dir, parts, version)
+        if full: retired = sorted(set(os.listdir(sales_dir)) - set(parts))
+        _replace(os.path.join(directory, "products.parquet"), lambda tmp: products.to_parquet(tmp, index=False))
+        state = {"version": version, "exported_at": now.isoformat(), "last_transaction_id": max(after, upto),
+                 "parts": parts, "sales_rows": rows, "gaps": gaps, "retired": retired, "products": len(products),
+                 "seconds": round(time.perf_counter() - start, 3)}
+        _replace(os.path.join(directory, "state.json"), functools.partial(_write_json, data=state))
+        return state
+
+
+async def schedule(engine, directory: str, interval: float):
+    """Background task for the app's lifespan: export now, then every `interval` seconds."""
+    while True:
+        try:
+            state = await run_in_threadpool(export, engine, directory)
+            if state: log.info("analytics snapshot v%s: %s sale lines through transaction %s in %ss", state["version"],
+                               state["sales_rows"], state["last_transaction_id"], state["seconds"])
+        except Exception:
+            log.exception("analytics snapshot export failed")
+        await asyncio.sleep(interval)
+
+
+# --- reading ---
+def _sales(directory: str, state: dict, store_id: int, columns: list, start=None):
+    """The store's sale lines (only `columns`), from `start` on; filters are pushed down to the Parquet row groups."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    files = [os.path.join(directory, "sales", p) for p in state["parts"]]
+    schema = pa.schema([("store_id", pa.int64()), ("timestamp", pa.timestamp("us")), ("sku", pa.string()),
+                        ("quantity", pa.int64()), ("price_at_sale", pa.float64())])
+    if not files: return schema.empty_table().select(columns).to_pandas()
+    condition = ds.field("store_id") == store_id
+    if start is not None: condition &= ds.field("timestamp") >= pa.scalar(start, pa.timestamp("us"))
+    # SKUs come back categorical: millions of lines share a few thousand codes, and grouping on codes is far cheaper
+    return ds.dataset(files, format="parquet").to_table(columns=columns, filter=condition).to_pandas(strings_to_categorical=True)
+
+
+def _products(directory: str, store_id: int):
+    import pyarrow.dataset as ds
+    products = ds.dataset(os.path.join(directory, "products.parquet"), format="parquet")
+    frame = products.to_table(filter=ds.field("store_id") == store_id).to_pandas()
+    frame["category"] = frame["category"].fillna(UNCATEGORISED)
+    frame["cost_price"] = frame["cost_price"].fillna(0.0)
+    frame["stock_quantity"] = frame["stock_quantity"].fillna(0).astype("int64")
+    return frame.set_index("sku")
+
+
+def _window(state: dict, days: int):
+    """(start, end) of the last `days` days up to the snapshot."""
+    end = datetime.datetime.fromisoformat(state["exported_at"])
+    return end - datetime.timedelta(days=days), end
+
+
+def _records(frame) -> list:
+    """JSON-ready rows: floats rounded to cents, NaN/inf as null."""
+    import numpy as np
+    out = frame.copy()
+    for col in out.columns:
+        if out[col].dtype.kind == "f":
+            values = out[col].to_numpy()
+            out[col] = np.where(np.isfinite(values), np.round(values, 2), np.nan)
+    return out.astype(object).where(out.notna(), None).to_dict("records")
+
+
+def _sku_sales(directory: str, state: dict, store_id: int, start):
+    """Units and revenue per SKU sold since `start`, indexed by sku."""
+    sales = _sales(directory, state, store_id, ["sku", "quantity", "price_at_sale"], start)
+    sales["revenue"] = sales["quantity"].to_numpy(dtype=float) * sales["price_at_sale"].to_numpy(dtype=float)
+    per_sku = sales.groupby("sku", observed=True).agg(units=("quantity", "sum"), revenue=("revenue", "sum"))
+    per_sku.index = per_sku.index.astype(str)
+    return per_sku
+
+
+def margin(directory: str, state: dict, store_id: int, days: int) -> dict:
+    """Revenue, cost and gross margin by category."""
+    start, end = _window(state, days)
+    per_sku = _sku_sales(directory, state, store_id, start)
+    products = _products(directory, store_id)
+    # Cost is per SKU, so it is applied after the lines are summed per SKU
+    per_sku["cost"] = per_sku["units"] * products["cost_price"].reindex(per_sku.index).fillna(0.0)
+    per_sku["category"] = products["category"].reindex(per_sku.index).fillna(UNCATEGORISED)
+    by = per_sku.groupby("category").agg(units=("units", "sum"), revenue=("revenue", "sum"), cost=("cost", "sum"))
+    by["gross_margin"] = by["revenue"] - by["cost"]
+    by["margin_pct"] = 100 * by["gross_margin"] / by["revenue"].where(by["revenue"] != 0)
+    by = by.sort_values("gross_margin", ascending=False).reset_index()
+    revenue, cost = float(by["revenue"].sum()), float(by["cost"].sum())
+    total = {"units": int(by["units"].sum()), "revenue": round(revenue, 2), "cost": round(cost, 2), "gross_margin": round(revenue - cost, 2),
+             "margin_pct": round(100 * (revenue - cost) / revenue, 2) if revenue else None}
+    return {"start": start.isoformat(), "end": end.isoformat(), "total": total, "categories": _records(by)}
+
+
+def abc(directory: str, state: dict, store_id: int, days: int, limit: int) -> dict:
+    """
+    ABC classes by revenue: A is the best sellers making up the first 80% of revenue, B the
+    next 15%, C the rest, including every product that didn't sell at all.
+    """
+    import numpy as np
+    start, end = _window(state, days)
+    per_sku = _sku_sales(directory, state, store_id, start)
+    products = _products(directory, store_id)
+    per_sku = per_sku.reindex(per_sku.index.union(products.index), fill_value=0)
+    per_sku = per_sku.sort_values(["revenue", "units"], ascending=False, kind="stable")
+    total = float(per_sku["revenue"].sum())
+    share = per_sku["revenue"].to_numpy(dtype=float) / total if total else np.zeros(len(per_sku))
+    cumulative = np.cumsum(share)
+    # A SKU belongs to the class its revenue starts in, so the SKU that crosses 80% is still an A
+    starts = cumulative - share
+    per_sku["class"] = np.where(share <= 0, "C", np.where(starts < ABC_SHARES[0], "A", np.where(starts < ABC_SHARES[1], "B", "C")))
+    per_sku["share_pct"], per_sku["cumulative_pct"] = 100 * share, 100 * cumulative
+    per_sku["name"] = products["name"].reindex(per_sku.index)
+    classes = {}
+    for cls in ("A", "B", "C"):
+        members = per_sku[per_sku["class"] == cls]
+        classes[cls] = {"skus": int(len(members)), "units": int(members["units"].sum()), "revenue": round(float(members["revenue"].sum()), 2),
+                        "share_pct": round(100 * float(members["revenue"].sum()) / total, 2) if total else 0.0}
+    items = per_sku.head(limit).reset_index().rename(columns={"index": "sku"})
+    items["units"] = items["units"].astype("int64")
+    return {"start": start.isoformat(), "end": end.isoformat(), "revenue": round(total, 2), "classes": classes,
+            "items": _records(items[["sku", "name", "class", "units", "revenue", "share_pct", "cumulative_pct"]])}
+
+
+def dead_stock(directory: str, state: dict, store_id: int, days: int, min_cover_days: float, limit: int) -> dict:
+    """
+    Stocked products that didn't sell in the window (dead) or whose stock lasts at least
+    `min_cover_days` at the window's sales rate (slow), by tied-up stock value.
+    """
+    import numpy as np
+    start, end = _window(state, days)
+    products = _products(directory, store_id)
+    stocked = products[products["stock_quantity"] > 0]
+    history = _sales(directory, state, store_id, ["sku", "timestamp", "quantity"])
+    recent = history[history["timestamp"] >= start]
+    units = recent.groupby("sku", observed=True)["quantity"].sum().reindex(stocked.index, fill_value=0).to_numpy(dtype=float)
+    last_sold = history.groupby("sku", observed=True)["timestamp"].max().reindex(stocked.index)
+    stock = stocked["stock_quantity"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore"):
+        cover = np.where(units > 0, stock / (units / days), np.inf)
+    report = stocked[["name", "category", "stock_quantity"]].assign(
+        units_sold=units.astype("int64"), days_of_cover=cover, stock_value=stock * stocked["cost_price"].to_numpy(dtype=float),
+        last_sold=[ts.isoformat() if ts == ts else None for ts in last_sold], dead=units == 0)
+    report = report[report["dead"] | (report["days_of_cover"] >= min_cover_days)]
+    report = report.sort_values(["dead", "stock_value"], ascending=False, kind="stable")
+    dead, slow = report[report["dead"]], report[~report["dead"]]
+    return {"start": start.isoformat(), "end": end.isoformat(),
+            "dead": {"skus": int(len(dead)), "stock_value": round(float(dead["stock_value"].sum()), 2)},
+            "slow": {"skus": int(len(slow)), "stock_value": round(float(slow["stock_value"].sum()), 2)},
+            "items": _records(report.head(limit).reset_index())}
+
+
+REPORTS = {"margin": margin, "abc": abc, "dead_stock": dead_stock}
+
+
+@functools.lru_cache(maxsize=64)
+def _cached(directory: str, state_json: str, name: str, args: tuple):
+    return REPORTS[name](directory, json.loads(state_json), *args)
+
+
+def report(directory: str, state: dict, name: str, *args) -> dict:
+    """A report over the snapshot, computed once per snapshot state and arguments."""
+    snapshot = {"version": state["version"], "exported_at": state["exported_at"], "through_transaction": state["last_transaction_id"]}
+    return {"snapshot": snapshot, **_cached(directory, json.dumps(state, sort_keys=True), name, args)}
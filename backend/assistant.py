@@ -0,0 +1,236 @@
+"""
+Offline intent routing and answer formatting for /ai/chat.
+
+A question is matched against a few example phrasings per intent with TF-IDF cosine
+similarity over stemmed words and character trigrams, so "top sellers this wk" and
+"whats running low in filter boxes" land without any network call. The vectors are
+built once, on first use. Slots (date range, category, limit, stock threshold,
+breakdown, product) come from small regexes. A question that names a period asks about
+data, so it never routes to a navigation command ("what did we sell yesterday" is not
+"sell"). main.py answers from the sales rollups and the products table, and keeps the
+results in an AnswerCache that new sales and stock edits invalidate.
+"""
+import collections
+import datetime
+import math
+import re
+import threading
+import time
+
+MIN_SIMILARITY = 0.35
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 50
+LOW_STOCK_BELOW = 10     # same cut-off as the dashboard's Low Stock badge
+
+INTENTS = {
+    "top_sellers": ["top sellers", "best sellers this week", "best selling products", "what sold the most",
+                    "most popular items", "top 10 products by revenue", "fastest moving lines", "what is selling well"],
+    "low_stock": ["low stock", "what is running low", "items almost out of stock", "what needs reordering",
+                  "stock below 10", "items under 5 left", "what should I reorder", "out of stock products"],
+    "revenue": ["revenue yesterday", "how much did we make today", "total sales this month", "takings by payment method",
+                "turnover last week", "how many transactions today", "sales by category", "what did we sell",
+                "how much did we sell", "how many units did we sell"],
+    "stock_level": ["how much stock of", "how many do we have", "how many are left", "stock level of", "stock on hand",
+                    "is it in stock", "check stock for", "quantity in stock"],
+    "open_pos": ["sell", "open the till", "start a sale", "ring up a customer", "point of sale"],
+    "open_reports": ["show reports", "open the sales reports", "analytics dashboard"],
+    "add_product": ["add a product", "register a new product", "create an item"],
+}
+NAVIGATION = {
+    "open_pos": ("Opening POS...", "NAVIGATE_POS"),
+    "open_reports": ("Opening reports...", "NAVIGATE_REPORTS"),
+    "add_product": ("Opening the product form...", "NAVIGATE_ADD_PRODUCT"),
+}
+HELP = ('I can answer questions like "top sellers this week", "low stock in FILTER BOXES", '
+        '"how much stock of zodiac" or "revenue yesterday by payment method", and open the POS, reports or product form.')
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+SUFFIXES = ("ing", "ers", "er", "es", "ed", "s")
+STOPWORDS = frozenset("a an the is are was were what whats which how me my our we us to of in on for by at it i you show give tell please "
+                      "today yesterday this last past week month year days".split())  # dates (and numbers) are slots, not intent
+WORD_WEIGHT = 3  # whole-word matches outweigh the character trigrams, which only catch typos and inflections
+PERIOD_RE = re.compile(r"\b(?:today|yesterday|tonight|week|weekly|wk|month|monthly|year|days?)\b")
+
+
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3: return word[:-len(suffix)]
+    return word
+
+
+def features(text: str) -> collections.Counter:
+    words = [stem(w) for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS and not w.isdigit()]
+    grams = collections.Counter({f"w:{w}": 0 for w in words})
+    for w in words: grams[f"w:{w}"] += WORD_WEIGHT
+    for w in words:
+        padded = f" {w} "
+        grams.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return grams
+
+
+class IntentRouter:
+    """Nearest example phrasing by TF-IDF cosine similarity."""
+
+    def __init__(self, intents: dict):
+        docs = [(intent, features(example)) for intent, examples in intents.items() for example in examples]
+        df = collections.Counter(g for _, f in docs for g in f)
+        self.idf = {g: math.log((1 + len(docs)) / (1 + n)) + 1.0 for g, n in df.items()}
+        self.examples = [(intent, self._vector(f)) for intent, f in docs]
+
+    def _vector(self, grams: collections.Counter) -> dict:
+        vec = {g: n * self.idf[g] for g, n in grams.items() if g in self.idf}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {g: v / norm for g, v in vec.items()}
+
+    def route(self, text: str, exclude=()):
+        """(intent, similarity), or (None, best similarity) below MIN_SIMILARITY; `exclude` intents never win."""
+        q = self._vector(features(text))
+        best, score = None, 0.0
+        for intent, vec in self.examples:
+            if intent in exclude: continue
+            sim = sum(v * vec.get(g, 0.0) for g, v in q.items())
+            if sim > score: best, score = intent, sim
+        return (best if score >= MIN_SIMILARITY else None), round(score, 3)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def route(text: str):
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None: _router = IntentRouter(INTENTS)
+    return _router.route(text, exclude=NAVIGATION if PERIOD_RE.search(text.lower()) else ())
+
+
+# --- slots ---
+def date_range(text: str, now: datetime.datetime, default: str):
+    """(label, start, end) in whole UTC days; `end` is exclusive."""
+    text = text.lower()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    day = datetime.timedelta(days=1)
+    monday = today - datetime.timedelta(days=today.weekday())
+    month = today.replace(day=1)
+    last_month = (month - day).replace(day=1)
+    m = re.search(r"(?:last|past)\s+(\d+)\s+days?", text)
+    if m: return f"the last {int(m.group(1))} days", today - datetime.timedelta(days=int(m.group(1)) - 1), today + day
+    ranges = [
+        ("yesterday", ("yesterday", today - day, today)),
+        ("today", ("today", today, today + day)),
+        ("last week", ("last week", monday - 7 * day, monday)),
+        ("this week", ("this week", monday, today + day)),
+        ("last month", ("last month", last_month, month)),
+        ("this month", ("this month", month, today + day)),
+        ("this year", ("this year", today.replace(month=1, day=1), today + day)),
+        ("last 7 days", ("the last 7 days", today - 6 * day, today + day)),
+    ]
+    for phrase, found in ranges:
+        if phrase in text: return found
+    if re.search(r"\b(?:week|weekly|wk)\b", text): return dict(ranges)["this week"]
+    if re.search(r"\bmonth(?:ly)?\b", text): return dict(ranges)["this month"]
+    return dict(ranges)[default]
+
+
+def limit(text: str) -> int:
+    m = re.search(r"\btop\s+(\d+)", text.lower())
+    return max(1, min(MAX_LIMIT, int(m.group(1)))) if m else DEFAULT_LIMIT
+
+
+def below(text: str) -> int:
+    m = re.search(r"(?:below|under|less than|fewer than|<)\s*(\d+)", text.lower())
+    return int(m.group(1)) if m else LOW_STOCK_BELOW
+
+
+def rank_by(text: str) -> str:
+    return "revenue" if re.search(r"\b(?:revenue|takings|turnover|rand)\b", text.lower()) else "units"
+
+
+def breakdown(text: str):
+    m = re.search(r"\bby\s+(payment|category|product|sku)", text.lower())
+    if not m: return None
+    return {"product": "sku"}.get(m.group(1), m.group(1))
+
+
+STOCK_LEVEL_WORDS = frozenset(w for example in INTENTS["stock_level"] for w in WORD_RE.findall(example))
+
+
+def product_terms(text: str) -> str:
+    """What a stock question asks about: its words minus the phrasing ("how much stock of zodiac" -> "zodiac")."""
+    return " ".join(w for w in WORD_RE.findall(text.lower()) if w not in STOCK_LEVEL_WORDS and w not in STOPWORDS)
+
+
+def category(text: str, categories) -> str:
+    """The longest known category named in the question, matched case-insensitively on word boundaries."""
+    padded = " " + " ".join(WORD_RE.findall(text.lower())) + " "
+    found = [c for c in categories if c and " " + " ".join(WORD_RE.findall(c.lower())) + " " in padded]
+    return max(found, key=len) if found else None
+
+
+# --- answers ---
+def money(value) -> str:
+    return f"R {value or 0:,.2f}"
+
+
+def top_sellers_text(label, rows, category_name=None) -> str:
+    scope = f" in {category_name}" if category_name else ""
+    if not rows: return f"No sales{scope} {label}."
+    lines = [f"{n}. {r['name'] or r['sku']} ({r['sku']}): {r['units']} units, {money(r['revenue'])}" for n, r in enumerate(rows, 1)]
+    return f"Top sellers{scope} {label}:\n" + "\n".join(lines)
+
+
+def low_stock_text(rows, total, below_to, category_name=None) -> str:
+    scope = f" in {category_name}" if category_name else ""
+    if not rows: return f"Nothing{scope} is below {below_to} in stock."
+    lines = [f"- {r['name'] or r['sku']} ({r['sku']}): {r['stock_quantity']} left" for r in rows]
+    more = f"\n...and {total - len(rows)} more." if total > len(rows) else ""
+    return f"{total} product(s){scope} below {below_to} in stock:\n" + "\n".join(lines) + more
+
+
+def stock_level_text(terms, rows) -> str:
+    if not terms: return 'Which product? Ask e.g. "how much stock of zodiac".'
+    if not rows: return f'No product matches "{terms}".'
+    lines = [f"- {r['name'] or r['sku']} ({r['sku']}): {r['stock_quantity']} in stock" for r in rows]
+    return f'Stock for "{terms}":\n' + "\n".join(lines)
+
+
+def revenue_text(label, summary, split=None, split_name=None) -> str:
+    head = f"Revenue {label}: {money(summary['revenue'])} from {summary['transactions']} transaction(s), {summary['units']} unit(s)."
+    if not split: return head
+    lines = [f"- {key}: {money(v['revenue'])}" for key, v in sorted(split.items(), key=lambda kv: -kv[1]["revenue"])]
+    return head + f"\nBy {split_name}:\n" + "\n".join(lines)
+
+
+class AnswerCache:
+    """Small TTL + LRU cache of chat answers; `invalidate()` drops everything (new sales, catalog edits)."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0):
+        self.maxsize, self.ttl = maxsize, ttl
+        self._lock = threading.Lock()
+        self._data = collections.OrderedDict()
+        self.hits = self.misses = self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize: self._data.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
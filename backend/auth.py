@@ -0,0 +1,145 @@
+"""
+Login helpers: Google ID-token verification against a cached signing-key set,
+and locally signed session tokens so per-request auth needs no network I/O.
+
+Google's certs are fetched once and reused until their Cache-Control max-age
+expires. A token signed with an unknown key forces a refetch (Google rotated its
+keys) at most once per REFETCH_INTERVAL; in between such tokens are rejected, so
+made-up key ids can neither stall logins nor hammer Google. Session tokens are compact HS256 JWTs signed with SESSION_SECRET, which
+must be set outside development (APP_ENV), where tokens have to survive restarts
+and be accepted by every worker.
+Both are pure functions of their inputs plus an injectable cert fetcher, so
+they can be exercised offline with a stub key set.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+import threading
+import time
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+DEFAULT_CERT_MAX_AGE = 3600  # used when Google sends no usable Cache-Control
+REFETCH_INTERVAL = 60.0      # seconds between refetches forced by an unknown key id
+CLOCK_SKEW = 10
+
+APP_ENV = os.getenv("APP_ENV", "development")
+DEV = APP_ENV == "development"
+SESSION_TTL = int(os.getenv("SESSION_TTL", "3600"))
+SESSION_SECRET = os.getenv("SESSION_SECRET")
+if not SESSION_SECRET:
+    if not DEV: raise RuntimeError(f"SESSION_SECRET must be set when APP_ENV={APP_ENV}")
+    # Tokens signed with a per-process secret die on restart and are rejected by every other worker
+    logging.getLogger("nexus.auth").warning("SESSION_SECRET is not set; using a random per-process secret (development only)")
+    SESSION_SECRET = secrets.token_urlsafe(32)
+
+
+class AuthError(ValueError):
+    pass
+
+
+def fetch_google_certs():
+    """Return ({kid: pem}, max_age_seconds) from Google's cert endpoint."""
+    import requests
+    res = requests.get(GOOGLE_CERTS_URL, timeout=5)
+    res.raise_for_status()
+    match = re.search(r"max-age=(\d+)", res.headers.get("Cache-Control", ""))
+    return res.json(), int(match.group(1)) if match else DEFAULT_CERT_MAX_AGE
+
+
+class CertCache:
+    """In-process signing-key cache that honours the key set's max-age."""
+
+    def __init__(self, fetcher=fetch_google_certs):
+        self._fetcher = fetcher
+        self._lock = threading.Lock()
+        self._certs = None
+        self._expires = 0.0
+        self._forced = float("-inf")
+        self.fetches = 0
+
+    @property
+    def fresh(self) -> bool:
+        return self._certs is not None and time.monotonic() < self._expires
+
+    @property
+    def refetch_allowed(self) -> bool:
+        return time.monotonic() - self._forced >= REFETCH_INTERVAL
+
+    def ready(self, kid) -> bool:
+        """Whether verifying a token signed with `kid` needs no network I/O."""
+        return self.fresh and (kid in self._certs or not self.refetch_allowed)
+
+    def get(self, force: bool = False) -> dict:
+        """The key set; `force` refetches it unless another forced refetch ran in the last REFETCH_INTERVAL."""
+        if not force and self._certs is not None and time.monotonic() < self._expires:
+            return self._certs
+        with self._lock:
+            force = force and self.refetch_allowed  # re-checked under the lock: concurrent callers fetch once
+            if force: self._forced = time.monotonic()
+            if force or self._certs is None or time.monotonic() >= self._expires:
+                certs, max_age = self._fetcher()
+                self._certs, self._expires = certs, time.monotonic() + max_age
+                self.fetches += 1
+        return self._certs
+
+
+def token_kid(token: str):
+    """The key id in a JWT's header."""
+    try:
+        return json.loads(_b64decode(token.split(".")[0])).get("kid")
+    except (ValueError, IndexError, AttributeError):
+        raise AuthError("Malformed token")
+
+
+def verify_google_token(token: str, audience: str, certs: CertCache) -> dict:
+    """Equivalent of id_token.verify_oauth2_token, but against the cached key set."""
+    kid = token_kid(token)
+    from google.auth import jwt as google_jwt  # with cryptography behind it; only needed at login
+    keys = certs.get()
+    if kid not in keys and certs.refetch_allowed: keys = certs.get(force=True)  # Google rotated its keys, or the kid is made up
+    if kid not in keys: raise AuthError("Unknown signing key")
+    try:
+        claims = google_jwt.decode(token, certs=keys, audience=audience, clock_skew_in_seconds=CLOCK_SKEW)
+    except ValueError as e:
+        raise AuthError(str(e))
+    if claims.get("iss") not in GOOGLE_ISSUERS: raise AuthError(f"Wrong issuer: {claims.get('iss')}")
+    return claims
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(signing_input: bytes, secret: str) -> str:
+    return _b64encode(hmac.new(secret.encode(), signing_input, hashlib.sha256).digest())
+
+
+def issue_session_token(user: dict, ttl: int = None, secret: str = None) -> str:
+    now = int(time.time())
+    payload = {"sub": user["email"], "name": user.get("name"), "picture": user.get("picture"),
+               "role": user.get("role"), "iat": now, "exp": now + (ttl or SESSION_TTL)}
+    signing_input = _b64encode(b'{"alg":"HS256","typ":"JWT"}') + "." + _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return signing_input + "." + _sign(signing_input.encode(), secret or SESSION_SECRET)
+
+
+def decode_session_token(token: str, secret: str = None) -> dict:
+    """Validate signature and expiry; pure CPU, no I/O."""
+    try:
+        header, payload, signature = token.split(".")
+    except ValueError:
+        raise AuthError("Malformed session token")
+    if not hmac.compare_digest(signature, _sign(f"{header}.{payload}".encode(), secret or SESSION_SECRET)):
+        raise AuthError("Bad session token signature")
+    claims = json.loads(_b64decode(payload))
+    if claims.get("exp", 0) < time.time(): raise AuthError("Session expired")
+    return claims
@@ -0,0 +1,94 @@
+"""
+Checkout contention benchmark.
+
+Simulates N till lanes hammering POST /transactions/ on a handful of hot SKUs,
+reports p50/p99 checkout latency and checks that no stock was lost or oversold.
+
+Usage (from the repo root or backend/):
+    python backend/benchmarks/checkout_contention.py --lanes 8 --sales 200
+    DATABASE_URL=postgresql://... python backend/benchmarks/checkout_contention.py
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from timing import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-lane checkout contention benchmark")
+    parser.add_argument("--lanes", type=int, default=8, help="concurrent tills")
+    parser.add_argument("--sales", type=int, default=200, help="checkouts per lane")
+    parser.add_argument("--hot-skus", type=int, default=5, help="SKUs every lane competes for")
+    parser.add_argument("--basket", type=int, default=4, help="max lines per basket")
+    parser.add_argument("--stock", type=int, default=2000, help="opening stock per hot SKU")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        db_file = os.path.join(tempfile.mkdtemp(prefix="nexus_bench_"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_file}"
+    sys.path.insert(0, BACKEND_DIR)
+
+    from fastapi.testclient import TestClient
+    import main as backend
+
+    backend.ensure_schema(backend.engine)
+    db = backend.SessionLocal()
+    skus = [f"HOT-{i:03d}" for i in range(args.hot_skus)]
+    db.query(backend.TransactionItem).filter(backend.TransactionItem.product_sku.in_(skus)).delete(synchronize_session=False)
+    db.query(backend.Product).filter(backend.Product.sku.in_(skus)).delete(synchronize_session=False)
+    for sku in skus:
+        db.add(backend.Product(sku=sku, name=f"Hot item {sku}", cost_price=5.0, selling_price=10.0, stock_quantity=args.stock, category="BENCH"))
+    db.commit(); db.close()
+
+    latencies, lock = [], threading.Lock()
+    outcome = {"ok": 0, "rejected": 0, "errors": 0, "units_sold": 0}
+
+    def lane(lane_id):
+        rng = random.Random(args.seed + lane_id)
+        local, ok, rejected, errors, units = [], 0, 0, 0, 0
+        for _ in range(args.sales):
+            lines = [{"product_sku": rng.choice(skus), "quantity": rng.randint(1, 3)} for _ in range(rng.randint(1, args.basket))]
+            start = time.perf_counter()
+            res = client.post("/transactions/", json={"payment_method": "CASH", "items": lines})
+            local.append(time.perf_counter() - start)
+            if res.status_code == 200: ok += 1; units += sum(l["quantity"] for l in lines)
+            elif res.status_code == 409: rejected += 1
+            else: errors += 1
+        with lock:
+            latencies.extend(local)
+            outcome["ok"] += ok; outcome["rejected"] += rejected; outcome["errors"] += errors; outcome["units_sold"] += units
+
+    with TestClient(backend.app) as client:  # one event loop shared by every lane, as under uvicorn
+        threads = [threading.Thread(target=lane, args=(i,)) for i in range(args.lanes)]
+        wall = time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        wall = time.perf_counter() - wall
+
+    db = backend.SessionLocal()
+    remaining = sum(q for (q,) in db.query(backend.Product.stock_quantity).filter(backend.Product.sku.in_(skus)))
+    recorded = sum(q or 0 for (q,) in db.query(backend.TransactionItem.quantity).filter(backend.TransactionItem.product_sku.in_(skus)))
+    negative = db.query(backend.Product).filter(backend.Product.sku.in_(skus), backend.Product.stock_quantity < 0).count()
+    db.close()
+
+    opening = args.stock * len(skus)
+    print(f"Lanes: {args.lanes}  Checkouts: {len(latencies)}  Wall: {wall:.2f}s  Throughput: {len(latencies) / wall:.1f}/s")
+    print(f"Accepted: {outcome['ok']}  Rejected (no stock): {outcome['rejected']}  Errors: {outcome['errors']}")
+    print(f"Latency p50: {percentile(latencies, 50) * 1000:.2f} ms  p99: {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"Stock: opening {opening}, sold {outcome['units_sold']}, recorded {recorded}, remaining {remaining}")
+
+    consistent = opening - remaining == outcome["units_sold"] == recorded and negative == 0
+    print("✅ No stock lost or oversold." if consistent else "❌ Stock mismatch detected!")
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
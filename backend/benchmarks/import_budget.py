@@ -0,0 +1,68 @@
+"""
+Cold-start import budget check.
+
+Imports `main` (the API) and `models` (what the scripts load) in fresh interpreters
+and fails when:
+  - either pulls in the analytics stack (pandas, numpy, sklearn) or opens the database, or
+  - the best of --runs wall times exceeds its budget.
+Meant for CI; exits 1 on failure.
+
+Usage (from the repo root or backend/):
+    python backend/benchmarks/import_budget.py
+    python backend/benchmarks/import_budget.py --main-budget-ms 800 --runs 7
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "numpy", "sklearn", "scipy")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, runs, database_url):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    samples, heavy = [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                             cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        samples.append(result["ms"])
+        heavy.update(result["heavy"])
+    return min(samples), sorted(heavy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing the API or the models gets slow or heavy")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module; the fastest counts")
+    parser.add_argument("--main-budget-ms", type=float, default=1200.0)
+    parser.add_argument("--models-budget-ms", type=float, default=600.0)
+    args = parser.parse_args()
+
+    # A database file that must still not exist afterwards: importing may not connect or run DDL
+    db_file = os.path.join(tempfile.mkdtemp(prefix="nexus_import_"), "untouched.db")
+    failures = []
+    for module, budget in (("models", args.models_budget_ms), ("main", args.main_budget_ms)):
+        best, heavy = measure(module, args.runs, f"sqlite:///{db_file}")
+        status = "ok" if best <= budget and not heavy else "FAIL"
+        print(f"import {module:<7} {best:8.1f} ms (budget {budget:.0f} ms)  heavy modules: {', '.join(heavy) or 'none'}  {status}")
+        if best > budget: failures.append(f"import {module} took {best:.0f} ms > {budget:.0f} ms")
+        if heavy: failures.append(f"import {module} loaded {', '.join(heavy)}")
+    if os.path.exists(db_file): failures.append("importing main touched the database")
+
+    for f in failures: print(f"❌ {f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Async vs sync DB path load test.
+
+Starts the API under uvicorn once per mode (DB_ASYNC=1 async engine, DB_ASYNC=0
+sync Session on the threadpool) against the same seeded database and drives it
+with a fixed-concurrency mix of catalog reads, barcode lookups and checkouts.
+Prints requests/second and p50/p95/p99 latency for each mode.
+
+Usage (from the repo root or backend/):
+    python backend/benchmarks/load_test.py --concurrency 64 --duration 15
+    DATABASE_URL=postgresql://... python backend/benchmarks/load_test.py   (where the async path pays off)
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from timing import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed(database_url, n_products):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    code = (
+        "import main\n"
+        "main.ensure_schema(main.engine)\n"
+        "db = main.SessionLocal()\n"
+        "db.query(main.TransactionItem).delete(); db.query(main.Transaction).delete(); db.query(main.SalesRollup).delete()\n"
+        "db.query(main.ProductImage).delete(); db.query(main.Product).delete()\n"
+        f"db.add_all(main.Product(sku=f'LT-{{i:06d}}', name=f'Load item {{i}}', cost_price=5.0, selling_price=10.0, stock_quantity=10**9, category=f'CAT {{i % 20}}') for i in range({n_products}))\n"
+        "db.commit()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, check=True)
+
+
+async def drive(base_url, concurrency, duration, n_products, mix):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(wid):
+        nonlocal errors
+        rng = random.Random(wid)
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            while time.perf_counter() < deadline:
+                op = rng.choices(list(mix), weights=list(mix.values()))[0]
+                sku = f"LT-{rng.randrange(n_products):06d}"
+                start = time.perf_counter()
+                if op == "catalog": res = await client.get("/products/", params={"limit": 100, "after": rng.randrange(n_products)})
+                elif op == "lookup": res = await client.get(f"/products/{sku}")
+                else: res = await client.post("/transactions/", json={"payment_method": "CASH", "items": [{"product_sku": sku, "quantity": 1}]})
+                latencies.append(time.perf_counter() - start)
+                if res.status_code >= 400: errors += 1
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors, time.perf_counter() - wall
+
+
+def run_mode(label, db_async, database_url, args, mix):
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, DB_ASYNC="1" if db_async else "0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        for _ in range(100):
+            try:
+                httpx.get(base_url + "/products/cache/stats", timeout=1); break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        latencies, errors, wall = asyncio.run(drive(base_url, args.concurrency, args.duration, args.products, mix))
+    finally:
+        server.terminate(); server.wait()
+    print(f"{label:<6} {len(latencies) / wall:>9.1f} req/s   p50 {percentile(latencies, 50) * 1000:7.2f} ms   "
+          f"p95 {percentile(latencies, 95) * 1000:7.2f} ms   p99 {percentile(latencies, 99) * 1000:7.2f} ms   errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the async and sync DB paths under load")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--checkout-share", type=float, default=0.2, help="fraction of requests that are checkouts")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="nexus_load_"), "load.db")
+    reads = 1.0 - args.checkout_share
+    mix = {"catalog": reads / 2, "lookup": reads / 2, "checkout": args.checkout_share}
+
+    print(f"{args.concurrency} concurrent clients, {args.duration:.0f}s per mode, {args.products} products, mix {mix}")
+    for label, db_async in (("sync", False), ("async", True)):
+        seed(database_url, args.products)
+        run_mode(label, db_async, database_url, args, mix)
+
+
+if __name__ == "__main__":
+    main()
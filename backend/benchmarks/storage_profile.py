@@ -0,0 +1,154 @@
+"""
+SQLite storage profile benchmark: checkout throughput with reports running alongside.
+
+Runs the same mixed workload twice, each in its own child process on a fresh SQLite file
+with the same seeded catalog and sales history:
+  before   DB_STORAGE_PROFILE=compat and without the transaction/line-item/image indexes
+           (rollback journal, fsync per commit, full scans for date ranges and joins)
+  after    DB_STORAGE_PROFILE=production with every model index (WAL, synchronous=NORMAL)
+Writer lanes POST /transactions/ while reader threads pull the last day's export and single
+products for --duration seconds. Reported: checkout ops/s and p50/p99, reader p50/p99, errors.
+
+Usage (from the repo root or backend/):
+    python backend/benchmarks/storage_profile.py
+    python backend/benchmarks/storage_profile.py --history 200000 --lanes 8 --readers 4 --duration 20
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from timing import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SIDES = {"before": "compat", "after": "production"}
+# Indexes added alongside the storage profiles; "before" drops them to measure an older database
+NEW_INDEXES = ("ix_transactions_timestamp", "ix_transaction_items_transaction_id", "ix_transaction_items_product_sku",
+               "ix_product_images_product_sku")
+
+
+def seed(backend, args):
+    rng, now = random.Random(args.seed), datetime.datetime.utcnow()
+    skus = [f"SP-{i:05d}" for i in range(args.products)]
+    with backend.engine.begin() as conn:
+        conn.execute(backend.Product.__table__.insert(), [
+            {"sku": s, "name": f"Storage item {i}", "cost_price": 5.0, "selling_price": 10.0, "stock_quantity": 10**9,
+             "category": f"CAT {i % 40}", "updated_at": now} for i, s in enumerate(skus)])
+        conn.execute(backend.ProductImage.__table__.insert(), [
+            {"product_sku": s, "image_url": f"https://cdn.example/{s}.jpg", "is_primary": True} for s in skus])
+        start = now - datetime.timedelta(days=90)
+        for chunk in range(0, args.history, 5000):
+            txns, items = [], []
+            for tid in range(chunk + 1, min(args.history, chunk + 5000) + 1):
+                basket = [(rng.choice(skus), rng.randint(1, 3)) for _ in range(3)]
+                txns.append({"id": tid, "total_amount": 10.0 * sum(q for _, q in basket), "payment_method": rng.choice(("CASH", "CARD")),
+                             "timestamp": start + datetime.timedelta(seconds=rng.randrange(90 * 86400))})
+                items += [{"transaction_id": tid, "product_sku": s, "quantity": q, "price_at_sale": 10.0} for s, q in basket]
+            conn.execute(backend.Transaction.__table__.insert(), txns)
+            conn.execute(backend.TransactionItem.__table__.insert(), items)
+    return skus
+
+
+def worker(args):
+    """Child: one side of the comparison, results as JSON on stdout."""
+    sys.path.insert(0, BACKEND_DIR)
+    from fastapi.testclient import TestClient
+    import main as backend
+
+    backend.ensure_schema(backend.engine)
+    if args.side == "before":
+        with backend.engine.begin() as conn:
+            for name in NEW_INDEXES: conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    skus = seed(backend, args)
+    with backend.engine.connect() as conn:
+        journal = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        indexes = conn.exec_driver_sql("SELECT count(*) FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'").scalar()
+
+    since = (datetime.datetime.utcnow() - datetime.timedelta(days=1)).isoformat()
+    deadline = time.perf_counter() + args.duration
+    writes, reads, errors, lock = [], [], [], threading.Lock()
+
+    def lane(lane_id):
+        rng, local = random.Random(args.seed + lane_id), []
+        while time.perf_counter() < deadline:
+            body = {"payment_method": "CASH", "items": [{"product_sku": rng.choice(skus), "quantity": 1} for _ in range(3)]}
+            start = time.perf_counter()
+            res = client.post("/transactions/", json=body)
+            local.append(time.perf_counter() - start)
+            if res.status_code != 200:
+                with lock: errors.append(f"checkout {res.status_code}: {res.text[:120]}")
+        with lock: writes.extend(local)
+
+    def reader(reader_id):
+        rng, local = random.Random(args.seed + 1000 + reader_id), []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if rng.random() < 0.5: res = client.get("/transactions/export", params={"format": "csv", "start": since})
+            else: res = client.get(f"/products/{rng.choice(skus)}")
+            local.append(time.perf_counter() - start)
+            if res.status_code != 200:
+                with lock: errors.append(f"read {res.status_code}: {res.text[:120]}")
+        with lock: reads.extend(local)
+
+    with TestClient(backend.app) as client:  # one event loop shared by every thread, as under uvicorn
+        threads = [threading.Thread(target=lane, args=(i,)) for i in range(args.lanes)]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        wall = time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        wall = time.perf_counter() - wall
+
+    json.dump({"profile": SIDES[args.side], "journal_mode": journal, "indexes": indexes,
+               "checkouts": len(writes), "checkout_ops_per_sec": round(len(writes) / wall, 1),
+               "checkout_p50_ms": round(percentile(writes, 50) * 1000, 2), "checkout_p99_ms": round(percentile(writes, 99) * 1000, 2),
+               "reads": len(reads), "read_p50_ms": round(percentile(reads, 50) * 1000, 2), "read_p99_ms": round(percentile(reads, 99) * 1000, 2),
+               "errors": len(errors), "first_error": errors[0] if errors else None}, sys.stdout)
+
+
+def run_side(side, args):
+    db_file = os.path.join(tempfile.mkdtemp(prefix="nexus_storage_"), "bench.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_file}", DB_STORAGE_PROFILE=SIDES[side], DB_ASYNC="0")
+    cmd = [sys.executable, os.path.abspath(__file__), "--side", side, "--products", str(args.products), "--history", str(args.history),
+           "--lanes", str(args.lanes), "--readers", str(args.readers), "--duration", str(args.duration), "--seed", str(args.seed)]
+    out = subprocess.run(cmd, cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite storage profile before/after benchmark")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=100000, help="seeded transactions (3 line items each) over 90 days")
+    parser.add_argument("--lanes", type=int, default=8, help="concurrent tills checking out")
+    parser.add_argument("--readers", type=int, default=2, help="concurrent report/product readers")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per side")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write both sides as JSON")
+    parser.add_argument("--side", choices=SIDES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.side: return worker(args)
+
+    results = {}
+    for side in SIDES:
+        print(f"⏱️  {side}: DB_STORAGE_PROFILE={SIDES[side]}, {args.lanes} lanes + {args.readers} readers for {args.duration:.0f}s...", flush=True)
+        r = results[side] = run_side(side, args)
+        print(f"   journal={r['journal_mode']} indexes={r['indexes']}  checkouts {r['checkout_ops_per_sec']}/s "
+              f"p50 {r['checkout_p50_ms']} ms p99 {r['checkout_p99_ms']} ms  reads {r['reads']} p50 {r['read_p50_ms']} ms "
+              f"p99 {r['read_p99_ms']} ms  errors {r['errors']}")
+        if r["first_error"]: print(f"   first error: {r['first_error']}")
+    before, after = results["before"], results["after"]
+    print(f"📈 Checkout throughput x{after['checkout_ops_per_sec'] / max(before['checkout_ops_per_sec'], 0.1):.2f}, "
+          f"p99 {before['checkout_p99_ms']} -> {after['checkout_p99_ms']} ms, read p99 {before['read_p99_ms']} -> {after['read_p99_ms']} ms")
+    if args.output:
+        with open(args.output, "w") as f: json.dump(results, f, indent=2)
+    return 1 if before["errors"] or after["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
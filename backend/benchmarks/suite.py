@@ -0,0 +1,389 @@
+"""
+Backend benchmark suite.
+
+Runs the hot paths in process (FastAPI TestClient) against a fresh SQLite file and a
+throwaway local Postgres, writes the timings as JSON and compares them with a stored
+baseline:
+  checkout_single / checkout_multi        POST /transactions/, one lane and N lanes
+  products_full|page|304 @ 1k/10k/100k    GET /products/ (whole catalog, one page, ETag hit)
+  transactions_list|export @ history      GET /transactions/ and the streaming export
+  predict_cold|warm|batch                 /ai/predict on a 90-day sales history
+  import_master_insert|update             import_master.import_data on synthetic workbooks
+  sync_images_cold|warm                   sync_images.py with the local uploader
+
+Each database runs in its own child process because backend/main.py binds DATABASE_URL
+at import. Data is generated from a fixed seed, so two runs on the same machine do the
+same work.
+
+Usage (from the repo root or backend/):
+    python backend/benchmarks/suite.py --output bench_results.json
+    python backend/benchmarks/suite.py --quick --db sqlite
+    python backend/benchmarks/suite.py --save-baseline bench_baseline.json
+    python backend/benchmarks/suite.py --baseline bench_baseline.json   (exit status 1 on regression)
+
+Postgres: set BENCH_POSTGRES_URL to a scratch database (its tables are dropped), or put
+initdb/pg_ctl on PATH (as a non-root user) to have a temporary cluster started and torn down.
+Without either, the postgres run is recorded as skipped.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from timing import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+
+FULL_SIZES = {"products": [1000, 10000, 100000], "history": [1000, 10000, 100000], "import_rows": 20000, "images": 500}
+QUICK_SIZES = {"products": [1000, 10000], "history": [1000, 10000], "import_rows": 2000, "images": 100}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def summarize(samples, **extra):
+    ms = [s * 1000 for s in samples]
+    return {"unit": "ms", "median": round(statistics.median(ms), 3), "p95": round(percentile(ms, 95), 3),
+            "min": round(min(ms), 3), "samples": len(ms), **extra}
+
+
+def timed(fn, repeats, warmup=1):
+    for _ in range(warmup): fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def log(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+# --- CHILD: one database, every scenario ---
+class Bench:
+    def __init__(self, args):
+        sys.path.insert(0, BACKEND_DIR)
+        sys.path.insert(0, REPO_DIR)
+        from fastapi.testclient import TestClient
+        import main as backend
+        import search_index
+        self.backend, self.search_index = backend, search_index
+        self.args = args
+        self.sizes = QUICK_SIZES if args.quick else FULL_SIZES
+        self.client = TestClient(backend.app)  # entered by run(): one event loop for every request, as under uvicorn
+        self.results = {}
+
+    def ok(self, res):
+        if res.status_code >= 400: raise RuntimeError(f"{res.request.method} {res.request.url} -> {res.status_code}: {res.text[:200]}")
+        return res
+
+    def reset(self):
+        """Empty every table and drop in-process caches so scenarios don't see each other's data."""
+        b = self.backend
+        with b.engine.begin() as conn:
+            for table in reversed(b.Base.metadata.sorted_tables):
+                if table is not b.Store.__table__: conn.execute(table.delete())  # the default store stays registered
+        for state in b.stores.values():
+            state.products.invalidate(); state.forecasts.invalidate(); state.chat.invalidate()
+            state.search = self.search_index.ProductSearchIndex(state.search.refresh_interval, store_id=state.store_id)
+
+    def seed_products(self, n, stock=10**9, image_every=5):
+        b, now = self.backend, datetime.datetime.utcnow()
+        rows = [{"sku": f"BN-{i:06d}", "name": f"Bench item {i}", "cost_price": 5.0, "selling_price": 10.0 + i % 50,
+                 "stock_quantity": stock, "category": f"CAT {i % 40}", "updated_at": now} for i in range(n)]
+        images = [{"product_sku": r["sku"], "image_url": f"https://cdn.example/{r['sku']}.jpg", "is_primary": True} for r in rows[::image_every]]
+        with b.engine.begin() as conn:
+            for i in range(0, n, 5000): conn.execute(b.Product.__table__.insert(), rows[i:i + 5000])
+            if images: conn.execute(b.ProductImage.__table__.insert(), images)
+        return [r["sku"] for r in rows]
+
+    def seed_history(self, n, skus, days=90, lines=3):
+        """n transactions spread over `days`, `lines` line items each, from a fixed seed."""
+        b, rng = self.backend, random.Random(self.args.seed)
+        start = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+        with b.engine.begin() as conn:
+            first_id = (conn.execute(b.select(b.func.max(b.Transaction.id))).scalar() or 0) + 1
+            for chunk in range(0, n, 5000):
+                txns, items = [], []
+                for tid in range(first_id + chunk, first_id + min(n, chunk + 5000)):
+                    ts = start + datetime.timedelta(seconds=rng.randrange(days * 86400))
+                    basket = [(rng.choice(skus), rng.randint(1, 3)) for _ in range(lines)]
+                    txns.append({"id": tid, "total_amount": 10.0 * sum(q for _, q in basket), "payment_method": rng.choice(("CASH", "CARD")), "timestamp": ts})
+                    items += [{"transaction_id": tid, "product_sku": s, "quantity": q, "price_at_sale": 10.0} for s, q in basket]
+                conn.execute(b.Transaction.__table__.insert(), txns)
+                conn.execute(b.TransactionItem.__table__.insert(), items)
+
+    def record(self, name, summary):
+        self.results[name] = summary
+        log(f"  {name:<34} median {summary['median']:>10.2f} ms   p95 {summary['p95']:>10.2f} ms")
+
+    # -- scenarios --
+    def checkout(self):
+        self.reset()
+        skus = self.seed_products(200)
+        rng = random.Random(self.args.seed)
+
+        def basket(r):
+            return {"payment_method": "CASH", "items": [{"product_sku": r.choice(skus), "quantity": 1} for _ in range(3)]}
+
+        samples = timed(lambda: self.ok(self.client.post("/transactions/", json=basket(rng))), self.args.checkouts)
+        self.record("checkout_single", summarize(samples, ops_per_sec=round(len(samples) / sum(samples), 1)))
+
+        lanes, per_lane, latencies, lock = self.args.lanes, max(1, self.args.checkouts // self.args.lanes), [], threading.Lock()
+
+        def lane(lane_id):
+            r = random.Random(self.args.seed + lane_id)
+            for _ in range(per_lane):
+                start = time.perf_counter()
+                self.ok(self.client.post("/transactions/", json=basket(r)))
+                with lock: latencies.append(time.perf_counter() - start)
+
+        wall = time.perf_counter()
+        threads = [threading.Thread(target=lane, args=(i,)) for i in range(lanes)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        wall = time.perf_counter() - wall
+        self.record(f"checkout_multi[{lanes}]", summarize(latencies, ops_per_sec=round(len(latencies) / wall, 1)))
+
+    def products(self):
+        for size in self.sizes["products"]:
+            self.reset()
+            self.seed_products(size)
+            repeats = self.args.repeats if size <= 10000 else max(2, self.args.repeats // 3)
+            self.record(f"products_full[{size}]", summarize(timed(lambda: self.ok(self.client.get("/products/")), repeats)))
+            rng = random.Random(self.args.seed)
+            page = lambda: self.ok(self.client.get("/products/", params={"limit": 100, "after": rng.randrange(size)}))
+            self.record(f"products_page[{size}]", summarize(timed(page, self.args.repeats * 4)))
+            etag = self.client.get("/products/").headers["etag"]
+
+            def hit():
+                res = self.client.get("/products/", headers={"If-None-Match": etag})
+                if res.status_code != 304: raise RuntimeError(f"expected 304 for a matching ETag, got {res.status_code}")
+
+            self.record(f"products_304[{size}]", summarize(timed(hit, self.args.repeats * 4)))
+
+    def transactions(self):
+        self.reset()
+        skus = self.seed_products(500)
+        seeded = 0
+        for size in self.sizes["history"]:
+            self.seed_history(size - seeded, skus)  # history only grows, so each size reuses the previous rows
+            seeded = size
+            repeats = self.args.repeats if size <= 10000 else max(2, self.args.repeats // 3)
+            self.record(f"transactions_list[{size}]", summarize(timed(lambda: self.ok(self.client.get("/transactions/")), repeats)))
+            self.record(f"transactions_export[{size}]", summarize(timed(lambda: self.ok(self.client.get("/transactions/export")), repeats)))
+
+    def predict(self):
+        self.reset()
+        skus = self.seed_products(200)
+        self.seed_history(20000, skus)
+        engine, rng = self.backend.stores.get(self.backend.DEFAULT_STORE_ID).forecasts, random.Random(self.args.seed)
+
+        def cold():
+            engine.invalidate()
+            self.ok(self.client.get(f"/ai/predict/{rng.choice(skus)}"))
+
+        self.record("predict_cold", summarize(timed(cold, self.args.repeats)))
+        self.record("predict_warm", summarize(timed(lambda: self.ok(self.client.get(f"/ai/predict/{rng.choice(skus)}")), self.args.repeats * 4)))
+        self.record(f"predict_batch[{len(skus)}]", summarize(timed(lambda: self.ok(self.client.post("/ai/predict/batch", json={"skus": skus})), self.args.repeats)))
+
+    def import_master(self, workdir):
+        import pandas as pd
+        self.reset()
+        n, rng = self.sizes["import_rows"], random.Random(self.args.seed)
+        codes = [f"IM-{i:06d}" for i in range(n)]
+        barcode_file, opening_file = os.path.join(workdir, "barcode.csv"), os.path.join(workdir, "opening.csv")
+        pd.DataFrame({"Stock Code": codes, "Stock Description": [f"Imported item {i}" for i in range(n)],
+                      "Category": [f"GROUP {i % 30}" for i in range(n)]}).to_csv(barcode_file, index=False)
+        pd.DataFrame({"Stock Code": codes, "Quantity": [rng.randint(0, 50) for _ in codes],
+                      "Unit price Excl VAT": [f"R {rng.uniform(5, 500):,.2f}" for _ in codes],
+                      "Selling Incl VAT": [f"R {rng.uniform(10, 900):,.2f}" for _ in codes]}).to_csv(opening_file, index=False)
+        with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+            import import_master
+            run = lambda: import_master.import_data(barcode_file, opening_file)
+            self.record(f"import_master_insert[{n}]", summarize(timed(run, 1, warmup=0)))
+            self.record(f"import_master_update[{n}]", summarize(timed(run, max(1, self.args.repeats // 2), warmup=0)))
+
+    def sync_images(self, workdir):
+        from PIL import Image
+        self.reset()
+        n = self.sizes["images"]
+        self.seed_products(n, image_every=n + 1)
+        root, cdn = os.path.join(workdir, "images"), os.path.join(workdir, "cdn")
+        rng = random.Random(self.args.seed)
+        for i in range(n):
+            folder = os.path.join(root, f"G{i % 10}. GROUP")
+            os.makedirs(folder, exist_ok=True)
+            photo = Image.frombytes("RGB", (40, 30), rng.randbytes(40 * 30 * 3)).resize((1200, 900), Image.BICUBIC)  # photo-sized, compresses like one
+            photo.save(os.path.join(folder, f"Bench item {i}.jpg"), quality=85)
+        with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+            import sync_images
+            db = self.backend.SessionLocal()
+            try:
+                run = lambda: sync_images.sync_images(db, sync_images.LocalUploader(cdn), root, os.path.join(workdir, "manifest.json"),
+                                                  variants_dir=os.path.join(workdir, "variants"))
+                self.record(f"sync_images_cold[{n}]", summarize(timed(run, 1, warmup=0)))
+                self.record(f"sync_images_warm[{n}]", summarize(timed(run, self.args.repeats, warmup=0)))
+            finally:
+                db.close()
+
+    def run(self, only):
+        workdir = tempfile.mkdtemp(prefix="nexus_suite_")
+        scenarios = {"checkout": self.checkout, "products": self.products, "transactions": self.transactions, "predict": self.predict,
+                     "import_master": lambda: self.import_master(workdir), "sync_images": lambda: self.sync_images(workdir)}
+        try:
+            with self.client:
+                for name, fn in scenarios.items():
+                    if only and name not in only: continue
+                    log(f"[{self.args.label}] {name}")
+                    fn()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return self.results
+
+
+def worker(args):
+    with open(args.worker_output, "w") as f: json.dump(Bench(args).run(args.only), f)
+
+
+# --- PARENT: databases, JSON, baseline comparison ---
+@contextlib.contextmanager
+def postgres_stand_in():
+    """Yield (url, None), or (None, reason) when no Postgres is available."""
+    if os.getenv("BENCH_POSTGRES_URL"):
+        yield os.environ["BENCH_POSTGRES_URL"], None
+        return
+    initdb, pg_ctl = shutil.which("initdb"), shutil.which("pg_ctl")
+    if not (initdb and pg_ctl):
+        yield None, "no BENCH_POSTGRES_URL and no initdb/pg_ctl on PATH"
+        return
+    tmp = tempfile.mkdtemp(prefix="nexus_pg_")
+    data, port = os.path.join(tmp, "data"), free_port()
+    subprocess.run([initdb, "-D", data, "-U", "bench", "--auth=trust", "-E", "UTF8"], check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([pg_ctl, "-D", data, "-l", os.path.join(tmp, "pg.log"), "-w", "-o", f"-p {port} -k {tmp}", "start"], check=True, stdout=subprocess.DEVNULL)
+    try:
+        yield f"postgresql://bench@127.0.0.1:{port}/postgres", None
+    finally:
+        subprocess.run([pg_ctl, "-D", data, "-m", "fast", "stop"], stdout=subprocess.DEVNULL)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def run_child(label, database_url, args):
+    out = tempfile.mktemp(suffix=".json", prefix="nexus_suite_")
+    cmd = [sys.executable, os.path.abspath(__file__), "--worker-output", out, "--label", label, "--repeats", str(args.repeats),
+           "--checkouts", str(args.checkouts), "--lanes", str(args.lanes), "--seed", str(args.seed)]
+    if args.quick: cmd.append("--quick")
+    if args.only: cmd += ["--only", ",".join(args.only)]
+    if database_url.startswith("postgres"):
+        # Start from empty tables; main.py recreates them on import
+        subprocess.run([sys.executable, "-c", "import sys; sys.path.insert(0, sys.argv[1]); import main; main.Base.metadata.drop_all(main.engine)", BACKEND_DIR],
+                       env=dict(os.environ, DATABASE_URL=database_url), check=True)
+    env = dict(os.environ, DATABASE_URL=database_url, ANALYTICS_SNAPSHOT_INTERVAL="0")  # no background exports competing with the timings
+    try:
+        subprocess.run(cmd, cwd=BACKEND_DIR, env=env, check=True)
+        with open(out) as f: return json.load(f)
+    finally:
+        if os.path.exists(out): os.remove(out)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(report, baseline, threshold, min_delta_ms):
+    """Rows of (metric, baseline ms, current ms, change) and the list of regressed metrics."""
+    rows, regressions = [], []
+    for db, metrics in report["results"].items():
+        base = baseline.get("results", {}).get(db, {})
+        for name, m in metrics.items():
+            if name == "skipped" or name not in base or "median" not in base[name]: continue
+            old, new = base[name]["median"], m["median"]
+            change = (new - old) / old if old else 0.0
+            rows.append((f"{db}/{name}", old, new, change))
+            if change > threshold and new - old > min_delta_ms: regressions.append(f"{db}/{name}")
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backend hot paths and compare with a baseline")
+    parser.add_argument("--db", default="sqlite,postgres", help="comma-separated: sqlite, postgres")
+    parser.add_argument("--only", type=lambda s: [x.strip() for x in s.split(",") if x.strip()], default=None,
+                        help="comma-separated scenarios: checkout, products, transactions, predict, import_master, sync_images")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes (1k/10k) for CI")
+    parser.add_argument("--repeats", type=int, default=6)
+    parser.add_argument("--checkouts", type=int, default=200, help="checkouts for the single-lane run (split across lanes for multi-lane)")
+    parser.add_argument("--lanes", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON report ('-' for stdout)")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--save-baseline", metavar="PATH", help="also write this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown of a median that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this, whatever the ratio")
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    parser.add_argument("--label", default="sqlite", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker_output: return worker(args)
+
+    import sqlalchemy
+    report = {
+        "meta": {"timestamp": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z", "commit": git_commit(),
+                 "python": platform.python_version(), "platform": platform.platform(), "sqlalchemy": sqlalchemy.__version__,
+                 "quick": args.quick, "repeats": args.repeats, "seed": args.seed},
+        "results": {},
+    }
+    for db in [d.strip() for d in args.db.split(",") if d.strip()]:
+        if db == "sqlite":
+            tmp = tempfile.mkdtemp(prefix="nexus_suite_db_")
+            try: report["results"]["sqlite"] = run_child("sqlite", "sqlite:///" + os.path.join(tmp, "bench.db"), args)
+            finally: shutil.rmtree(tmp, ignore_errors=True)
+        elif db == "postgres":
+            with postgres_stand_in() as (url, skipped):
+                if skipped: log(f"[postgres] skipped: {skipped}")
+                report["results"]["postgres"] = {"skipped": skipped} if skipped else run_child("postgres", url, args)
+        else:
+            parser.error(f"unknown --db {db}")
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-": print(text)
+    else:
+        with open(args.output, "w") as f: f.write(text + "\n")
+        log(f"wrote {args.output}")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f: f.write(text + "\n")
+        log(f"saved baseline {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f: baseline = json.load(f)
+        rows, regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        log(f"\nvs baseline {args.baseline} ({baseline.get('meta', {}).get('commit')}):")
+        for name, old, new, change in rows:
+            flag = "  REGRESSION" if name in regressions else ""
+            log(f"  {name:<44} {old:>10.2f} -> {new:>10.2f} ms  {change:+7.1%}{flag}")
+        if regressions:
+            log(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+Latency statistics shared by every benchmark script, so their p50/p95/p99 figures are
+computed the same way and can be compared with each other.
+"""
+
+
+def percentile(samples, pct):
+    """Linear interpolation between the two nearest ranks (numpy's default); 0.0 for no samples."""
+    ordered = sorted(samples)
+    if not ordered: return 0.0
+    rank = (len(ordered) - 1) * pct / 100.0
+    lo = int(rank)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
@@ -0,0 +1,129 @@
+"""
+Catalog change feed: per-SKU product patches pushed to tills as server-sent events.
+
+Writers call `mark(skus)` once their commit is done. A background task waits COALESCE
+seconds, so a burst of sales becomes one event, reloads the touched rows in one query and
+appends them to a bounded history under the next sequence number. Every POLL seconds the
+same task also picks up rows whose updated_at moved (imports, other worker processes).
+Rows are sent whole (minus images), so applying one twice is harmless.
+
+Event ids are "<feed id>:<seq>". A till that reconnects with Last-Event-ID (EventSource
+sends it by itself) is replayed what it missed. If the id belongs to another process or
+has fallen out of the history, the till gets a `resync` event and catches up with a
+?since= delta fetch instead.
+"""
+import asyncio
+import collections
+import datetime
+import json
+import logging
+import secrets
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+COALESCE = 0.1           # seconds a marked SKU waits for the rest of its burst
+POLL = 1.0               # seconds between updated_at polls; 0 only publishes marked SKUs
+HISTORY = 1000           # events kept for reconnecting tills
+MAX_EVENT_ROWS = 5000    # bigger changes (bulk imports) go out as a resync instead
+POLL_SKEW = datetime.timedelta(seconds=2)  # re-read rows committed just before the last poll
+HEARTBEAT = 15.0         # comment line that keeps idle proxies from closing the stream
+MAX_STREAM_AGE = 300.0   # streams end after this; EventSource reconnects and resumes
+RETRY_MS = 2000
+
+log = logging.getLogger("nexus.change_feed")
+
+
+class CatalogFeed:
+    def __init__(self, coalesce: float = COALESCE, poll: float = POLL, history: int = HISTORY):
+        self.coalesce, self.poll = coalesce, poll
+        self.feed_id = secrets.token_hex(4)
+        self.seq = 0
+        self.watermark = None    # newest updated_at published
+        self.subscribers = 0
+        self.listeners = []      # called with no arguments after each publish, e.g. to refresh derived caches
+        self._history = collections.deque(maxlen=history)  # (seq, event name, data)
+        self._dirty = set()
+        self._sent = {}          # sku -> updated_at of the row last published, so polls don't repeat it
+        self._wake = None        # asyncio.Event, set by mark(); created by run() on the serving loop
+        self._published = None   # asyncio.Event, set and replaced on every publish
+
+    def mark(self, skus):
+        """Queue SKUs whose rows changed; call from the event loop after the commit."""
+        self._dirty.update(skus)
+        if self._wake is not None: self._wake.set()
+
+    async def run(self, load, watermark=None):
+        """
+        Background task for the app's lifespan.
+        load(skus, since) -> product row dicts for those SKUs plus any updated at or after `since`.
+        """
+        self.watermark = watermark
+        self._wake, self._published = asyncio.Event(), asyncio.Event()
+        while True:
+            try: await asyncio.wait_for(self._wake.wait(), self.poll or None)
+            except asyncio.TimeoutError: pass
+            if self._dirty: await asyncio.sleep(self.coalesce)
+            self._wake.clear()
+            skus, self._dirty = self._dirty, set()
+            since = self.watermark - POLL_SKEW if self.poll and self.watermark else None
+            if not skus and since is None: continue
+            try:
+                rows = await run_in_threadpool(load, sorted(skus), since)
+            except Exception:
+                log.exception("change feed: loading %d changed products failed", len(skus))
+                self._dirty |= skus
+                await asyncio.sleep(self.poll or 1.0)
+                continue
+            self.publish(rows)
+
+    def publish(self, rows):
+        fresh = []
+        for row in rows:
+            ts = row.get("updated_at")
+            if ts is not None and self._sent.get(row["sku"]) == ts: continue
+            self._sent[row["sku"]] = ts
+            if ts is not None and (self.watermark is None or ts > self.watermark): self.watermark = ts
+            fresh.append({**row, "updated_at": ts.isoformat() if ts else None})
+        if not fresh: return
+        self.seq += 1
+        if len(fresh) > MAX_EVENT_ROWS: self._history.append((self.seq, "resync", "{}"))
+        else: self._history.append((self.seq, "products", json.dumps(fresh, separators=(",", ":"))))
+        published, self._published = self._published, asyncio.Event()
+        published.set()
+        for listener in self.listeners: listener()
+
+    def _resume_point(self, last_event_id):
+        """Sequence number to replay after, or None when the client has to resync."""
+        feed, _, seq = (last_event_id or "").partition(":")
+        if feed != self.feed_id or not seq.isdigit() or int(seq) > self.seq: return None
+        oldest = self._history[0][0] if self._history else self.seq + 1
+        return int(seq) if int(seq) >= oldest - 1 else None
+
+    def _event(self, seq, name, data) -> str:
+        return f"id: {self.feed_id}:{seq}\nevent: {name}\ndata: {data}\n\n"
+
+    async def stream(self, last_event_id=None):
+        """SSE body: missed events (or a resync), then live ones, with heartbeats, until MAX_STREAM_AGE."""
+        after = self._resume_point(last_event_id)
+        yield f"retry: {RETRY_MS}\n\n"
+        self.subscribers += 1
+        deadline = time.monotonic() + MAX_STREAM_AGE
+        try:
+            while time.monotonic() < deadline:
+                if after is None or (self._history and after < self._history[0][0] - 1):
+                    # New subscriber, another process's id, or a client too slow for the history
+                    after = self.seq
+                    yield self._event(after, "resync", "{}")
+                for seq, name, data in list(self._history):
+                    if seq > after:
+                        after = seq
+                        yield self._event(seq, name, data)
+                if self._published is None:  # feed task not running (app started without its lifespan)
+                    await asyncio.sleep(HEARTBEAT)
+                    yield ": ping\n\n"
+                    continue
+                try: await asyncio.wait_for(self._published.wait(), HEARTBEAT)
+                except asyncio.TimeoutError: yield ": ping\n\n"
+        finally:
+            self.subscribers -= 1
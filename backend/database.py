@@ -1,23 +0,0 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-
-# --- CONFIGURATION ---
-# FOR NOW: We use SQLite (a file named nexus.db) so you can test instantly.
-# LATER: We replace this string with your Supabase/Postgres URL.
-SQLALCHEMY_DATABASE_URL = "sqlite:///./nexus.db"
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base = declarative_base()
-
-# Dependency to get the database session in API requests
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -0,0 +1,21 @@
+import argparse
+
+from main import ANALYTICS_DIR, analytics, engine, ensure_schema
+
+# Brings the Parquet analytics snapshot behind /reports/margin, /abc and /dead-stock up to date.
+# Run from cron when the API starts with ANALYTICS_SNAPSHOT_INTERVAL=0:  python export_analytics.py
+# --full rebuilds it from scratch, e.g. after sales history was deleted or reseeded.
+parser = argparse.ArgumentParser(description="Export products and new sales to the analytics snapshot")
+parser.add_argument("--dir", default=ANALYTICS_DIR, help="snapshot directory (ANALYTICS_DIR)")
+parser.add_argument("--full", action="store_true", help="re-export all sales instead of only new ones")
+args = parser.parse_args()
+
+ensure_schema(engine)
+print(f"📦 Exporting analytics snapshot to {args.dir}...")
+try:
+    state = analytics.export(engine, args.dir, full=args.full)
+    if state is None: print("⏳ Another export is running; try again later.")
+    else: print(f"✅ Snapshot v{state['version']}: {state['sales_rows']:,} sale lines through transaction {state['last_transaction_id']}, "
+                f"{state['products']:,} products, {len(state['gaps'])} id gaps awaiting late sales ({state['seconds']}s).")
+finally:
+    engine.dispose()
@@ -0,0 +1,146 @@
+"""
+Demand forecasting engine for /ai/predict.
+
+Fits a trend + day-of-week linear model for every SKU in one vectorized pass:
+sales history is loaded with a single join, pivoted into a (sku x day) matrix,
+and all per-SKU least-squares problems are solved together as a batched
+normal-equation solve. Each store has its own engine, fitted on that store's
+sales, and results are cached until a new sale lands or the day rolls over.
+
+numpy and pandas are imported on the first forecast, not with this module, so
+importing the API stays cheap.
+"""
+from __future__ import annotations
+
+import datetime
+import threading
+from typing import TYPE_CHECKING
+
+from sqlalchemy import text
+
+if TYPE_CHECKING:  # annotations only; the runtime imports stay inside the functions
+    import numpy as np
+    import pandas as pd
+
+HISTORY_DAYS = 90      # how far back we look when fitting
+MIN_HISTORY_DAYS = 14  # a SKU needs two full weeks since its first sale to be forecast
+HORIZON_DAYS = 7       # predicted_weekly_demand = sum of the next 7 days
+TREND_THRESHOLD = 0.02 # slope (units/day) below which a SKU is considered stable
+RIDGE = 1e-3           # keeps the batched solve well-conditioned for short histories
+COVER_WEEKS = 2        # recommend reordering when stock covers less than this
+
+SALES_SQL = text("""
+    SELECT ti.product_sku AS sku, ti.quantity AS quantity, t.timestamp AS ts
+    FROM transaction_items ti
+    JOIN transactions t ON t.id = ti.transaction_id
+    WHERE t.store_id = :store AND t.timestamp >= :start
+""")
+
+NO_DATA = {"predicted_weekly_demand": 0, "trend": "No Data", "recommendation": "Gather more sales data"}
+
+
+def design_matrix(day_index: np.ndarray, dates: pd.DatetimeIndex) -> np.ndarray:
+    """Columns: intercept, linear trend, six weekday dummies (Monday is the baseline)."""
+    import numpy as np
+    weekday = dates.weekday.to_numpy()
+    dummies = (weekday[:, None] == np.arange(1, 7)[None, :]).astype(float)
+    return np.column_stack([np.ones(len(day_index)), day_index.astype(float), dummies])
+
+
+def fit_all(daily: np.ndarray, active: np.ndarray, X: np.ndarray) -> np.ndarray:
+    """
+    Weighted least squares for every SKU at once.
+    daily:  (n_sku, n_days) units sold per day
+    active: (n_sku, n_days) 1 from each SKU's first sale onwards, else 0
+    X:      (n_days, p) shared design matrix
+    Returns (n_sku, p) coefficients.
+    """
+    import numpy as np
+    XtWX = np.einsum("tp,st,tq->spq", X, active, X)
+    XtWy = np.einsum("tp,st->sp", X, active * daily)
+    XtWX += RIDGE * np.eye(X.shape[1])[None, :, :]
+    return np.linalg.solve(XtWX, XtWy[:, :, None])[:, :, 0]
+
+
+def build_forecasts(sales: pd.DataFrame, today: datetime.date) -> dict:
+    """Turn raw (sku, quantity, ts) sale lines into {sku: {predicted_weekly_demand, trend}}."""
+    import numpy as np
+    import pandas as pd
+    if sales.empty: return {}
+    start = today - datetime.timedelta(days=HISTORY_DAYS)
+    dates = pd.date_range(start, today - datetime.timedelta(days=1), freq="D")
+
+    day = (pd.to_datetime(sales["ts"]).dt.normalize() - pd.Timestamp(start)).dt.days.to_numpy()
+    in_window = (day >= 0) & (day < len(dates))
+    sku_codes, skus = pd.factorize(sales["sku"].to_numpy()[in_window])
+    daily = np.zeros((len(skus), len(dates)))
+    np.add.at(daily, (sku_codes, day[in_window]), sales["quantity"].to_numpy(dtype=float)[in_window])
+
+    sold = daily > 0
+    first_sale = np.where(sold.any(axis=1), sold.argmax(axis=1), len(dates))
+    active = (np.arange(len(dates))[None, :] >= first_sale[:, None]).astype(float)
+    enough = (len(dates) - first_sale) >= MIN_HISTORY_DAYS
+
+    X = design_matrix(np.arange(len(dates)), dates)
+    coef = fit_all(daily, active, X)
+
+    future_dates = pd.date_range(today, periods=HORIZON_DAYS, freq="D")
+    X_future = design_matrix(np.arange(len(dates), len(dates) + HORIZON_DAYS), future_dates)
+    weekly = np.clip(coef @ X_future.T, 0, None).sum(axis=1)
+    slope = coef[:, 1]
+
+    trend = np.where(slope > TREND_THRESHOLD, "Growing", np.where(slope < -TREND_THRESHOLD, "Declining", "Stable"))
+    return {
+        sku: {"predicted_weekly_demand": int(round(w)), "trend": str(tr)}
+        for sku, w, tr, ok in zip(skus, weekly, trend, enough) if ok
+    }
+
+
+def recommend(weekly_demand: int, stock) -> str:
+    if stock is None: return "Unknown product"
+    if weekly_demand <= 0: return "No reorder needed"
+    if stock < weekly_demand: return f"Reorder now: ~{COVER_WEEKS * weekly_demand - stock} units"
+    if stock < COVER_WEEKS * weekly_demand: return f"Reorder soon: ~{COVER_WEEKS * weekly_demand - stock} units"
+    return "Stock level OK"
+
+
+class ForecastEngine:
+    """
+    Forecast cache for one store. Forecasts for its whole catalog are rebuilt lazily
+    when the store's newest transaction id or the calendar day differs from the cached
+    key, so a burst of /ai/predict calls costs one history scan.
+    """
+
+    def __init__(self, store_id: int):
+        self.store_id = store_id
+        self._lock = threading.Lock()
+        self._key = None
+        self._forecasts = {}
+
+    def invalidate(self):
+        with self._lock: self._key = None
+
+    def forecasts(self, db) -> dict:
+        today = datetime.datetime.utcnow().date()
+        key = (db.execute(text("SELECT MAX(id) FROM transactions WHERE store_id = :store"), {"store": self.store_id}).scalar(), today)
+        if key == self._key: return self._forecasts
+        with self._lock:
+            if key != self._key:
+                start = datetime.datetime.combine(today - datetime.timedelta(days=HISTORY_DAYS), datetime.time())
+                import pandas as pd
+                sales = pd.read_sql(SALES_SQL, db.connection(), params={"store": self.store_id, "start": start})
+                self._forecasts = build_forecasts(sales, today)
+                self._key = key
+        return self._forecasts
+
+    def predict(self, db, skus, stock: dict) -> list:
+        forecasts = self.forecasts(db)
+        results = []
+        for sku in skus:
+            f = forecasts.get(sku)
+            if f is None:
+                results.append({"sku": sku, **NO_DATA})
+            else:
+                results.append({"sku": sku, **f, "recommendation": recommend(f["predicted_weekly_demand"], stock.get(sku))})
+        return results
+
@@ -0,0 +1,56 @@
+"""
+Resized WebP variants of product photos.
+
+sync_images.py renders every source photo at each size in VARIANTS (longest edge, never
+upscaled) in worker processes, uploads them all and records one URL per variant on its
+ProductImage row. The API then hands each view the smallest variant that is at least as
+wide as it draws the image, so a POS tile never downloads a full-resolution photo.
+
+Pillow is only imported by render(), i.e. by the sync tool, never by the API.
+"""
+import os
+
+VARIANTS = (("thumb", 200), ("card", 640), ("full", 1600))  # name, longest edge in px, smallest first
+URL_FIELDS = {"thumb": "thumb_url", "card": "card_url", "full": "image_url"}  # ProductImage column per variant
+WEBP_QUALITY = 80
+WEBP_METHOD = 4          # encoder effort 0-6: 2 is twice as fast but ~3% larger, 6 is slower for <1% smaller
+
+
+def pick(width) -> str:
+    """The smallest variant at least `width` px wide; the full one when no width is given or none is wide enough."""
+    if width:
+        for name, edge in VARIANTS:
+            if edge >= width: return name
+    return "full"
+
+
+def url_for(image: dict, variant: str):
+    """The variant's URL, else the next larger one the image has (images synced before variants only have image_url)."""
+    names = [name for name, _ in VARIANTS]
+    for name in names[names.index(variant):]:
+        url = image.get(URL_FIELDS[name])
+        if url: return url
+    return None
+
+
+def render(source: str, digest: str, out_dir: str) -> dict:
+    """
+    Write every variant of `source` as WebP under out_dir/<digest prefix>/ and return {variant: path}.
+    Runs in a worker process. Variants already rendered from the same content are reused.
+    """
+    from PIL import Image, ImageOps
+    stem = os.path.splitext(os.path.basename(source))[0]
+    folder = os.path.join(out_dir, digest[:16])
+    paths = {name: os.path.join(folder, f"{stem}-{name}.webp") for name, _ in VARIANTS}
+    if all(os.path.exists(p) for p in paths.values()): return paths
+    os.makedirs(folder, exist_ok=True)
+    with Image.open(source) as original:
+        img = ImageOps.exif_transpose(original)  # phone photos are often stored sideways with an EXIF rotation
+        if img.mode not in ("RGB", "RGBA"): img = img.convert("RGBA" if img.mode in ("LA", "PA", "P") else "RGB")
+        for name, edge in VARIANTS:
+            variant = img.copy()
+            variant.thumbnail((edge, edge), Image.LANCZOS)
+            tmp = paths[name] + ".tmp"
+            variant.save(tmp, "WEBP", quality=WEBP_QUALITY, method=WEBP_METHOD)
+            os.replace(tmp, paths[name])  # never leave a half-written variant that a later run would reuse
+    return paths
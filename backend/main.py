@@ -1,17 +1,42 @@
 import os
-from fastapi import FastAPI, Depends, HTTPException, status
+import sys
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime, Boolean, JSON
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship, joinedload # <-- ADDED joinedloadfrom typing import List, Optional
-from pydantic import BaseModel
+from sqlalchemy import create_engine, event, and_, or_, update, bindparam, func, text, insert, select, distinct, literal
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload, sessionmaker, Session
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
+import csv
 import datetime
-import pandas as pd
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+import functools
+import hashlib
+import io
+import json
+import zlib
+
+# Sibling modules are imported by plain name (uvicorn main:app runs from backend/);
+# keep that working when the root scripts import backend.main.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import asyncio
+import analytics
+import assistant
+import auth
+import catalog_snapshot
+import change_feed
+import forecasting
+import image_variants
+import metrics
+import search_index
+import sku_cache
+import tenancy
+from models import (Base, User, Store, Product, ProductImage, Transaction, TransactionItem, Staff, Supplier, StockTransfer,
+                    StockTransferItem, SalesRollup, DEFAULT_STORE_ID, ensure_schema)
 
 # --- CONFIGURATION ---
 GOOGLE_CLIENT_ID = "499075396456-25b2eqf24q74fp84v0gr7bivsudhit3l.apps.googleusercontent.com"
@@ -32,80 +57,75 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./nexus_v2.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# Request handlers use the async engine (asyncpg / aiosqlite) when DB_ASYNC=1, or run the same
+# handler code on a sync Session in Starlette's threadpool when DB_ASYNC=0. Default: async on
+# Postgres; sync on SQLite, where aiosqlite's extra thread hop measured slower (benchmarks/load_test.py).
+# Scripts and schema setup always use the sync engine.
+DB_ASYNC = os.getenv("DB_ASYNC", "0" if DATABASE_URL.startswith("sqlite") else "1") != "0"
+
+def pool_options(url: str) -> dict:
+    """Pool tuning from the environment; in-memory SQLite keeps SQLAlchemy's single-connection pool."""
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith("sqlite:")): return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") != "0",
+    }
+
+# SQLite storage profile, applied to every new connection (DB_STORAGE_PROFILE; ignored on Postgres):
+# - production: WAL, so readers keep going while a checkout commits, and synchronous=NORMAL, which
+#   fsyncs at checkpoints rather than on every commit (a power cut can lose the last commits but
+#   cannot corrupt the file). Plus a 256 MB mmap window and a 64 MB page cache.
+# - durable: the same, but with an fsync on every commit.
+# - compat: SQLite's defaults (rollback journal, synchronous=FULL), for filesystems without WAL support.
+SQLITE_TUNING = {"mmap_size": 256 * 1024 * 1024, "cache_size": -64 * 1024, "temp_store": "MEMORY"}
+SQLITE_PROFILES = {
+    "production": {"journal_mode": "WAL", "synchronous": "NORMAL", **SQLITE_TUNING},
+    "durable": {"journal_mode": "WAL", "synchronous": "FULL", **SQLITE_TUNING},
+    "compat": {},
+}
+DB_STORAGE_PROFILE = os.getenv("DB_STORAGE_PROFILE", "production")
+
+def apply_storage_profile(bind, profile: str):
+    """Run the profile's PRAGMAs on each connection `bind` opens (pass async_engine.sync_engine for aiosqlite)."""
+    if profile not in SQLITE_PROFILES: raise ValueError(f"DB_STORAGE_PROFILE must be one of {', '.join(SQLITE_PROFILES)}")
+    pragmas = SQLITE_PROFILES[profile]
+    if bind.dialect.name != "sqlite" or not pragmas: return
+
+    @event.listens_for(bind, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items(): cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def async_url(url: str):
+    """Map a sync URL onto its async driver; libpq-only query options become asyncpg connect args."""
+    if url.startswith("sqlite"): return url.replace("sqlite://", "sqlite+aiosqlite://", 1), {}
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    connect_args = {}
+    if query.pop("sslmode", None) not in (None, "disable"): connect_args["ssl"] = "require"
+    query.pop("channel_binding", None)
+    scheme = "postgresql+asyncpg" if parts.scheme.startswith("postgresql") else parts.scheme
+    return urlunsplit((scheme, parts.netloc, parts.path, urlencode(query), parts.fragment)), connect_args
+
 if "sqlite" in DATABASE_URL:
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, **pool_options(DATABASE_URL))
 else:
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
-
-# --- MODELS ---
-class User(Base):
-    __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True)
-    full_name = Column(String)
-    picture = Column(String)
-    role = Column(String, default="Viewer")
-    is_active = Column(Boolean, default=True)
-
-class Product(Base):
-    __tablename__ = "products"
-    id = Column(Integer, primary_key=True, index=True)
-    sku = Column(String, unique=True, index=True)
-    name = Column(String)
-    cost_price = Column(Float)
-    selling_price = Column(Float)
-    stock_quantity = Column(Integer, default=0)
-    category = Column(String)
-    
-    # NEW: Link to Images
-    images = relationship("ProductImage", back_populates="product")
-
-# --- NEW TABLE: PRODUCT IMAGES ---
-class ProductImage(Base):
-    __tablename__ = "product_images"
-    id = Column(Integer, primary_key=True, index=True)
-    product_sku = Column(String, ForeignKey("products.sku"))
-    image_url = Column(String)
-    is_primary = Column(Boolean, default=False)
-    
-    product = relationship("Product", back_populates="images")
-
-class Transaction(Base):
-    __tablename__ = "transactions"
-    id = Column(Integer, primary_key=True, index=True)
-    total_amount = Column(Float)
-    payment_method = Column(String)
-    timestamp = Column(DateTime, default=datetime.datetime.utcnow)
-    items = relationship("TransactionItem", back_populates="transaction")
-
-class TransactionItem(Base):
-    __tablename__ = "transaction_items"
-    id = Column(Integer, primary_key=True, index=True)
-    transaction_id = Column(Integer, ForeignKey("transactions.id"))
-    product_sku = Column(String)
-    quantity = Column(Integer)
-    price_at_sale = Column(Float)
-    transaction = relationship("Transaction", back_populates="items")
-
-class Staff(Base):
-    __tablename__ = "staff"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String)
-    role = Column(String)
-    passcode = Column(String)
-
-class Supplier(Base):
-    __tablename__ = "suppliers"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String)
-    contact_email = Column(String)
-    phone = Column(String)
-
-Base.metadata.create_all(bind=engine)
+apply_storage_profile(engine, DB_STORAGE_PROFILE)
+metrics.instrument(engine)
 
+if DB_ASYNC:
+    ASYNC_DATABASE_URL, async_connect_args = async_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=async_connect_args, **pool_options(DATABASE_URL))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    apply_storage_profile(async_engine.sync_engine, DB_STORAGE_PROFILE)
+    metrics.instrument(async_engine.sync_engine)
 # --- SCHEMAS ---
 class TokenSchema(BaseModel):
     credential: str
@@ -121,7 +141,13 @@ class TransactionItemCreate(BaseModel):
     product_sku: str; quantity: int
 
 class TransactionCreate(BaseModel):
-    payment_method: str; items: List[TransactionItemCreate]
+    payment_method: str; items: List[TransactionItemCreate]; idempotency_key: Optional[str] = None
+
+class QueuedSale(TransactionCreate):
+    idempotency_key: str; timestamp: Optional[datetime.datetime] = None
+
+class TransactionBatch(BaseModel):
+    sales: List[QueuedSale]
 
 class StaffCreate(BaseModel):
     name: str; role: str; passcode: str
@@ -132,8 +158,123 @@ class SupplierCreate(BaseModel):
 class StockUpdate(BaseModel):
     quantity: int
 
+class StaffRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int; name: Optional[str] = None; role: Optional[str] = None; passcode: Optional[str] = None
+
+class SupplierRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int; name: Optional[str] = None; contact_email: Optional[str] = None; phone: Optional[str] = None
+
+class TransactionRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int; total_amount: Optional[float] = None; payment_method: Optional[str] = None
+    timestamp: Optional[datetime.datetime] = None; idempotency_key: Optional[str] = None
+
+class StoreCreate(BaseModel):
+    code: str; name: str
+
+class StoreRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int; code: str; name: Optional[str] = None
+
+class TransferCreate(BaseModel):
+    to_store_id: int; items: List[TransactionItemCreate]; idempotency_key: Optional[str] = None
+
+class TransferItemRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    product_sku: str; quantity: int
+
+class TransferRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int; from_store_id: int; to_store_id: int; created_at: Optional[datetime.datetime] = None
+    idempotency_key: Optional[str] = None; items: List[TransferItemRead] = []
+
+class ProductLookup(BaseModel):
+    skus: List[str]
+
+class PredictBatchRequest(BaseModel):
+    skus: List[str]
+
 # --- APP ---
-app = FastAPI(title="NexusRetail Final Backend")
+def open_store(store_id: int) -> tenancy.StoreState:
+    """Caches, search index, feed and forecasts for one branch; every tunable applies per store."""
+    state = tenancy.StoreState(
+        store_id,
+        products=sku_cache.SkuCache(maxsize=int(os.getenv("SKU_CACHE_SIZE", sku_cache.DEFAULT_MAXSIZE)),
+                                    ttl=float(os.getenv("SKU_CACHE_TTL", sku_cache.DEFAULT_TTL))),
+        search=search_index.ProductSearchIndex(refresh_interval=float(os.getenv("SEARCH_REFRESH", "5")), store_id=store_id),
+        feed=change_feed.CatalogFeed(coalesce=float(os.getenv("CATALOG_FEED_COALESCE", "0.1")), poll=float(os.getenv("CATALOG_FEED_POLL", "1"))),
+        # One snapshot per image variant; each is only built (and kept fresh) once some till asks for it
+        catalogs={variant: catalog_snapshot.CatalogSnapshot(functools.partial(build_catalog_snapshot, store_id, variant),
+                                                            min_interval=float(os.getenv("CATALOG_SNAPSHOT_INTERVAL", catalog_snapshot.MIN_INTERVAL)))
+                  for variant, _ in image_variants.VARIANTS},
+        chat=assistant.AnswerCache(maxsize=int(os.getenv("CHAT_CACHE_SIZE", "256")), ttl=float(os.getenv("CHAT_CACHE_TTL", "60"))),
+        forecasts=forecasting.ForecastEngine(store_id),
+    )
+    # Whatever reaches the tills also invalidates the snapshot and the chat answers; that is how
+    # stock edits and other workers' sales reach them (sales here invalidate directly)
+    state.feed.listeners += [snapshot.refresh_soon for snapshot in state.catalogs.values()] + [state.chat.invalidate]
+    return state
+
+stores = tenancy.StoreRegistry(open_store)
+store_ids = set()  # stores known to exist; reloaded when a request names another one
+
+def load_store_ids() -> set:
+    with SessionLocal() as db: return {i for (i,) in db.query(Store.id)}
+
+def build_search_index(state: tenancy.StoreState):
+    with SessionLocal() as db: state.search.refresh(db)
+
+def catalog_watermark(store_id: int):
+    with SessionLocal() as db: return db.query(func.max(Product.updated_at)).filter(Product.store_id == store_id).scalar()
+
+def feed_rows(store_id: int, skus: List[str], since: Optional[datetime.datetime]) -> list:
+    """Change-feed loader: the marked SKUs plus anything updated at or after `since`, without images."""
+    conditions = ([Product.sku.in_(skus)] if skus else []) + ([Product.updated_at >= since] if since else [])
+    with SessionLocal() as db:
+        q = db.query(*[getattr(Product, f) for f in PRODUCT_FIELDS]).filter(Product.store_id == store_id, or_(*conditions))
+        return [dict(zip(PRODUCT_FIELDS, r)) for r in q]
+
+async def serve_store(state: tenancy.StoreState):
+    """Background work for an open store: warm its search index, then run its change feed."""
+    await run_in_threadpool(build_search_index, state)
+    watermark = await run_in_threadpool(catalog_watermark, state.store_id)
+    await state.feed.run(functools.partial(feed_rows, state.store_id), watermark)
+
+# Schema setup is a startup step, not an import side effect; deployments that run
+# `python migrate.py` themselves can skip it with DB_AUTO_MIGRATE=0.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1") != "0"
+# Parquet snapshot for the /reports/margin, /abc and /dead-stock analytics; 0 leaves the
+# exports to `python export_analytics.py` from cron
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", analytics.DEFAULT_DIR)
+ANALYTICS_SNAPSHOT_INTERVAL = float(os.getenv("ANALYTICS_SNAPSHOT_INTERVAL", "900"))
+# Session token on every route but PUBLIC_PATHS; development (auth.DEV) lets anonymous requests through
+REQUIRE_AUTH = os.getenv("REQUIRE_AUTH", "0" if auth.DEV else "1") != "0"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if DB_AUTO_MIGRATE: await run_in_threadpool(ensure_schema, engine)
+    await run_in_threadpool(build_search_index, stores[DEFAULT_STORE_ID])  # other stores warm up when first used
+    stores.start(serve_store)
+    snapshots = asyncio.ensure_future(analytics.schedule(engine, ANALYTICS_DIR, ANALYTICS_SNAPSHOT_INTERVAL)) if ANALYTICS_SNAPSHOT_INTERVAL > 0 else None
+    yield
+    if snapshots: snapshots.cancel()
+    stores.stop()
+
+# Reachable without a session token: logging in, and the metrics scrape
+PUBLIC_PATHS = {"/auth/login", "/auth/admin-login", "/metrics"}
+
+async def require_session(request: Request, authorization: Optional[str] = Header(None), token: Optional[str] = Query(None)):
+    """
+    App-wide guard: every other route needs a session token, as Authorization: Bearer or as ?token=
+    where headers can't be set (EventSource). With REQUIRE_AUTH=0 requests without one get through.
+    """
+    if request.url.path in PUBLIC_PATHS: return
+    if token and not authorization: authorization = f"Bearer {token}"
+    if authorization or REQUIRE_AUTH: await current_user(authorization)
+
+app = FastAPI(title="NexusRetail Final Backend", lifespan=lifespan, dependencies=[Depends(require_session)])
 
 app.add_middleware(
     CORSMiddleware,
@@ -141,90 +282,886 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Catalog-Version", "Server-Timing"],
 )
+# Outermost, so its latency covers CORS handling too
+app.add_middleware(metrics.MetricsMiddleware)
+
+google_certs = auth.CertCache()
 
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
+class ThreadpoolSession:
+    """DB_ASYNC=0: a sync Session behind AsyncSession's run_sync() interface, run in the threadpool."""
+    def __init__(self, session: Session): self.session = session
+    async def run_sync(self, fn, *args, **kwargs): return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+async def get_db():
+    # Handlers do their DB work in `await db.run_sync(fn, ...)`, so the same code runs on either path
+    if DB_ASYNC:
+        async with AsyncSessionLocal() as db: yield db
+    else:
+        db = SessionLocal()
+        try: yield ThreadpoolSession(db)
+        finally: db.close()
+
+async def current_store(x_store_id: Optional[int] = Header(None), store_id: Optional[int] = Query(None)) -> tenancy.StoreState:
+    """
+    The branch a request is for: the X-Store-Id header, or ?store_id= where headers can't be
+    set (EventSource). Clients that send neither work on the default store.
+    """
+    wanted = x_store_id or store_id or DEFAULT_STORE_ID
+    await require_store(wanted)
+    return stores[wanted]
+
+async def require_store(store_id: int):
+    if store_id in store_ids: return
+    store_ids.update(await run_in_threadpool(load_store_ids))
+    if store_id not in store_ids: raise HTTPException(status_code=404, detail=f"Unknown store: {store_id}")
 
 # --- 1. AUTH ENDPOINTS ---
+def _upsert_user(db: Session, id_info: dict):
+    email = id_info['email']
+    role = "Viewer"
+    if email.lower() in [e.lower() for e in MANAGER_EMAILS]: role = "Manager"
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        user = User(email=email, full_name=id_info.get('name'), picture=id_info.get('picture'), role=role)
+        db.add(user); db.commit(); db.refresh(user)
+    else:
+        if user.role != role and role == "Manager": user.role = role; db.commit()
+    return {"email": user.email, "name": user.full_name, "picture": user.picture, "role": user.role}
+
+def session_response(user: dict) -> dict:
+    return {"status": "success", "user": user, "token": auth.issue_session_token(user), "expires_in": auth.SESSION_TTL}
+
+async def current_user(authorization: Optional[str] = Header(None)) -> dict:
+    """Validate the locally signed session token (Authorization: Bearer ...) without any network I/O."""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        claims = auth.decode_session_token(authorization[7:].strip())
+    except auth.AuthError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    return {"email": claims["sub"], "name": claims.get("name"), "picture": claims.get("picture"), "role": claims.get("role")}
+
 @app.post("/auth/login")
-def login_with_google(token: TokenSchema, db: Session = Depends(get_db)):
+async def login_with_google(token: TokenSchema, db: AsyncSession = Depends(get_db)):
     try:
-        id_info = id_token.verify_oauth2_token(token.credential, google_requests.Request(), GOOGLE_CLIENT_ID)
-        email = id_info['email']
-        role = "Viewer"
-        if email.lower() in [e.lower() for e in MANAGER_EMAILS]: role = "Manager"
-        user = db.query(User).filter(User.email == email).first()
-        if not user:
-            user = User(email=email, full_name=id_info.get('name'), picture=id_info.get('picture'), role=role)
-            db.add(user); db.commit(); db.refresh(user)
-        else:
-            if user.role != role and role == "Manager": user.role = role; db.commit()
-        return {"status": "success", "user": {"email": user.email, "name": user.full_name, "picture": user.picture, "role": user.role}}
+        # Only a cold or expired key set, or a refetch for an unknown key, needs network I/O; keep that off the event loop
+        if google_certs.ready(auth.token_kid(token.credential)): id_info = auth.verify_google_token(token.credential, GOOGLE_CLIENT_ID, google_certs)
+        else: id_info = await run_in_threadpool(auth.verify_google_token, token.credential, GOOGLE_CLIENT_ID, google_certs)
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid Google Token")
+    return session_response(await db.run_sync(_upsert_user, id_info))
 
 @app.post("/auth/admin-login")
-def login_as_admin(creds: AdminLoginSchema):
+async def login_as_admin(creds: AdminLoginSchema):
     if creds.username == ADMIN_USER and (creds.password == ADMIN_PASS_1 or creds.password == ADMIN_PASS_2):
-        return {"status": "success", "user": {"email": "admin@velcrest.com", "name": "Velcrest Admin", "picture": "", "role": "Manager"}}
+        return session_response({"email": "admin@velcrest.com", "name": "Velcrest Admin", "picture": "", "role": "Manager"})
     raise HTTPException(status_code=401, detail="Invalid Credentials")
 
+@app.get("/auth/me")
+async def read_me(user: dict = Depends(current_user)): return {"status": "success", "user": user}
+
+@app.post("/auth/refresh")
+async def refresh_session(user: dict = Depends(current_user)): return session_response(user)
+
 # --- 2. PRODUCT ENDPOINTS ---
+def _create_product(db: Session, store_id: int, product: ProductCreate):
+    if db.query(Product.id).filter(Product.store_id == store_id, Product.sku == product.sku).first(): raise HTTPException(status_code=400, detail="SKU exists")
+    db.add(Product(store_id=store_id, **product.dict())); db.commit()
+
 @app.post("/products/")
-def create_product(product: ProductCreate, db: Session = Depends(get_db)):
-    if db.query(Product).filter(Product.sku == product.sku).first(): raise HTTPException(status_code=400, detail="SKU exists")
-    db.add(Product(**product.dict())); db.commit(); return {"status": "created"}
+async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    await db.run_sync(_create_product, store.store_id, product)
+    store.products.invalidate([product.sku])
+    store.chat.invalidate()
+    store.search.add(product.sku, product.name, product.category)
+    store.feed.mark([product.sku])
+    return {"status": "created"}
+
+PRODUCT_FIELDS = ("id", "sku", "name", "cost_price", "selling_price", "stock_quantity", "category", "updated_at")
+IMAGE_FIELDS = ("id", "product_sku", "image_url", "card_url", "thumb_url", "is_primary")
+IMAGE_EXTRAS = ("images", "image_url")  # every image, or just the primary one's URL (in the variant that fits ?image_width)
+LISTING_FIELDS = PRODUCT_FIELDS + ("image_url",)
+MAX_PAGE_SIZE = 1000
+# Changes committed just before a sync can carry a slightly older updated_at; hand out a
+# version a little behind "now" so those rows are re-sent next time instead of missed.
+SYNC_SKEW = datetime.timedelta(seconds=2)
+
+def to_version(ts: datetime.datetime) -> int:
+    return int((ts - datetime.datetime(1970, 1, 1)).total_seconds() * 1_000_000)
+
+def from_version(version: int) -> datetime.datetime:
+    return datetime.datetime(1970, 1, 1) + datetime.timedelta(microseconds=version)
+
+def catalog_state(db: Session, store_id: int):
+    """(fingerprint, newest product updated_at): identifies a store's catalog, images included, without loading any rows."""
+    count, latest, images, images_latest = db.query(
+        func.count(Product.id), func.max(Product.updated_at),
+        select(func.count(ProductImage.id)).scalar_subquery(), select(func.max(ProductImage.updated_at)).scalar_subquery()
+    ).filter(Product.store_id == store_id).one()
+    return f"{count}:{to_version(latest) if latest else 0}:{images}:{to_version(images_latest) if images_latest else 0}", latest
+
+def catalog_version(latest: Optional[datetime.datetime]) -> int:
+    return min(to_version(latest), to_version(datetime.datetime.utcnow() - SYNC_SKEW)) if latest else 0
+
+def primary_image(images: list):
+    return next((img for img in images if img["is_primary"]), images[0]) if images else None
+
+def product_rows(db: Session, q, with_images: bool = True, with_image_url: bool = False, image_variant: str = "full") -> list:
+    """Materialise a column query over Product as JSON-ready dicts, with images fetched in one IN query."""
+    names = [c["name"] for c in q.column_descriptions]
+    rows = [dict(zip(names, r)) for r in q.all()]
+    for r in rows:
+        if r.get("updated_at"): r["updated_at"] = r["updated_at"].isoformat()
+    if (with_images or with_image_url) and rows:
+        # FIX: one IN query for the page's images instead of a joined cartesian product
+        by_sku = {}
+        img_cols = [getattr(ProductImage, f) for f in IMAGE_FIELDS]
+        for img in db.query(*img_cols).filter(ProductImage.product_sku.in_([r["sku"] for r in rows])).order_by(ProductImage.id):
+            by_sku.setdefault(img.product_sku, []).append(dict(zip(IMAGE_FIELDS, img)))
+        for r in rows:
+            images = by_sku.get(r["sku"], [])
+            if with_images: r["images"] = images
+            if with_image_url: r["image_url"] = image_variants.url_for(primary_image(images) or {}, image_variant)
+    return rows
+
+def build_catalog_snapshot(store_id: int, image_variant: str):
+    """(fingerprint, version, rows) for a store's whole catalog in the default listing shape, with `image_variant` URLs."""
+    with SessionLocal() as db:
+        fingerprint, latest = catalog_state(db, store_id)  # read first, so the rows are at least this new
+        q = db.query(*[getattr(Product, f) for f in PRODUCT_FIELDS]).filter(Product.store_id == store_id).order_by(Product.id)
+        rows = product_rows(db, q, with_images=False, with_image_url=True, image_variant=image_variant)
+        return f"{fingerprint}:{image_variant}", catalog_version(latest), rows
 
 @app.get("/products/")
-def read_products(db: Session = Depends(get_db)):
-    # FIX: Use joinedload to force the database to pull the images in the same query
-    return db.query(Product).options(joinedload(Product.images)).all()
+async def read_products(request: Request, after: Optional[int] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                        fields: Optional[str] = None, since: Optional[int] = None, image_width: Optional[int] = Query(None, ge=1),
+                        db: AsyncSession = Depends(get_db),
+                        store: tenancy.StoreState = Depends(current_store)):
+    """
+    Catalog listing for the request's store.
+    - after/limit: keyset pagination on id; X-Next-Cursor carries the next `after` value.
+    - fields: comma-separated projection (id is always included). Defaults to every column plus
+      `image_url`, the primary image; `images` lists them all. Either also pulls in sku.
+    - since: only products changed after that X-Catalog-Version (delta sync).
+    - image_width: device pixels the view draws product images at; `image_url` is then the smallest
+      WebP variant at least that wide instead of the full-size one.
+    Unchanged responses cost a 304 via a strong ETag derived from the catalog fingerprint. The
+    whole catalog comes from a pre-encoded (and pre-compressed) snapshot.
+    """
+    if_none_match = request.headers.get("if-none-match", "")
+    if after is None and limit is None and fields is None and since is None:
+        fingerprint, _ = await db.run_sync(catalog_state, store.store_id)
+        variant = image_variants.pick(image_width)
+        snapshot = await store.catalogs[variant].get(f"{fingerprint}:{variant}")  # the variant is part of the body, so of the ETag
+        return snapshot.response(if_none_match, request.headers.get("accept-encoding", ""))
+    wanted = LISTING_FIELDS
+    if fields:
+        wanted = tuple(dict.fromkeys(["id"] + [f.strip() for f in fields.split(",") if f.strip()]))
+        unknown = [f for f in wanted if f not in PRODUCT_FIELDS and f not in IMAGE_EXTRAS]
+        if unknown: raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        if any(f in wanted for f in IMAGE_EXTRAS) and "sku" not in wanted: wanted += ("sku",)
+    return await db.run_sync(_read_products, store.store_id, if_none_match, after, limit, wanted, since, image_variants.pick(image_width))
+
+def _read_products(db: Session, store_id: int, if_none_match: str, after, limit, wanted, since, image_variant: str):
+    catalog_fingerprint, latest = catalog_state(db, store_id)
+    fingerprint = f"{catalog_fingerprint}:{after}:{limit}:{','.join(wanted)}:{since}:{image_variant}"
+    etag = '"' + hashlib.sha1(fingerprint.encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "X-Catalog-Version": str(catalog_version(latest)), "Cache-Control": "no-cache"}
+    if etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    columns = [getattr(Product, f) for f in wanted if f in PRODUCT_FIELDS]
+    q = db.query(*columns).filter(Product.store_id == store_id).order_by(Product.id)
+    if since is not None: q = q.filter(Product.updated_at > from_version(since))
+    if after is not None: q = q.filter(Product.id > after)
+    if limit: q = q.limit(limit)
+    rows = product_rows(db, q, with_images="images" in wanted, with_image_url="image_url" in wanted, image_variant=image_variant)
+    if limit and len(rows) == limit: headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    return JSONResponse(content=rows, headers=headers)
+
+def _load_products(db: Session, store_id: int, skus: List[str]) -> dict:
+    q = db.query(*[getattr(Product, f) for f in PRODUCT_FIELDS]).filter(Product.store_id == store_id, Product.sku.in_(skus))
+    return {r["sku"]: r for r in product_rows(db, q)}
+
+async def cached_products(db: AsyncSession, store: tenancy.StoreState, skus: List[str]) -> dict:
+    # Only cache misses touch the database
+    found, missing, generation = store.products.lookup(skus)
+    if missing:
+        loaded = await db.run_sync(_load_products, store.store_id, missing)
+        store.products.store(loaded, generation)
+        found.update(loaded)
+    return found
+
+@app.get("/products/cache/stats")
+async def product_cache_stats(store: tenancy.StoreState = Depends(current_store)):
+    return {**store.products.stats(), "snapshots": {variant: snapshot.stats() for variant, snapshot in store.catalogs.items()}, "chat": store.chat.stats()}
+
+@app.post("/products/lookup")
+async def lookup_products(req: ProductLookup, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    """Batch barcode resolution; unknown SKUs are listed under `missing`."""
+    skus = list(dict.fromkeys(req.skus))
+    if len(skus) > 1000: raise HTTPException(status_code=400, detail="Too many SKUs (max 1000)")
+    found = await cached_products(db, store, skus)
+    return {"products": [found[s] for s in skus if s in found], "missing": [s for s in skus if s not in found]}
+
+@app.get("/products/search")
+async def search_products(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_db),
+                          store: tenancy.StoreState = Depends(current_store)):
+    """Typo-tolerant search over sku, name and category for when a barcode won't scan; best match first."""
+    # Imports and other workers are picked up by updated_at every SEARCH_REFRESH seconds
+    if store.search.stale: await db.run_sync(store.search.refresh)
+    ranked = store.search.search(q, limit)
+    found = await cached_products(db, store, [sku for sku, _ in ranked])
+    return [dict(found[sku], score=score) for sku, score in ranked if sku in found]
+
+@app.get("/products/stream")
+async def stream_products(request: Request, since: Optional[str] = None, store: tenancy.StoreState = Depends(current_store)):
+    """
+    Server-sent events with per-SKU product patches as the store's stock, prices and catalog change.
+    Resumes from Last-Event-ID (or ?since=<event id>); a `resync` event means catch up with
+    GET /products/?since=<X-Catalog-Version> first. EventSource can't send headers: pass ?store_id=.
+    """
+    return StreamingResponse(store.feed.stream(request.headers.get("last-event-id") or since), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/products/{sku}")
+async def read_product(sku: str, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    """Scan-to-price: one product by SKU/barcode, served from the store's in-process SKU cache."""
+    product = (await cached_products(db, store, [sku])).get(sku)
+    if product is None: raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+def _update_stock(db: Session, store_id: int, sku: str, stock: StockUpdate):
+    p = db.query(Product).filter(Product.store_id == store_id, Product.sku == sku).first()
+    if not p: return None
+    p.stock_quantity = stock.quantity
+    indexed = (p.sku, p.name, p.category)
+    db.commit()
+    return indexed
 
 @app.put("/products/{sku}/stock")
-def update_stock(sku: str, stock: StockUpdate, db: Session = Depends(get_db)):
-    p = db.query(Product).filter(Product.sku == sku).first()
-    if p: p.stock_quantity = stock.quantity; db.commit()
+async def update_stock(sku: str, stock: StockUpdate, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    indexed = await db.run_sync(_update_stock, store.store_id, sku, stock)
+    store.products.invalidate([sku])
+    store.chat.invalidate()  # stock answers
+    if indexed: store.search.add(*indexed)  # no-op unless this worker hadn't seen the product yet
+    store.feed.mark([sku])
     return {"status": "updated"}
 
 # --- 3. TRANSACTION ENDPOINTS ---
 @app.post("/transactions/")
-def create_transaction(txn: TransactionCreate, db: Session = Depends(get_db)):
-    total = 0.0
-    for item in txn.items:
-        p = db.query(Product).filter(Product.sku == item.product_sku).first()
-        if not p: raise HTTPException(status_code=404, detail="Product not found")
-        total += p.selling_price * item.quantity
-    new_txn = Transaction(total_amount=total, payment_method=txn.payment_method)
-    db.add(new_txn); db.commit(); db.refresh(new_txn)
+async def create_transaction(txn: TransactionCreate, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    result = await db.run_sync(_create_transaction, store.store_id, txn)
+    store.forecasts.invalidate()
+    store.chat.invalidate()
+    store.products.invalidate([item.product_sku for item in txn.items])
+    if result["status"] == "success": store.feed.mark([item.product_sku for item in txn.items])
+    return result
+
+def decrement_stock(db: Session, store_id: int, qty_by_sku: dict) -> bool:
+    """
+    Conditional decrement: the WHERE clause is evaluated under the row lock, so two
+    lanes selling the same SKU can never both take the last unit or lose an update.
+    False when any SKU is short; the caller must roll back.
+    """
+    products = Product.__table__
+    decrement = (
+        update(products)
+        .where(products.c.store_id == store_id, products.c.sku == bindparam("b_sku"), products.c.stock_quantity >= bindparam("b_qty"))
+        .values(stock_quantity=products.c.stock_quantity - bindparam("b_qty"))
+    )
+    params = [{"b_sku": sku, "b_qty": qty} for sku, qty in qty_by_sku.items()]
+    if db.bind.dialect.supports_sane_multi_rowcount:
+        decremented = db.execute(decrement, params).rowcount
+    else:
+        decremented = sum(db.execute(decrement, p).rowcount for p in params)
+    return decremented == len(qty_by_sku)
+
+def stock_conflict(db: Session, store_id: int, qty_by_sku: dict, during: str) -> HTTPException:
+    """The 409 for a failed decrement (after the rollback): the SKU that is short, or a retry hint if none is any more."""
+    stock = dict(db.query(Product.sku, Product.stock_quantity).filter(Product.store_id == store_id, Product.sku.in_(list(qty_by_sku))).all())
+    short = next((sku for sku, qty in qty_by_sku.items() if (stock.get(sku) or 0) < qty), None)
+    return HTTPException(status_code=409, detail=f"Insufficient stock for {short}" if short else f"Stock changed during {during}, please retry")
+
+def recorded_sales(db: Session, store_id: int, keys) -> dict:
+    """{idempotency_key: {transaction_id, total_amount}} for keys that already have a sale in the store."""
+    keys = [k for k in keys if k]
+    if not keys: return {}
+    q = (db.query(Transaction.idempotency_key, Transaction.id, Transaction.total_amount)
+         .filter(Transaction.store_id == store_id, Transaction.idempotency_key.in_(keys)))
+    return {k: {"transaction_id": tid, "total_amount": total} for k, tid, total in q}
+
+def _create_transaction(db: Session, store_id: int, txn: TransactionCreate):
+    # A till retrying a checkout whose response it never saw gets the original sale back
+    done = recorded_sales(db, store_id, [txn.idempotency_key]).get(txn.idempotency_key)
+    if done: return {"status": "duplicate", **done}
+
+    # Merge repeated lines so each SKU is priced and decremented exactly once
+    qty_by_sku = {}
     for item in txn.items:
-        p = db.query(Product).filter(Product.sku == item.product_sku).first()
-        p.stock_quantity -= item.quantity
-        db.add(TransactionItem(transaction_id=new_txn.id, product_sku=item.product_sku, quantity=item.quantity, price_at_sale=p.selling_price))
+        if item.quantity <= 0: raise HTTPException(status_code=400, detail=f"Invalid quantity for {item.product_sku}")
+        qty_by_sku[item.product_sku] = qty_by_sku.get(item.product_sku, 0) + item.quantity
+    if not qty_by_sku: raise HTTPException(status_code=400, detail="Cart is empty")
+
+    # One bulk fetch prices the whole basket
+    rows = db.query(Product.sku, Product.selling_price, Product.category).filter(Product.store_id == store_id, Product.sku.in_(list(qty_by_sku))).all()
+    prices = {sku: price for sku, price, _ in rows}
+    categories = {sku: category for sku, _, category in rows}
+    missing = [sku for sku in qty_by_sku if sku not in prices]
+    if missing: raise HTTPException(status_code=404, detail=f"Product not found: {missing[0]}")
+
+    if not decrement_stock(db, store_id, qty_by_sku):
+        db.rollback()
+        raise stock_conflict(db, store_id, qty_by_sku, "checkout")
+
+    # Header, lines and rollups go in with the decrements as one atomic commit
+    now = datetime.datetime.utcnow()
+    total = sum(prices[item.product_sku] * item.quantity for item in txn.items)
+    new_txn = Transaction(store_id=store_id, total_amount=total, payment_method=txn.payment_method, timestamp=now, idempotency_key=txn.idempotency_key)
+    new_txn.items = [TransactionItem(product_sku=item.product_sku, quantity=item.quantity, price_at_sale=prices[item.product_sku]) for item in txn.items]
+    db.add(new_txn)
+    lines = [(item.product_sku, categories[item.product_sku], item.quantity, prices[item.product_sku]) for item in txn.items]
+    apply_rollups(db, rollup_rows(store_id, [(now, txn.payment_method, lines)]))
+    try:
+        db.commit()
+    except IntegrityError:
+        # The same key landed concurrently (e.g. through /transactions/batch); that one stands
+        db.rollback()
+        done = recorded_sales(db, store_id, [txn.idempotency_key]).get(txn.idempotency_key)
+        if not done: raise
+        return {"status": "duplicate", **done}
+    return {"status": "success", "transaction_id": new_txn.id, "total_amount": total}
+
+MAX_BATCH_SALES = 1000
+BATCH_ATTEMPTS = 3
+
+@app.post("/transactions/batch")
+async def create_transactions_batch(batch: TransactionBatch, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    """
+    Upload sales a till queued while offline, in one round trip. Every sale carries a
+    client-generated idempotency_key, so re-sending a batch never double-counts, and the
+    time it was rung up. Results come back per sale, in request order: `created`,
+    `duplicate` (already recorded; the original transaction is returned) or `failed`.
+    """
+    if len(batch.sales) > MAX_BATCH_SALES: raise HTTPException(status_code=400, detail=f"Too many sales (max {MAX_BATCH_SALES})")
+    results = await db.run_sync(_create_transactions_batch, store.store_id, batch.sales)
+    if any(r["status"] == "created" for r in results):
+        store.forecasts.invalidate()
+        store.chat.invalidate()
+        store.products.invalidate(list({item.product_sku for sale in batch.sales for item in sale.items}))
+        store.feed.mark({item.product_sku for sale, r in zip(batch.sales, results) if r["status"] == "created" for item in sale.items})
+    counts = {status: sum(r["status"] == status for r in results) for status in ("created", "duplicate", "failed")}
+    return {"results": results, **counts}
+
+def sale_time(ts: Optional[datetime.datetime], now: datetime.datetime) -> datetime.datetime:
+    """Naive UTC like every other timestamp; a till whose clock runs fast can't book sales in the future."""
+    if ts is None: return now
+    if ts.tzinfo is not None: ts = ts.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return min(ts, now)
+
+def _create_transactions_batch(db: Session, store_id: int, sales: List[QueuedSale]) -> list:
+    results, first, repeats = {}, {}, {}
+    for i, sale in enumerate(sales):
+        key = sale.idempotency_key
+        failed = lambda detail: {"idempotency_key": key, "status": "failed", "detail": detail}
+        if not key: results[i] = failed("Missing idempotency_key")
+        elif key in first: repeats[i] = first[key]
+        elif not sale.items: results[i] = failed("Cart is empty")
+        elif any(item.quantity <= 0 for item in sale.items): results[i] = failed("Invalid quantity")
+        else: first[key] = i
+
+    for _ in range(BATCH_ATTEMPTS):
+        try:
+            applied = _apply_batch(db, store_id, sales, list(first.values()))
+        except IntegrityError:
+            applied = None  # a concurrent upload recorded one of these keys first; the retry sees it
+        if applied is not None:
+            results.update(applied)
+            break
+        db.rollback()
+    else:
+        for key, i in first.items(): results[i] = {"idempotency_key": key, "status": "failed", "detail": "Stock changed during upload, please retry"}
+
+    for i, j in repeats.items():
+        results[i] = dict(results[j], status="duplicate") if results[j]["status"] != "failed" else dict(results[j])
+    return [results[i] for i in range(len(sales))]
+
+def _apply_batch(db: Session, store_id: int, sales: List[QueuedSale], indexes: List[int]):
+    """
+    One attempt at recording the given sales: a handful of set-based statements and one
+    commit. Returns {index: result}, or None when stock moved between the read and the
+    decrement (the caller rolls back and retries).
+    """
+    done = recorded_sales(db, store_id, [sales[i].idempotency_key for i in indexes])
+    results = {i: {"idempotency_key": sales[i].idempotency_key, "status": "duplicate", **done[sales[i].idempotency_key]}
+               for i in indexes if sales[i].idempotency_key in done}
+    todo = [i for i in indexes if i not in results]
+    if not todo: return results
+
+    skus = list({item.product_sku for i in todo for item in sales[i].items})
+    rows = (db.query(Product.sku, Product.selling_price, Product.category, Product.stock_quantity)
+            .filter(Product.store_id == store_id, Product.sku.in_(skus)).with_for_update().all())
+    prices = {sku: price for sku, price, _, _ in rows}
+    categories = {sku: category for sku, _, category, _ in rows}
+    available = {sku: stock or 0 for sku, _, _, stock in rows}
+
+    # Allocate stock in the order the sales happened, so the earliest win when it runs short
+    now = datetime.datetime.utcnow()
+    times = {i: sale_time(sales[i].timestamp, now) for i in todo}
+    accepted, taken = [], {}
+    for i in sorted(todo, key=lambda i: (times[i], i)):
+        qty_by_sku = {}
+        for item in sales[i].items: qty_by_sku[item.product_sku] = qty_by_sku.get(item.product_sku, 0) + item.quantity
+        missing = next((sku for sku in qty_by_sku if sku not in prices), None)
+        short = next((sku for sku, qty in qty_by_sku.items() if available[sku] - taken.get(sku, 0) < qty), None) if missing is None else None
+        if missing or short:
+            detail = f"Product not found: {missing}" if missing else f"Insufficient stock for {short}"
+            results[i] = {"idempotency_key": sales[i].idempotency_key, "status": "failed", "detail": detail}
+            continue
+        for sku, qty in qty_by_sku.items(): taken[sku] = taken.get(sku, 0) + qty
+        accepted.append(i)
+    if not accepted:
+        db.rollback()
+        return results
+    if not decrement_stock(db, store_id, taken): return None
+
+    t = Transaction.__table__
+    totals = {i: sum(prices[item.product_sku] * item.quantity for item in sales[i].items) for i in accepted}
+    ids = dict(db.execute(insert(t).returning(t.c.idempotency_key, t.c.id), [
+        {"store_id": store_id, "total_amount": totals[i], "payment_method": sales[i].payment_method, "timestamp": times[i], "idempotency_key": sales[i].idempotency_key}
+        for i in accepted]).all())
+    db.execute(insert(TransactionItem.__table__), [
+        {"transaction_id": ids[sales[i].idempotency_key], "product_sku": item.product_sku, "quantity": item.quantity, "price_at_sale": prices[item.product_sku]}
+        for i in accepted for item in sales[i].items])
+    apply_rollups(db, rollup_rows(store_id, [
+        (times[i], sales[i].payment_method, [(item.product_sku, categories[item.product_sku], item.quantity, prices[item.product_sku]) for item in sales[i].items])
+        for i in accepted]))
+    db.commit()
+    for i in accepted:
+        results[i] = {"idempotency_key": sales[i].idempotency_key, "status": "created", "transaction_id": ids[sales[i].idempotency_key], "total_amount": totals[i]}
+    return results
+
+@app.get("/transactions/", response_model=List[TransactionRead])
+async def read_transactions(db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    return await db.run_sync(lambda s: s.query(Transaction).filter(Transaction.store_id == store.store_id).all())
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_COLUMNS = ("transaction_id", "timestamp", "payment_method", "total_amount", "product_sku", "quantity", "price_at_sale")
+EXPORT_YIELD_PER = 2000      # rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK = 64 * 1024     # bytes buffered before a chunk is sent
+
+@app.get("/transactions/export")
+async def export_transactions(request: Request, format: str = "ndjson", start: Optional[datetime.datetime] = None,
+                              end: Optional[datetime.datetime] = None, payment_method: Optional[str] = None,
+                              store: tenancy.StoreState = Depends(current_store)):
+    """
+    Stream the store's sales with their line items; `end` is exclusive. NDJSON is one transaction per line with
+    nested items, CSV one row per line item. Gzipped on the fly when the client accepts it.
+    """
+    if format not in EXPORT_FORMATS: raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    body = export_chunks(format, store.store_id, start, end, payment_method)
+    headers = {"Content-Disposition": f'attachment; filename="transactions.{format}"', "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[format], headers=headers)
+
+def export_chunks(fmt: str, store_id: int, start, end, payment_method):
+    """
+    Sync generator, iterated by StreamingResponse in the threadpool. One ordered outer join
+    read through a server-side cursor, so memory stays flat whatever the date range. Uses the
+    sync engine on both DB paths: it holds its own connection for the life of the stream.
+    """
+    t, i = Transaction.__table__, TransactionItem.__table__
+    q = (select(t.c.id, t.c.timestamp, t.c.payment_method, t.c.total_amount, i.c.product_sku, i.c.quantity, i.c.price_at_sale)
+         .select_from(t.outerjoin(i, i.c.transaction_id == t.c.id))
+         .where(t.c.store_id == store_id)
+         .order_by(t.c.id, i.c.id))
+    if start: q = q.where(t.c.timestamp >= start)
+    if end: q = q.where(t.c.timestamp < end)
+    if payment_method: q = q.where(t.c.payment_method == payment_method)
+
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    if fmt == "csv": writer.writerow(EXPORT_COLUMNS)
+    current = None
+    with engine.connect() as conn:
+        rows = conn.execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER).execute(q)
+        for txn_id, ts, payment, total, sku, qty, price in rows:
+            if fmt == "csv":
+                writer.writerow((txn_id, ts.isoformat() if ts else "", payment, total, sku, qty, price))
+            else:
+                if current is None or current["transaction_id"] != txn_id:
+                    if current is not None: buf.write(json.dumps(current) + "\n")
+                    current = {"transaction_id": txn_id, "timestamp": ts.isoformat() if ts else None,
+                               "payment_method": payment, "total_amount": total, "items": []}
+                if sku is not None: current["items"].append({"product_sku": sku, "quantity": qty, "price_at_sale": price})
+            if buf.tell() >= EXPORT_CHUNK:
+                yield buf.getvalue().encode()
+                buf.seek(0); buf.truncate()
+    if current is not None: buf.write(json.dumps(current) + "\n")
+    if buf.tell(): yield buf.getvalue().encode()
+
+def gzip_chunks(chunks, level: int = 6):
+    """Compress a byte stream incrementally (gzip container) instead of buffering the whole body."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out: yield out
+    yield z.flush()
+
+# --- 3b. SALES ROLLUPS & REPORTS ---
+ROLLUP_GRANULARITIES = ("hour", "day")
+ROLLUP_DIMENSIONS = ("sku", "category", "payment")
+UNCATEGORISED = "Uncategorised"
+
+def truncate(ts: datetime.datetime, granularity: str) -> datetime.datetime:
+    if granularity == "hour": return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def rollup_rows(store_id: int, sales):
+    """
+    Fold one store's sales into rollup increments.
+    sales: iterable of (timestamp, payment_method, [(sku, category, quantity, unit_price), ...])
+    Rows are merged per (granularity, dimension, key, bucket) so one upsert never touches a row twice.
+    """
+    acc = {}
+    def add(key, units, revenue):
+        row = acc.setdefault(key, [0, 0.0, 0])
+        row[0] += units; row[1] += revenue; row[2] += 1
+    for ts, payment_method, lines in sales:
+        per_dim = {"sku": {}, "category": {}}
+        for sku, category, qty, price in lines:
+            for dim, key in (("sku", sku), ("category", category or UNCATEGORISED)):
+                units, revenue = per_dim[dim].get(key, (0, 0.0))
+                per_dim[dim][key] = (units + qty, revenue + qty * price)
+        per_dim["payment"] = {payment_method: (sum(l[2] for l in lines), sum(l[2] * l[3] for l in lines))}
+        for granularity in ROLLUP_GRANULARITIES:
+            bucket = truncate(ts, granularity)
+            for dim, groups in per_dim.items():
+                for key, (units, revenue) in groups.items():
+                    add((granularity, dim, key, bucket), units, revenue)
+    return [{"store_id": store_id, "granularity": g, "dimension": d, "key": k, "bucket": b, "units": u, "revenue": r, "transactions": n}
+            for (g, d, k, b), (u, r, n) in acc.items()]
+
+def apply_rollups(db: Session, rows):
+    """Increment rollup rows with one INSERT .. ON CONFLICT DO UPDATE executemany."""
+    if not rows: return
+    if db.bind.dialect.name == "postgresql": from sqlalchemy.dialects.postgresql import insert as upsert
+    else: from sqlalchemy.dialects.sqlite import insert as upsert
+    table = SalesRollup.__table__
+    stmt = upsert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["store_id", "granularity", "dimension", "key", "bucket"],
+        set_={"units": table.c.units + stmt.excluded.units, "revenue": table.c.revenue + stmt.excluded.revenue,
+              "transactions": table.c.transactions + stmt.excluded.transactions},
+    )
+    db.execute(stmt, rows)
+
+def _bucket_expr(column, granularity: str, dialect: str):
+    if dialect == "postgresql": return func.date_trunc(granularity, column)
+    # Match SQLAlchemy's SQLite DateTime storage format so rebuilt and live rows share buckets
+    fmt = "%Y-%m-%d %H:00:00.000000" if granularity == "hour" else "%Y-%m-%d 00:00:00.000000"
+    return func.strftime(fmt, column)
+
+def rebuild_rollups(db: Session):
+    """Recompute every rollup row from transactions/transaction_items with set-based INSERT .. SELECT."""
+    dialect = db.bind.dialect.name
+    table = SalesRollup.__table__
+    t, ti, p = Transaction.__table__, TransactionItem.__table__, Product.__table__
+    db.execute(table.delete())
+    cols = ["store_id", "granularity", "dimension", "key", "bucket", "units", "revenue", "transactions"]
+    for granularity in ROLLUP_GRANULARITIES:
+        bucket = _bucket_expr(t.c.timestamp, granularity, dialect).label("bucket")
+        keys = {
+            "sku": ti.c.product_sku,
+            "category": func.coalesce(p.c.category, UNCATEGORISED),
+            "payment": t.c.payment_method,
+        }
+        for dimension, key in keys.items():
+            source = ti.join(t, t.c.id == ti.c.transaction_id)
+            if dimension == "category": source = source.outerjoin(p, and_(p.c.store_id == t.c.store_id, p.c.sku == ti.c.product_sku))
+            query = (
+                select(
+                    t.c.store_id, literal(granularity), literal(dimension), key, bucket,
+                    func.sum(ti.c.quantity), func.sum(ti.c.quantity * ti.c.price_at_sale), func.count(distinct(t.c.id)),
+                )
+                .select_from(source)
+                .where(t.c.timestamp.isnot(None))
+                .group_by(t.c.store_id, key, bucket)
+            )
+            db.execute(insert(table).from_select(cols, query))
     db.commit()
-    return {"status": "success"}
 
-@app.get("/transactions/")
-def read_transactions(db: Session = Depends(get_db)): return db.query(Transaction).all()
+def _rollup_granularity(start, end):
+    aligned = all(ts is None or ts == truncate(ts, "day") for ts in (start, end))
+    return "day" if aligned else "hour"
+
+@app.get("/reports/sales")
+async def report_sales(dimension: str = "payment", granularity: Optional[str] = None, key: Optional[str] = None,
+                       start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None, db: AsyncSession = Depends(get_db),
+                       store: tenancy.StoreState = Depends(current_store)):
+    """Time series of the store's sales from the rollups only; `end` is exclusive."""
+    if dimension not in ROLLUP_DIMENSIONS: raise HTTPException(status_code=400, detail=f"dimension must be one of {', '.join(ROLLUP_DIMENSIONS)}")
+    granularity = granularity or _rollup_granularity(start, end)
+    if granularity not in ROLLUP_GRANULARITIES: raise HTTPException(status_code=400, detail="granularity must be hour or day")
+    return await db.run_sync(_report_sales, store.store_id, dimension, granularity, key, start, end)
+
+def _report_sales(db: Session, store_id: int, dimension, granularity, key, start, end):
+    q = db.query(SalesRollup.bucket, SalesRollup.key, SalesRollup.units, SalesRollup.revenue, SalesRollup.transactions).filter(
+        SalesRollup.store_id == store_id, SalesRollup.granularity == granularity, SalesRollup.dimension == dimension)
+    if key is not None: q = q.filter(SalesRollup.key == key)
+    if start: q = q.filter(SalesRollup.bucket >= truncate(start, granularity))
+    if end: q = q.filter(SalesRollup.bucket < end)
+    return [{"bucket": b.isoformat(), "key": k, "units": u, "revenue": round(r or 0.0, 2), "transactions": n}
+            for b, k, u, r, n in q.order_by(SalesRollup.bucket, SalesRollup.key)]
+
+@app.get("/reports/summary")
+async def report_summary(start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None, db: AsyncSession = Depends(get_db),
+                         store: tenancy.StoreState = Depends(current_store)):
+    """The store's revenue/units/transactions for a range, split by payment method, from the payment rollups."""
+    return await db.run_sync(_report_summary, store.store_id, start, end)
+
+def _rollup_totals(db: Session, store_id: int, dimension: str, start, end) -> dict:
+    """{key: units/revenue/transactions} summed over [start, end) for one store and rollup dimension."""
+    granularity = _rollup_granularity(start, end)
+    q = db.query(SalesRollup.key, func.sum(SalesRollup.units), func.sum(SalesRollup.revenue), func.sum(SalesRollup.transactions)).filter(
+        SalesRollup.store_id == store_id, SalesRollup.granularity == granularity, SalesRollup.dimension == dimension)
+    if start: q = q.filter(SalesRollup.bucket >= truncate(start, granularity))
+    if end: q = q.filter(SalesRollup.bucket < end)
+    return {k: {"units": int(u or 0), "revenue": round(r or 0.0, 2), "transactions": int(n or 0)} for k, u, r, n in q.group_by(SalesRollup.key)}
+
+def _report_summary(db: Session, store_id: int, start, end):
+    by_payment = _rollup_totals(db, store_id, "payment", start, end)
+    return {
+        "revenue": round(sum(v["revenue"] for v in by_payment.values()), 2),
+        "units": sum(v["units"] for v in by_payment.values()),
+        "transactions": sum(v["transactions"] for v in by_payment.values()),
+        "by_payment": by_payment,
+    }
+
+# Heavier analytics run over the columnar snapshot (analytics.py), never the live tables
+def _analytics_report(name: str, *args) -> dict:
+    state = analytics.read_state(ANALYTICS_DIR)
+    if not state: raise HTTPException(status_code=503, detail="Analytics snapshot not built yet; run python export_analytics.py")
+    return analytics.report(ANALYTICS_DIR, state, name, *args)
+
+@app.get("/reports/margin")
+async def report_margin(days: int = Query(30, ge=1, le=3660), store: tenancy.StoreState = Depends(current_store)):
+    """Revenue, cost and gross margin by category over the snapshot's last `days` days."""
+    return await run_in_threadpool(_analytics_report, "margin", store.store_id, days)
+
+@app.get("/reports/abc")
+async def report_abc(days: int = Query(90, ge=1, le=3660), limit: int = Query(100, ge=0, le=100000), store: tenancy.StoreState = Depends(current_store)):
+    """ABC classes by revenue (A: first 80%, B: next 15%, C: the rest and non-sellers); `items` lists the top `limit` SKUs."""
+    return await run_in_threadpool(_analytics_report, "abc", store.store_id, days, limit)
+
+@app.get("/reports/dead-stock")
+async def report_dead_stock(days: int = Query(90, ge=1, le=3660), min_cover_days: float = Query(180, ge=0), limit: int = Query(100, ge=0, le=100000),
+                            store: tenancy.StoreState = Depends(current_store)):
+    """Stocked SKUs with no sales in `days` days, or at least `min_cover_days` days of cover at that rate, by stock value."""
+    return await run_in_threadpool(_analytics_report, "dead_stock", store.store_id, days, min_cover_days, limit)
 
 # --- 4. STAFF & SUPPLIERS ---
+def _add(db: Session, obj): db.add(obj); db.commit()
+
 @app.post("/staff/")
-def create_staff(s: StaffCreate, db: Session = Depends(get_db)): db.add(Staff(**s.dict())); db.commit(); return {"status": "success"}
-@app.get("/staff/")
-def get_staff(db: Session = Depends(get_db)): return db.query(Staff).all()
+async def create_staff(s: StaffCreate, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    await db.run_sync(_add, Staff(store_id=store.store_id, **s.dict())); return {"status": "success"}
+@app.get("/staff/", response_model=List[StaffRead])
+async def get_staff(db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    return await db.run_sync(lambda s: s.query(Staff).filter(Staff.store_id == store.store_id).all())
 @app.post("/suppliers/")
-def create_supplier(s: SupplierCreate, db: Session = Depends(get_db)): db.add(Supplier(**s.dict())); db.commit(); return {"status": "success"}
-@app.get("/suppliers/")
-def get_suppliers(db: Session = Depends(get_db)): return db.query(Supplier).all()
+async def create_supplier(s: SupplierCreate, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    await db.run_sync(_add, Supplier(store_id=store.store_id, **s.dict())); return {"status": "success"}
+@app.get("/suppliers/", response_model=List[SupplierRead])
+async def get_suppliers(db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    return await db.run_sync(lambda s: s.query(Supplier).filter(Supplier.store_id == store.store_id).all())
+
+# --- 4b. STORES & TRANSFERS ---
+def _create_store(db: Session, s: StoreCreate) -> int:
+    if db.query(Store.id).filter(Store.code == s.code).first(): raise HTTPException(status_code=400, detail="Store code exists")
+    store = Store(code=s.code, name=s.name)
+    db.add(store); db.commit()
+    return store.id
+
+@app.post("/stores/")
+async def create_store(s: StoreCreate, db: AsyncSession = Depends(get_db)):
+    store_id = await db.run_sync(_create_store, s)
+    store_ids.add(store_id)
+    return {"status": "created", "id": store_id}
+
+@app.get("/stores/", response_model=List[StoreRead])
+async def get_stores(db: AsyncSession = Depends(get_db)): return await db.run_sync(lambda s: s.query(Store).order_by(Store.id).all())
+
+@app.post("/transfers/")
+async def create_transfer(t: TransferCreate, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    """
+    Move stock from the request's store to `to_store_id` in one commit. The source is decremented
+    conditionally, like a checkout; SKUs the destination doesn't stock yet are listed there with
+    the source's name, prices and category. Retrying with the same idempotency_key is safe.
+    """
+    if t.to_store_id == store.store_id: raise HTTPException(status_code=400, detail="Cannot transfer to the same store")
+    await require_store(t.to_store_id)
+    result = await db.run_sync(_create_transfer, store.store_id, t)
+    if result["status"] == "success":
+        skus = list({item.product_sku for item in t.items})
+        for state in (store, stores.get(t.to_store_id)):  # a destination nobody has used here has nothing cached
+            if state is None: continue
+            state.products.invalidate(skus)
+            state.chat.invalidate()
+            state.feed.mark(skus)
+    return result
+
+def _create_transfer(db: Session, from_store: int, t: TransferCreate):
+    done = transfer_by_key(db, t.idempotency_key)
+    if done: return {"status": "duplicate", "transfer_id": done}
+    qty_by_sku = {}
+    for item in t.items:
+        if item.quantity <= 0: raise HTTPException(status_code=400, detail=f"Invalid quantity for {item.product_sku}")
+        qty_by_sku[item.product_sku] = qty_by_sku.get(item.product_sku, 0) + item.quantity
+    if not qty_by_sku: raise HTTPException(status_code=400, detail="Nothing to transfer")
+
+    fields = (Product.sku, Product.name, Product.cost_price, Product.selling_price, Product.category)
+    source = {r.sku: r for r in db.query(*fields).filter(Product.store_id == from_store, Product.sku.in_(list(qty_by_sku)))}
+    missing = [sku for sku in qty_by_sku if sku not in source]
+    if missing: raise HTTPException(status_code=404, detail=f"Product not found: {missing[0]}")
+    if not decrement_stock(db, from_store, qty_by_sku):
+        db.rollback()
+        raise stock_conflict(db, from_store, qty_by_sku, "transfer")
+
+    products = Product.__table__
+    stocked = {sku for (sku,) in db.query(Product.sku).filter(Product.store_id == t.to_store_id, Product.sku.in_(list(qty_by_sku)))}
+    if stocked:
+        increment = (update(products).where(products.c.store_id == t.to_store_id, products.c.sku == bindparam("b_sku"))
+                     .values(stock_quantity=func.coalesce(products.c.stock_quantity, 0) + bindparam("b_qty")))
+        db.execute(increment, [{"b_sku": sku, "b_qty": qty_by_sku[sku]} for sku in stocked])
+    listed = [sku for sku in qty_by_sku if sku not in stocked]
+    if listed:
+        db.execute(insert(products), [{"store_id": t.to_store_id, **source[sku]._asdict(), "stock_quantity": qty_by_sku[sku]} for sku in listed])
+    transfer = StockTransfer(from_store_id=from_store, to_store_id=t.to_store_id, idempotency_key=t.idempotency_key,
+                             items=[StockTransferItem(product_sku=sku, quantity=qty) for sku, qty in qty_by_sku.items()])
+    db.add(transfer)
+    try:
+        db.commit()
+    except IntegrityError:
+        # The same key landed concurrently, or another transfer listed one of these SKUs first
+        db.rollback()
+        done = transfer_by_key(db, t.idempotency_key)
+        if done: return {"status": "duplicate", "transfer_id": done}
+        raise HTTPException(status_code=409, detail="Stock changed during transfer, please retry")
+    return {"status": "success", "transfer_id": transfer.id, "listed": listed}
+
+def transfer_by_key(db: Session, key: Optional[str]):
+    return db.query(StockTransfer.id).filter(StockTransfer.idempotency_key == key).scalar() if key else None
+
+@app.get("/transfers/", response_model=List[TransferRead])
+async def get_transfers(limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    """The store's latest transfers, in and out, newest first."""
+    return await db.run_sync(_read_transfers, store.store_id, limit)
+
+def _read_transfers(db: Session, store_id: int, limit: int):
+    return (db.query(StockTransfer).options(selectinload(StockTransfer.items))
+            .filter(or_(StockTransfer.from_store_id == store_id, StockTransfer.to_store_id == store_id))
+            .order_by(StockTransfer.id.desc()).limit(limit).all())
 
 # --- 5. AI ---
 @app.post("/ai/chat")
-def chat(query: dict):
-    text = query.get("text", "").lower()
-    if "sell" in text: return {"text": "Opening POS...", "action": "NAVIGATE_POS"}
-    return {"text": "I can help you navigate.", "action": None}
+async def chat(query: dict, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    """
+    Sales questions ("top sellers this week", "low stock in FILTER BOXES", "how much stock of zodiac",
+    "revenue yesterday by payment method") answered from the rollups and products, plus navigation commands.
+    Routing is local (assistant.py); answers are cached per intent and slots until the next sale.
+    """
+    text = str(query.get("text", ""))
+    intent, _ = assistant.route(text)
+    if intent is None: return {"text": assistant.HELP, "action": None, "intent": None}
+    if intent in assistant.NAVIGATION:
+        reply, action = assistant.NAVIGATION[intent]
+        return {"text": reply, "action": action, "intent": intent}
+    return await db.run_sync(_chat_answer, store, intent, text)
+
+def _chat_categories(db: Session, store: tenancy.StoreState) -> list:
+    categories = store.chat.get(("categories",))
+    if categories is None:
+        categories = [c for (c,) in db.query(distinct(Product.category)).filter(Product.store_id == store.store_id, Product.category.isnot(None))]
+        store.chat.put(("categories",), categories)
+    return categories
+
+def _chat_answer(db: Session, store: tenancy.StoreState, intent: str, text: str) -> dict:
+    category = assistant.category(text, _chat_categories(db, store))
+    if intent == "low_stock":
+        slots = {"below": assistant.below(text), "category": category, "limit": assistant.limit(text)}
+    elif intent == "stock_level":
+        slots = {"terms": assistant.product_terms(text), "limit": assistant.limit(text)}
+    else:
+        label, start, end = assistant.date_range(text, datetime.datetime.utcnow(), "today" if intent == "revenue" else "last 7 days")
+        slots = {"label": label, "start": start, "end": end, "category": category}
+        if intent == "top_sellers": slots.update(limit=assistant.limit(text), rank=assistant.rank_by(text))
+        else: slots["by"] = assistant.breakdown(text)
+    key = (intent, *slots.values())
+    answer = store.chat.get(key)
+    if answer is None:
+        answer = {"action": None, "intent": intent, **CHAT_ANSWERS[intent](db, store.store_id, **slots)}
+        store.chat.put(key, answer)
+    return answer
+
+def _chat_top_sellers(db: Session, store_id: int, label, start, end, category, limit, rank) -> dict:
+    units, revenue = func.sum(SalesRollup.units), func.sum(SalesRollup.revenue)
+    q = db.query(SalesRollup.key, units, revenue).filter(SalesRollup.store_id == store_id, SalesRollup.granularity == "day",
+                                                         SalesRollup.dimension == "sku", SalesRollup.bucket >= start, SalesRollup.bucket < end)
+    if category: q = q.filter(SalesRollup.key.in_(select(Product.sku).where(Product.store_id == store_id, Product.category == category)))
+    top = q.group_by(SalesRollup.key).order_by((revenue if rank == "revenue" else units).desc(), SalesRollup.key).limit(limit).all()
+    names = dict(db.query(Product.sku, Product.name).filter(Product.store_id == store_id, Product.sku.in_([k for k, _, _ in top])))
+    rows = [{"sku": k, "name": names.get(k), "units": int(u or 0), "revenue": round(r or 0.0, 2)} for k, u, r in top]
+    return {"text": assistant.top_sellers_text(label, rows, category), "data": rows}
+
+def _chat_low_stock(db: Session, store_id: int, below, category, limit) -> dict:
+    q = db.query(Product.sku, Product.name, Product.stock_quantity).filter(Product.store_id == store_id, Product.stock_quantity < below)
+    if category: q = q.filter(Product.category == category)
+    total = q.count()
+    rows = [{"sku": s, "name": n, "stock_quantity": qty} for s, n, qty in q.order_by(Product.stock_quantity, Product.sku).limit(limit)]
+    return {"text": assistant.low_stock_text(rows, total, below, category), "data": {"total": total, "products": rows}}
+
+def _chat_stock_level(db: Session, store_id: int, terms, limit) -> dict:
+    index = stores[store_id].search
+    if terms and index.stale: index.refresh(db)
+    skus = [sku for sku, _ in index.search(terms, limit)] if terms else []
+    stock = {s: (n, qty) for s, n, qty in db.query(Product.sku, Product.name, Product.stock_quantity)
+             .filter(Product.store_id == store_id, Product.sku.in_(skus))}
+    rows = [{"sku": s, "name": stock[s][0], "stock_quantity": stock[s][1]} for s in skus if s in stock]
+    return {"text": assistant.stock_level_text(terms, rows), "data": rows}
+
+def _chat_revenue(db: Session, store_id: int, label, start, end, category, by) -> dict:
+    if category:  # one category's takings; its rollup key is the category name
+        summary = _rollup_totals(db, store_id, "category", start, end).get(category, {"units": 0, "revenue": 0.0, "transactions": 0})
+        return {"text": assistant.revenue_text(f"{label} in {category}", summary), "data": summary}
+    summary = _report_summary(db, store_id, start, end)
+    if by == "category": summary["by_category"] = _rollup_totals(db, store_id, "category", start, end)
+    split = summary.get(f"by_{by}") if by in ("payment", "category") else None
+    return {"text": assistant.revenue_text(label, summary, split, "payment method" if by == "payment" else by), "data": summary}
+
+CHAT_ANSWERS = {"top_sellers": _chat_top_sellers, "low_stock": _chat_low_stock, "stock_level": _chat_stock_level, "revenue": _chat_revenue}
+
+def _predict(db: Session, store: tenancy.StoreState, skus: List[str]):
+    stock = dict(db.query(Product.sku, Product.stock_quantity).filter(Product.store_id == store.store_id, Product.sku.in_(skus)).all())
+    return store.forecasts.predict(db, skus, stock)
 
 @app.get("/ai/predict/{sku}")
-def predict(sku: str, db: Session = Depends(get_db)): return {"sku": sku, "predicted_weekly_demand": 0, "trend": "No Data", "recommendation": "Gather more sales data"}
\ No newline at end of file
+async def predict(sku: str, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    return (await db.run_sync(_predict, store, [sku]))[0]
+
+@app.post("/ai/predict/batch")
+async def predict_batch(req: PredictBatchRequest, db: AsyncSession = Depends(get_db), store: tenancy.StoreState = Depends(current_store)):
+    # One call for every visible POS tile; forecasts come from the store's shared cache
+    skus = list(dict.fromkeys(req.skus))
+    if len(skus) > 2000: raise HTTPException(status_code=400, detail="Too many SKUs (max 2000)")
+    return {"predictions": await db.run_sync(_predict, store, skus)}
+
+# --- 6. OPERATIONS ---
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Prometheus scrape target: per-route latency, status counts and SQL statements/time per request."""
+    return Response(content=metrics.registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,161 @@
+"""
+Request latency and SQL instrumentation.
+
+MetricsMiddleware (plain ASGI, no BaseHTTPMiddleware buffering) times every request and
+labels it with the matched route template, never the raw path, so label sets stay bounded.
+SQLAlchemy cursor hooks attribute each statement and its DB time to the request running it:
+the per-request counters live in a ContextVar, which Starlette's threadpool and
+AsyncSession's greenlets both carry over. The result is:
+  - Prometheus text exposition from `registry.render()` (served at /metrics)
+  - a Server-Timing header: app;dur=.., db;dur=..;desc="N queries"
+  - when SLOW_REQUEST_MS is set, a warning listing the SQL of any request slower than that
+Per request the cost is two perf_counter() calls per statement and one locked dict update.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))  # 0 disables the slow-request log
+MAX_LOGGED_STATEMENTS = 200
+
+slow_log = logging.getLogger("nexus.slow_requests")
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self, capture: bool):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = [] if capture else None
+
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in labels.items())
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}      # (method, route) -> Histogram of seconds
+        self.queries = {}      # (method, route) -> Histogram of statements per request
+        self.requests = {}     # (method, route, status) -> count
+        self.db_seconds = {}   # (method, route) -> seconds spent in the database
+
+    def observe(self, method, route, status, seconds, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.queries[key] = Histogram(QUERY_BUCKETS)
+                self.db_seconds[key] = 0.0
+            self.latency[key].observe(seconds)
+            self.queries[key].observe(stats.queries)
+            self.db_seconds[key] += stats.db_seconds
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4."""
+        out = []
+        with self._lock:
+            out += ["# HELP http_requests_total Requests handled, by route and status.", "# TYPE http_requests_total counter"]
+            for (method, route, status), n in sorted(self.requests.items()):
+                out.append(f"http_requests_total{{{_labels(method=method, route=route, status=status)}}} {n}")
+            for name, help_text, hists in (
+                ("http_request_duration_seconds", "Request latency.", self.latency),
+                ("db_queries_per_request", "SQL statements issued per request.", self.queries),
+            ):
+                out += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (method, route), h in sorted(hists.items()):
+                    cumulative = 0
+                    for bound, n in zip(list(h.buckets) + ["+Inf"], h.counts):
+                        cumulative += n
+                        out.append(f"{name}_bucket{{{_labels(method=method, route=route, le=bound)}}} {cumulative}")
+                    out.append(f"{name}_sum{{{_labels(method=method, route=route)}}} {h.total}")
+                    out.append(f"{name}_count{{{_labels(method=method, route=route)}}} {cumulative}")
+            out += ["# HELP db_query_seconds_total Time spent executing SQL, by route.", "# TYPE db_query_seconds_total counter"]
+            for (method, route), seconds in sorted(self.db_seconds.items()):
+                out.append(f"db_query_seconds_total{{{_labels(method=method, route=route)}}} {seconds:.6f}")
+        return "\n".join(out) + "\n"
+
+
+registry = Registry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None: conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("query_start"): return
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    if stats.statements is not None and len(stats.statements) < MAX_LOGGED_STATEMENTS:
+        stats.statements.append((elapsed, statement))
+
+
+def instrument(engine):
+    """Attach the query hooks to a sync Engine (pass async_engine.sync_engine for the async one)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    def __init__(self, app, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        stats = RequestStats(capture=self.slow_request_ms > 0)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                app_ms = (time.perf_counter() - start) * 1000
+                timing = f'app;dur={app_ms:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"server-timing", timing.encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            seconds = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            registry.observe(scope["method"], route, status, seconds, stats)
+            if stats.statements is not None and seconds * 1000 >= self.slow_request_ms:
+                slow_log.warning("slow request %s %s: %.1f ms, %d queries, %.1f ms in db%s", scope["method"], route, seconds * 1000,
+                                 stats.queries, stats.db_seconds * 1000,
+                                 "".join(f"\n  {ms * 1000:8.2f} ms  {sql}" for ms, sql in stats.statements))
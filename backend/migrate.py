@@ -0,0 +1,10 @@
+from main import engine, ensure_schema
+
+# Creates missing tables, columns and indexes for DATABASE_URL.
+# Run on deploy when the API starts with DB_AUTO_MIGRATE=0:  python migrate.py
+print(f"🛠️  Migrating schema on {engine.url.render_as_string(hide_password=True)}...")
+try:
+    ensure_schema(engine)
+    print("✅ Schema up to date.")
+finally:
+    engine.dispose()
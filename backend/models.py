@@ -1,41 +1,209 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean
-from sqlalchemy.orm import relationship
-from database import Base
+"""
+ORM models and schema setup.
+
+Only SQLAlchemy is imported here, so scripts that just need the tables
+(import_master.py, sync_images.py, the benchmarks) can load them without
+FastAPI, the analytics stack or a database connection. The schema is created
+by an explicit step, `ensure_schema(engine)`: the API's startup runs it, and
+so does `python migrate.py`.
+
+Branches share one database: products, sales, staff, suppliers and rollups carry a
+store_id, and SKUs are unique per store. Rows from before stores existed belong to the
+default store that ensure_schema creates.
+"""
 import datetime
 
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, UniqueConstraint, inspect, text
+from sqlalchemy.orm import declarative_base, relationship
+
+Base = declarative_base()
+
+DEFAULT_STORE_ID = 1
+DEFAULT_STORE_CODE = "MAIN"
+
+def store_column(**kwargs):
+    return Column(Integer, ForeignKey("stores.id"), nullable=False, default=DEFAULT_STORE_ID, **kwargs)
+
+
+class Store(Base):
+    __tablename__ = "stores"
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String, unique=True, index=True, nullable=False)  # e.g. "VEL300"; importers take it as --store
+    name = Column(String)
+
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String, unique=True, index=True)
+    full_name = Column(String)
+    picture = Column(String)
+    role = Column(String, default="Viewer")
+    is_active = Column(Boolean, default=True)
+
 class Product(Base):
     __tablename__ = "products"
-
     id = Column(Integer, primary_key=True, index=True)
-    sku = Column(String, unique=True, index=True) # Barcode
+    store_id = store_column()
+    sku = Column(String, index=True)
     name = Column(String)
-    description = Column(String, nullable=True)
-    cost_price = Column(Float) # Important for ERP profit calc
+    cost_price = Column(Float)
     selling_price = Column(Float)
     stock_quantity = Column(Integer, default=0)
-    category = Column(String, index=True)
-    
-    # Auto-managed timestamps
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    category = Column(String)
+    # Bumped on every insert/update (ORM and Core); drives ?since= delta sync and ETags
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
+    __table_args__ = (
+        Index("uq_products_store_sku", "store_id", "sku", unique=True),
+        Index("ix_products_store_updated", "store_id", "updated_at"),
+        Index("ix_products_store_stock", "store_id", "stock_quantity"),
+    )
+
+    images = relationship("ProductImage", primaryjoin="Product.sku == foreign(ProductImage.product_sku)", viewonly=True)
+
+class ProductImage(Base):
+    """Keyed by SKU alone: every store that stocks a product shows the same pictures."""
+    __tablename__ = "product_images"
+    id = Column(Integer, primary_key=True, index=True)
+    product_sku = Column(String, index=True)
+    image_url = Column(String)   # full-size WebP variant (the uploaded original for images synced before variants)
+    card_url = Column(String)    # smaller variants, see image_variants.VARIANTS
+    thumb_url = Column(String)
+    is_primary = Column(Boolean, default=False)
+    # Part of the catalog fingerprint, so image syncs also move the catalog ETag and snapshot
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
 
 class Transaction(Base):
     __tablename__ = "transactions"
-
     id = Column(Integer, primary_key=True, index=True)
+    store_id = store_column(index=True)
     total_amount = Column(Float)
-    payment_method = Column(String) # Cash, Card, etc.
-    timestamp = Column(DateTime, default=datetime.datetime.utcnow)
-    
-    # Link to items sold
+    payment_method = Column(String)
+    timestamp = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    # Client-generated per sale, so a till re-sending a queued sale can't record it twice; unique per store
+    idempotency_key = Column(String, index=True, nullable=True)
+    __table_args__ = (
+        Index("ix_transactions_store_time", "store_id", "timestamp"),
+        Index("uq_transactions_store_idempotency", "store_id", "idempotency_key", unique=True),
+    )
     items = relationship("TransactionItem", back_populates="transaction")
 
 class TransactionItem(Base):
     __tablename__ = "transaction_items"
+    id = Column(Integer, primary_key=True, index=True)
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), index=True)
+    product_sku = Column(String, index=True)
+    quantity = Column(Integer)
+    price_at_sale = Column(Float)
+    transaction = relationship("Transaction", back_populates="items")
+
+class Staff(Base):
+    __tablename__ = "staff"
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = store_column(index=True)
+    name = Column(String)
+    role = Column(String)
+    passcode = Column(String)
 
+class Supplier(Base):
+    __tablename__ = "suppliers"
     id = Column(Integer, primary_key=True, index=True)
-    transaction_id = Column(Integer, ForeignKey("transactions.id"))
-    product_sku = Column(String, ForeignKey("products.sku"))
+    store_id = store_column(index=True)
+    name = Column(String)
+    contact_email = Column(String)
+    phone = Column(String)
+
+class StockTransfer(Base):
+    """Stock moved from one store to another; both sides change in the same DB transaction."""
+    __tablename__ = "stock_transfers"
+    id = Column(Integer, primary_key=True, index=True)
+    from_store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, index=True)
+    to_store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    idempotency_key = Column(String, unique=True, index=True, nullable=True)
+    items = relationship("StockTransferItem", back_populates="transfer")
+
+class StockTransferItem(Base):
+    __tablename__ = "stock_transfer_items"
+    id = Column(Integer, primary_key=True, index=True)
+    transfer_id = Column(Integer, ForeignKey("stock_transfers.id"), index=True)
+    product_sku = Column(String)
     quantity = Column(Integer)
-    price_at_sale = Column(Float) # Store price at moment of sale (prices change!)
-    
-    transaction = relationship("Transaction", back_populates="items")
\ No newline at end of file
+    transfer = relationship("StockTransfer", back_populates="items")
+
+class SalesRollup(Base):
+    """Pre-aggregated sales per store and hour/day bucket, updated in the same DB transaction as each sale."""
+    __tablename__ = "sales_rollups"
+    id = Column(Integer, primary_key=True, index=True)
+    store_id = store_column()
+    granularity = Column(String, nullable=False)  # "hour" | "day"
+    dimension = Column(String, nullable=False)    # "sku" | "category" | "payment"
+    key = Column(String, nullable=False)
+    bucket = Column(DateTime, nullable=False)
+    units = Column(Integer, default=0)
+    revenue = Column(Float, default=0.0)
+    transactions = Column(Integer, default=0)
+    __table_args__ = (
+        Index("uq_sales_rollups_store_key", "store_id", "granularity", "dimension", "key", "bucket", unique=True),
+        Index("ix_sales_rollups_store_range", "store_id", "granularity", "dimension", "bucket"),  # range scans across all keys
+    )
+
+
+def stale_uniques(inspector, table):
+    """(constraint names, index names) the database enforces uniqueness with but the model no longer declares."""
+    declared = {c.name for c in table.constraints if isinstance(c, UniqueConstraint)} | {ix.name for ix in table.indexes if ix.unique}
+    constraints = [c["name"] for c in inspector.get_unique_constraints(table.name) if c["name"] and c["name"] not in declared]
+    indexes = [ix["name"] for ix in inspector.get_indexes(table.name)
+               if ix["unique"] and ix["name"] not in declared and not ix.get("duplicates_constraint")]
+    return constraints, indexes
+
+
+def rebuild_sqlite_table(conn, table):
+    """
+    SQLite can't drop a table constraint: move the rows into a freshly created table instead.
+    Only for tables no foreign key points at (the rename would repoint it).
+    """
+    for ix in inspect(conn).get_indexes(table.name): conn.execute(text(f'DROP INDEX "{ix["name"]}"'))
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {table.name}__old"))
+    table.create(conn)
+    cols = ", ".join(c.name for c in table.columns)
+    conn.execute(text(f"INSERT INTO {table.name} ({cols}) SELECT {cols} FROM {table.name}__old"))
+    conn.execute(text(f"DROP TABLE {table.name}__old"))
+
+
+def ensure_schema(bind):
+    """
+    Create missing tables, then bring older databases up to the models: add columns (backfilled
+    with their default), drop uniqueness rules the models have since narrowed (e.g. SKUs went from
+    unique to unique per store) and create missing indexes. Also creates the default store.
+    """
+    Base.metadata.create_all(bind=bind)
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        stores = Store.__table__
+        if conn.execute(stores.select().limit(1)).first() is None:  # an empty table hands out id 1 = DEFAULT_STORE_ID
+            conn.execute(stores.insert().values(code=DEFAULT_STORE_CODE, name="Main store"))
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            added = [column for column in table.columns if column.name not in existing]
+            for column in added:
+                col_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+            # Backfill once every column exists, in plain SQL: table.update() would also set the onupdate
+            # columns (updated_at), which may be among those just added or not exist yet
+            for column in added:
+                default = column.default
+                if default is not None and (default.is_scalar or default.is_callable):
+                    value = default.arg(None) if default.is_callable else default.arg
+                    conn.execute(text(f'UPDATE {table.name} SET {column.name} = :value'), {"value": value})
+            constraints, unique_indexes = stale_uniques(inspect(conn), table)
+            if bind.dialect.name == "sqlite":
+                for name in unique_indexes: conn.execute(text(f'DROP INDEX "{name}"'))
+                if constraints: rebuild_sqlite_table(conn, table)
+            else:  # CASCADE also drops foreign keys that relied on the old unique key (product_images -> products.sku)
+                for name in constraints: conn.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT "{name}" CASCADE'))
+                for name in unique_indexes: conn.execute(text(f'DROP INDEX "{name}" CASCADE'))
+            # create_all skips tables that already exist, so indexes added to the models since need creating here
+            indexed = {ix["name"] for ix in inspect(conn).get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexed: index.create(conn)
@@ -0,0 +1,16 @@
+from main import SessionLocal, engine, ensure_schema, rebuild_rollups
+
+# Rebuilds the hourly/daily sales rollups from the full transaction history.
+# Run once after upgrading (or any time the rollups look off):  python rebuild_rollups.py
+ensure_schema(engine)
+db = SessionLocal()
+
+print("📊 Rebuilding sales rollups from transaction history...")
+try:
+    rebuild_rollups(db)
+    print("✅ Rollups rebuilt.")
+except Exception as e:
+    db.rollback()
+    print(f"❌ Rebuild failed: {e}")
+finally:
+    db.close()
@@ -0,0 +1,154 @@
+"""
+In-memory fuzzy product search over sku, name and category.
+
+Each product's text is broken into padded character trigrams held in an inverted
+index (trigram -> doc ids). A query counts shared trigrams per product with one
+numpy bincount over the matching posting lists, so partial names and typos
+("zodaic valv") still land on the right product. The best candidates are then
+re-ranked with exact-SKU and prefix bonuses.
+
+Products are added or replaced one at a time. `refresh` pulls rows whose
+updated_at moved since the last refresh, which also picks up imports and writes
+made by other worker processes. An index covers one store's products, or every store's
+when built without a store_id.
+
+numpy is imported when the first product is indexed rather than with the module.
+"""
+import datetime
+import math
+import re
+import threading
+import time
+
+from sqlalchemy import DateTime, column, select, table
+
+MIN_COVERAGE = 0.4     # fraction of the query's trigrams a product must share to be returned
+CANDIDATES = 200       # products re-ranked in Python after the vectorised first pass
+REFRESH_SKEW = datetime.timedelta(seconds=2)  # re-read rows committed just before the last refresh
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+products = table("products", column("store_id"), column("sku"), column("name"), column("category"), column("updated_at", DateTime))
+
+
+def normalize(text) -> str:
+    return " ".join(TOKEN_RE.findall(str(text or "").lower()))
+
+
+def trigrams(text, prefix: bool = False) -> set:
+    """Padded trigrams per token; `prefix` leaves the last token open because it is still being typed."""
+    tokens = normalize(text).split()
+    grams = set()
+    for n, token in enumerate(tokens):
+        padded = "  " + token + ("" if prefix and n == len(tokens) - 1 else " ")
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class ProductSearchIndex:
+    def __init__(self, refresh_interval: float = 5.0, store_id=None):
+        self.refresh_interval = refresh_interval
+        self.store_id = store_id
+        self._lock = threading.RLock()
+        self._reset()
+        self.watermark = None    # newest updated_at seen by refresh()
+        self.refreshed_at = None
+
+    def _reset(self):
+        self._postings = {}      # trigram -> [doc id]
+        self._arrays = {}        # trigram -> np.ndarray copy of its posting list, rebuilt when it grows
+        self._docs = []          # doc id -> (sku, name, category, normalised sku, normalised name); None once replaced
+        self._by_sku = {}        # sku -> live doc id
+        self._sizes = None       # np.int32 trigram count per doc, allocated on first add; 0 marks a replaced doc
+        self._dead = 0
+
+    def __len__(self): return len(self._by_sku)
+
+    @property
+    def stale(self) -> bool:
+        return self.refreshed_at is None or time.monotonic() - self.refreshed_at >= self.refresh_interval
+
+    def add(self, sku: str, name: str = "", category: str = ""):
+        """Index a product, replacing any earlier text for the same SKU."""
+        import numpy as np
+        name, category = name or "", category or ""
+        with self._lock:
+            old = self._by_sku.get(sku)
+            if old is not None:
+                if self._docs[old][1:3] == (name, category): return
+                self._docs[old] = None
+                self._sizes[old] = 0
+                self._dead += 1
+            doc = len(self._docs)
+            grams = trigrams(f"{sku} {name} {category}")
+            self._docs.append((sku, name, category, normalize(sku), normalize(name)))
+            self._by_sku[sku] = doc
+            if self._sizes is None: self._sizes = np.zeros(1024, dtype=np.int32)
+            elif doc >= len(self._sizes): self._sizes = np.concatenate([self._sizes, np.zeros(len(self._sizes), dtype=np.int32)])
+            self._sizes[doc] = len(grams)
+            for g in grams:
+                self._postings.setdefault(g, []).append(doc)
+                self._arrays.pop(g, None)
+            if self._dead > max(1024, len(self._by_sku) // 4): self._compact()
+
+    def _compact(self):
+        live = [d for d in self._docs if d is not None]
+        self._reset()
+        for sku, name, category, _, _ in live: self.add(sku, name, category)
+
+    def refresh(self, db):
+        """Index products changed since the last refresh (everything on the first call)."""
+        self.refreshed_at = time.monotonic()  # claim it first so concurrent requests don't all refresh
+        q = select(products.c.sku, products.c.name, products.c.category, products.c.updated_at)
+        if self.store_id is not None: q = q.where(products.c.store_id == self.store_id)
+        if self.watermark is not None: q = q.where(products.c.updated_at >= self.watermark - REFRESH_SKEW)
+        rows = db.execute(q).all()
+        with self._lock:
+            for sku, name, category, updated_at in rows:
+                self.add(sku, name, category)
+                if updated_at and (self.watermark is None or updated_at > self.watermark): self.watermark = updated_at
+        return len(rows)
+
+    def _posting_array(self, gram):
+        import numpy as np
+        arr = self._arrays.get(gram)
+        if arr is None: arr = self._arrays[gram] = np.array(self._postings[gram], dtype=np.int32)
+        return arr
+
+    def search(self, query: str, limit: int = 20, prefix: bool = True, min_coverage: float = MIN_COVERAGE) -> list:
+        """[(sku, score)], best first."""
+        import numpy as np
+        qgrams = trigrams(query, prefix=prefix)
+        if not qgrams: return []
+        qn, qnorm = len(qgrams), normalize(query)
+        with self._lock:
+            lists = [self._posting_array(g) for g in qgrams if g in self._postings]
+            exact = self._by_sku.get(query.strip())
+            if not lists and exact is None: return []
+            n = len(self._docs)
+            counts = np.bincount(np.concatenate(lists), minlength=n) if lists else np.zeros(n, dtype=np.int64)
+            sizes = self._sizes[:n]
+            counts[sizes == 0] = 0
+            hits = np.flatnonzero(counts >= max(1, math.ceil(min_coverage * qn)))
+            shared = counts[hits]
+            # coverage of the query, plus a similarity term that prefers shorter (tighter) matches
+            first_pass = shared / qn + 0.5 * shared / (qn + sizes[hits] - shared)
+            if len(hits) > CANDIDATES:
+                top = np.argpartition(first_pass, -CANDIDATES)[-CANDIDATES:]
+                hits, first_pass = hits[top], first_pass[top]
+            ranked = {}
+            for doc, score in zip(hits.tolist(), first_pass.tolist()):
+                sku, _, _, nsku, nname = self._docs[doc]
+                if nsku == qnorm: score += 2.0
+                elif nsku.startswith(qnorm): score += 1.0
+                if nname.startswith(qnorm): score += 0.5
+                elif (" " + qnorm) in (" " + nname): score += 0.25
+                ranked[sku] = score
+            if exact is not None: ranked[self._docs[exact][0]] = max(ranked.get(self._docs[exact][0], 0.0), 1.0) + 2.0
+        best = sorted(ranked.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+        return [(sku, round(score, 4)) for sku, score in best]
+
+    def best_match(self, text: str, min_coverage: float = 0.75, margin: float = 0.1):
+        """The one SKU `text` clearly refers to, or None when nothing (or more than one product) fits."""
+        top = self.search(text, limit=2, prefix=False, min_coverage=min_coverage)
+        if not top or (len(top) > 1 and top[0][1] - top[1][1] < margin): return None
+        return top[0][0]
@@ -1,57 +1,218 @@
-import random
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from database import SessionLocal, engine
-import models
-
-# 1. Connect to Database
-db = SessionLocal()
-
-print("🌱 Seeding 60 Days of Sales History...")
-
-# 2. Get the Product
-product = db.query(models.Product).filter(models.Product.sku == "TEST-001").first()
-
-if not product:
-    print("❌ Error: Product 'TEST-001' not found. Please create it in Swagger first!")
-else:
-    # 3. Generate 60 Days of Fake Sales
-    # We simulate a "Trending" product: Sales increase slightly over time.
-    start_date = datetime.utcnow() - timedelta(days=60)
-    
-    total_sales = 0
-    
-    for i in range(60):
-        current_date = start_date + timedelta(days=i)
-        
-        # Base sales: Random between 1 and 5
-        # Trend: Add 0.1 extra sale per day (Simulating growth)
-        # Seasonality: More sales on Fridays (Weekday 4)
-        daily_qty = random.randint(1, 5) + int(i * 0.1)
-        
-        if current_date.weekday() == 4: # Friday boost
-            daily_qty += 5
-            
-        if daily_qty > 0:
-            # Create Transaction
-            txn = models.Transaction(
-                total_amount=daily_qty * product.selling_price,
-                payment_method="CASH",
-                timestamp=current_date
-            )
-            db.add(txn)
+"""
+Synthetic sales history for load testing and forecasting demos.
+
+Generates months or years of multi-SKU sales against one store's catalog (run
+import_master.py first) and bulk-inserts them into DATABASE_URL:
+  - daily volume = base rate x yearly trend x weekday profile x annual season, Poisson-drawn
+  - time of day clustered around lunch and the evening peak, inside opening hours
+  - basket sizes 1 + Poisson, quantities geometric (mostly 1s)
+  - SKU popularity Zipf-distributed over a shuffled catalog, each SKU with its own growth or decline
+Every draw is a numpy array per day, and rows go in via executemany in large batches
+(straight through the driver on SQLite), one commit per batch, so 10M line items take
+minutes. Each day's hourly/daily sales rollups are folded with numpy and upserted in the
+same transaction as its sales. Transaction ids are assigned here so line items can point at
+them without a round trip, so on Postgres each batch also moves transactions' id sequence
+past them, or the next real checkout would be handed an id that is already taken. Stock
+levels are left alone.
+
+Usage (from backend/):
+    python seed_data.py --days 90
+    python seed_data.py --days 730 --per-day 4000 --basket 3     (about 10M line items)
+    python seed_data.py --days 365 --replace --seed 7
+    python seed_data.py --store VEL301 --per-day 800
+"""
+import argparse
+import datetime
+import sys
+import time
+
+from sqlalchemy import func, select, text
+
+from main import ROLLUP_GRANULARITIES, UNCATEGORISED, SessionLocal, apply_rollups, engine, ensure_schema
+from models import DEFAULT_STORE_CODE, Product, SalesRollup, Store, Transaction, TransactionItem
+
+WEEKDAY_PROFILE = (0.85, 0.8, 0.9, 0.95, 1.25, 1.45, 0.8)  # Monday..Sunday
+PAYMENT_METHODS = ("CASH", "CARD", "MOBILE")
+PAYMENT_MIX = (0.35, 0.5, 0.15)
+OPEN_HOUR, CLOSE_HOUR = 8, 21
+ZIPF_EXPONENT = 1.05
+TXN_COLUMNS = ("id", "store_id", "total_amount", "payment_method", "timestamp")
+ITEM_COLUMNS = ("transaction_id", "product_sku", "quantity", "price_at_sale")
+
+
+def insert_rows(conn, table, columns, rows):
+    """
+    On SQLite, executemany straight through the driver: SQLAlchemy's per-row parameter
+    handling costs more than the insert itself. Elsewhere Core's insertmanyvalues
+    (multi-row VALUES) is the fast path.
+    """
+    if conn.dialect.name != "sqlite": return conn.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+    processors = [table.c[c].type.dialect_impl(conn.dialect).bind_processor(conn.dialect) for c in columns]
+    if any(processors):  # stored exactly as the ORM writes it, e.g. DateTime's fixed microsecond format
+        rows = [tuple(f(v) if f else v for f, v in zip(processors, row)) for row in rows]
+    conn.exec_driver_sql(f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows)
+
+
+def advance_sequence(conn, table):
+    """Move the table's id sequence past ids inserted explicitly (SQLite takes MAX(id) + 1 by itself)."""
+    if conn.dialect.name != "postgresql": return
+    conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT MAX(id) FROM {table.name}))"))
+
+
+def load_catalog(db, store_id):
+    rows = db.execute(select(Product.sku, Product.selling_price, Product.category).where(Product.store_id == store_id).order_by(Product.sku)).all()
+    return [r.sku for r in rows], [r.selling_price or 0.0 for r in rows], [r.category or UNCATEGORISED for r in rows]
+
+
+def fold(np, code, sale, units, revenue):
+    """Sum units and revenue per group code, and count the distinct sales in each group."""
+    groups, inverse = np.unique(code, return_inverse=True)
+    span = int(sale.max()) + 1
+    sales_per_group = np.bincount(np.unique(inverse.astype(np.int64) * span + sale) // span, minlength=len(groups))
+    return groups, np.bincount(inverse, weights=units, minlength=len(groups)), np.bincount(inverse, weights=revenue, minlength=len(groups)), sales_per_group
+
+
+def day_rollups(np, store_id, day_start, dimensions):
+    """
+    Rollup rows for one generated day of a store, as main.rollup_rows would produce them sale by sale.
+    dimensions: {name: (labels, label index, hour, sale, units, revenue)}, one entry per line or sale.
+    """
+    rows = []
+    for granularity in ROLLUP_GRANULARITIES:
+        for dimension, (labels, index, hour, sale, units, revenue) in dimensions.items():
+            hours = hour if granularity == "hour" else np.zeros_like(hour)
+            groups, u, r, n = fold(np, hours * len(labels) + index, sale, units, revenue)
+            for code, units_sum, revenue_sum, count in zip(groups.tolist(), u.tolist(), r.tolist(), n.tolist()):
+                rows.append({"store_id": store_id, "granularity": granularity, "dimension": dimension, "key": labels[code % len(labels)],
+                             "bucket": day_start + datetime.timedelta(hours=code // len(labels)),
+                             "units": int(units_sum), "revenue": revenue_sum, "transactions": count})
+    return rows
+
+
+def day_volumes(rng, np, days, start, per_day, trend, season):
+    """Expected transactions per day (trend x weekday x annual season), Poisson-drawn."""
+    t = np.arange(days)
+    dates = np.datetime64(start.date(), "D") + t
+    weekday = (dates.astype("int64") + 3) % 7  # 1970-01-01 was a Thursday
+    day_of_year = (dates - dates.astype("datetime64[Y]")).astype("int64")
+    expected = (per_day * (1 + trend) ** (t / 365.0) * np.asarray(WEEKDAY_PROFILE)[weekday]
+                * (1 + season * np.cos(2 * np.pi * (day_of_year - 350) / 365.0)))  # peaks mid-December
+    return dates, rng.poisson(expected)
+
+
+def seconds_of_day(rng, np, n):
+    """Lunch-time and after-work peaks over a flat base, clipped to opening hours."""
+    peak = rng.choice(3, size=n, p=(0.3, 0.35, 0.35))
+    hours = np.where(peak == 0, rng.uniform(OPEN_HOUR, CLOSE_HOUR, n),
+                     np.where(peak == 1, rng.normal(12.75, 1.2, n), rng.normal(17.75, 1.5, n)))
+    return (np.clip(hours, OPEN_HOUR, CLOSE_HOUR - 1 / 3600) * 3600).astype("int64")
+
+
+def generate(args):
+    import numpy as np
+    db = SessionLocal()
+    try:
+        store_id = db.execute(select(Store.id).where(Store.code == args.store)).scalar()
+        if store_id is None:
+            print(f"❌ Error: unknown store {args.store!r}.")
+            return 1
+        skus, prices, sku_categories = load_catalog(db, store_id)
+        if not skus:
+            print(f"❌ Error: store {args.store} has no products. Import them first (python import_master.py --store {args.store}).")
+            return 1
+        if args.replace:
+            print(f"🧹 Deleting {args.store}'s existing sales history...")
+            store_txns = select(Transaction.id).where(Transaction.store_id == store_id)
+            db.query(TransactionItem).filter(TransactionItem.transaction_id.in_(store_txns)).delete(synchronize_session=False)
+            db.query(Transaction).filter(Transaction.store_id == store_id).delete(synchronize_session=False)
+            db.query(SalesRollup).filter(SalesRollup.store_id == store_id).delete(synchronize_session=False)
+            db.commit()
+        next_id = (db.execute(select(func.max(Transaction.id))).scalar() or 0) + 1
+    finally:
+        db.close()
+
+    rng = np.random.default_rng(args.seed)
+    n_skus, prices = len(skus), np.asarray(prices, dtype=np.float64)
+    sku_array = np.asarray(skus, dtype=object)
+    categories, category_of = np.unique(np.asarray(sku_categories, dtype=object), return_inverse=True)
+    categories = categories.tolist()
+    popularity = 1.0 / np.arange(1, n_skus + 1) ** ZIPF_EXPONENT
+    popularity = popularity[rng.permutation(n_skus)]
+    growth = rng.normal(0.0, args.sku_drift, n_skus)  # per-SKU log growth over the whole period
+
+    start = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - datetime.timedelta(days=args.days)
+    dates, volumes = day_volumes(rng, np, args.days, start, args.per_day, args.trend, args.season)
+    total_txns = int(volumes.sum())
+    print(f"🌱 Seeding {args.store}, {args.days} days from {start.date()}: ~{total_txns:,} transactions over {n_skus:,} SKUs "
+          f"(~{int(total_txns * args.basket):,} line items)...")
+
+    pending_txns, pending_items, pending_rollups, done_txns, done_items = [], [], [], 0, 0
+    began = time.perf_counter()
+
+    def flush():
+        nonlocal pending_txns, pending_items, pending_rollups, done_txns, done_items
+        with SessionLocal() as db:  # rollups commit with the sales they count, as on the live checkout path
+            insert_rows(db.connection(), Transaction.__table__, TXN_COLUMNS, pending_txns)
+            insert_rows(db.connection(), TransactionItem.__table__, ITEM_COLUMNS, pending_items)
+            advance_sequence(db.connection(), Transaction.__table__)  # items take theirs from the database
+            apply_rollups(db, pending_rollups)
             db.commit()
-            
-            # Create Transaction Item
-            item = models.TransactionItem(
-                transaction_id=txn.id,
-                product_sku=product.sku,
-                quantity=daily_qty,
-                price_at_sale=product.selling_price
-            )
-            db.add(item)
-            total_sales += 1
-
-    print(f"✅ Success! Created {total_sales} fake transactions for the AI to analyze.")
-
-db.close()
\ No newline at end of file
+        done_txns += len(pending_txns); done_items += len(pending_items)
+        pending_txns, pending_items, pending_rollups = [], [], []
+        elapsed = time.perf_counter() - began
+        print(f"   {done_txns:>12,} transactions  {done_items:>12,} items  {done_items / elapsed:>10,.0f} items/s", flush=True)
+
+    for day, (date, n) in enumerate(zip(dates, volumes.tolist())):
+        if n == 0: continue
+        weights = popularity * np.exp(growth * day / max(args.days - 1, 1))
+        cdf = np.cumsum(weights); cdf /= cdf[-1]
+        sizes = 1 + rng.poisson(max(args.basket - 1, 0.0), n)
+        lines = int(sizes.sum())
+        line_sku = np.minimum(np.searchsorted(cdf, rng.random(lines)), n_skus - 1)
+        qty = np.minimum(rng.geometric(0.65, lines), 12)
+        owner = np.repeat(np.arange(n), sizes)
+        totals = np.round(np.bincount(owner, weights=qty * prices[line_sku], minlength=n), 2)
+        seconds = np.sort(seconds_of_day(rng, np, n))
+        stamps = (date.astype("datetime64[s]") + seconds).astype("datetime64[us]")
+        ids = np.arange(next_id, next_id + n)
+        next_id += n
+        payment = rng.choice(len(PAYMENT_METHODS), size=n, p=PAYMENT_MIX)
+        payments = np.asarray(PAYMENT_METHODS, dtype=object)[payment]
+
+        if not args.no_rollups:
+            hour, line_revenue, sale = seconds // 3600, qty * prices[line_sku], np.arange(n)
+            pending_rollups += day_rollups(np, store_id, date.astype("datetime64[s]").astype(datetime.datetime), {
+                "sku": (skus, line_sku, hour[owner], owner, qty, line_revenue),
+                "category": (categories, category_of[line_sku], hour[owner], owner, qty, line_revenue),
+                "payment": (PAYMENT_METHODS, payment, hour, sale, np.bincount(owner, weights=qty, minlength=n), np.bincount(owner, weights=line_revenue, minlength=n)),
+            })
+        pending_txns += zip(ids.tolist(), [store_id] * n, totals.tolist(), payments.tolist(), stamps.tolist())
+        pending_items += zip(ids[owner].tolist(), sku_array[line_sku].tolist(), qty.tolist(), prices[line_sku].tolist())
+        if len(pending_items) >= args.batch: flush()
+    if pending_txns: flush()
+
+    if args.no_rollups: print("⚠️  Sales rollups were not updated; run python rebuild_rollups.py before using the dashboards.")
+    print(f"✅ Success! Created {done_txns:,} transactions with {done_items:,} line items in {time.perf_counter() - began:.1f}s.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic multi-SKU sales history for the current catalog")
+    parser.add_argument("--store", default=DEFAULT_STORE_CODE, help="code of the store whose catalog sells")
+    parser.add_argument("--days", type=int, default=90, help="days of history, ending yesterday")
+    parser.add_argument("--per-day", type=float, default=300, help="average transactions per day at the start")
+    parser.add_argument("--basket", type=float, default=2.5, help="average line items per transaction")
+    parser.add_argument("--trend", type=float, default=0.15, help="store-wide growth per year (0.15 = +15%%)")
+    parser.add_argument("--season", type=float, default=0.2, help="annual seasonality amplitude, peaking in December")
+    parser.add_argument("--sku-drift", type=float, default=0.5, help="spread of per-SKU growth/decline over the period")
+    parser.add_argument("--batch", type=int, default=200000, help="line items per insert batch and commit")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--replace", action="store_true", help="delete the store's existing transactions and rollups first")
+    parser.add_argument("--no-rollups", action="store_true", help="don't update the sales rollups (rebuild them later with rebuild_rollups.py)")
+    args = parser.parse_args()
+    ensure_schema(engine)
+    return generate(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
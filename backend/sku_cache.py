@@ -0,0 +1,68 @@
+"""
+Bounded in-process SKU -> product cache for barcode scans.
+
+Entries are evicted least-recently-used once `maxsize` is reached and expire
+after `ttl` seconds, which bounds staleness for writes made by other worker
+processes or the import scripts. Writes in this process invalidate directly; a
+generation counter keeps a load that was already reading the database when an
+invalidate happened from putting its now-stale rows back.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 20000
+DEFAULT_TTL = 30.0
+
+
+class SkuCache:
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # sku -> (expires_at, row)
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by every invalidate()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, skus):
+        """Split SKUs into ({sku: row} cache hits, [misses], generation) and count them; pass the generation to store()."""
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for sku in skus:
+                entry = self._data.get(sku)
+                if entry and entry[0] > now:
+                    self._data.move_to_end(sku)
+                    found[sku] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(sku)
+                    self.misses += 1
+            return found, missing, self._generation
+
+    def store(self, rows: dict, generation: int):
+        """Cache rows loaded after lookup() returned `generation`, unless an invalidate() has happened since."""
+        with self._lock:
+            if generation != self._generation: return
+            expires = time.monotonic() + self.ttl
+            for sku, row in rows.items():
+                self._data[sku] = (expires, row)
+                self._data.move_to_end(sku)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, skus=None):
+        """Drop the given SKUs, or everything when called without arguments."""
+        with self._lock:
+            self._generation += 1
+            if skus is None: self._data.clear(); return
+            for sku in skus: self._data.pop(sku, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"size": len(self._data), "maxsize": self.maxsize, "ttl_seconds": self.ttl, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions, "hit_ratio": round(self.hits / total, 4) if total else 0.0}
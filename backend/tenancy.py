@@ -0,0 +1,62 @@
+"""
+Per-store in-process state for a multi-branch deployment.
+
+Each store gets its own SKU cache, search index, change feed, catalog snapshots (one per
+image variant), chat answer cache and forecasts, created on the store's first request. A busy branch then
+churns only its own LRU, its writes only invalidate its own snapshot and answers, and
+its tills only wake for its own patches.
+
+Open stores each run one background task (search index warm-up, then the change feed)
+once `start()` has been called from the app's lifespan. Stores are opened from the
+event loop, not from threadpool code.
+"""
+import asyncio
+import logging
+
+log = logging.getLogger("nexus.tenancy")
+
+
+class StoreState:
+    __slots__ = ("store_id", "products", "search", "feed", "catalogs", "chat", "forecasts", "task")
+
+    def __init__(self, store_id: int, products, search, feed, catalogs, chat, forecasts):
+        self.store_id = store_id
+        self.products, self.search, self.feed, self.catalogs, self.chat, self.forecasts = products, search, feed, catalogs, chat, forecasts
+        self.task = None
+
+
+class StoreRegistry:
+    def __init__(self, factory):
+        """factory(store_id) -> StoreState"""
+        self._factory = factory
+        self._stores = {}
+        self._serve = None
+
+    def __getitem__(self, store_id: int) -> StoreState:
+        state = self._stores.get(store_id)
+        if state is None:
+            state = self._stores[store_id] = self._factory(store_id)
+            if self._serve is not None: self._launch(state)
+        return state
+
+    def get(self, store_id: int):
+        """The store's state if it is open, else None (nothing to invalidate)."""
+        return self._stores.get(store_id)
+
+    def values(self): return list(self._stores.values())
+
+    def _launch(self, state: StoreState):
+        state.task = asyncio.ensure_future(self._serve(state))
+        state.task.add_done_callback(lambda t: t.cancelled() or t.exception() is None
+                                     or log.error("store %s background task failed", state.store_id, exc_info=t.exception()))
+
+    def start(self, serve):
+        """Run serve(state) for every open store, and for each store opened from now on."""
+        self._serve = serve
+        for state in self._stores.values(): self._launch(state)
+
+    def stop(self):
+        self._serve = None
+        for state in self._stores.values():
+            if state.task is not None: state.task.cancel()
+            state.task = None
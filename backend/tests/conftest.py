@@ -0,0 +1,54 @@
+"""
+Test setup: the backend modules import as top-level modules (as uvicorn runs them from
+backend/), and main.py reads its configuration when imported, so point it at a throwaway
+database before any test imports it.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix="nexus_tests_")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'nexus_test.db')}"
+os.environ["ANALYTICS_DIR"] = os.path.join(TEST_DIR, "analytics")
+os.environ["ANALYTICS_SNAPSHOT_INTERVAL"] = "0"
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as client: yield client
+
+
+@pytest.fixture
+def add_products():
+    """add_products(n, stock=..., price=..., store_id=...) -> fresh SKUs no other test uses."""
+    import main
+
+    def add(n=1, stock=10, price=10.0, store_id=main.DEFAULT_STORE_ID, category="TEST"):
+        prefix = uuid.uuid4().hex[:8]
+        skus = [f"T{prefix}-{i}" for i in range(n)]
+        with main.SessionLocal() as db:
+            db.add_all(main.Product(store_id=store_id, sku=sku, name=f"Test item {sku}", cost_price=price / 2, selling_price=price,
+                                    stock_quantity=stock, category=category) for sku in skus)
+            db.commit()
+        return skus
+    return add
+
+
+@pytest.fixture
+def stock_of():
+    """stock_of(skus, store_id=...) -> {sku: stock_quantity}, read straight from the database."""
+    import main
+
+    def read(skus, store_id=main.DEFAULT_STORE_ID):
+        with main.SessionLocal() as db:
+            q = db.query(main.Product.sku, main.Product.stock_quantity).filter(main.Product.store_id == store_id, main.Product.sku.in_(list(skus)))
+            return dict(q.all())
+    return read
@@ -0,0 +1,107 @@
+"""The incremental Parquet export behind /reports: late commits, gaps and part compaction."""
+import datetime
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import analytics
+import models
+from conftest import TEST_DIR
+
+SKU = "A-1"
+
+
+@pytest.fixture
+def db():
+    """A database and snapshot directory of its own, so other tests' sales don't show up in the export."""
+    path = os.path.join(TEST_DIR, f"analytics_{uuid.uuid4().hex[:8]}")
+    os.makedirs(path)
+    engine = create_engine(f"sqlite:///{os.path.join(path, 'sales.db')}")
+    models.ensure_schema(engine)
+    with Session(engine) as session:
+        session.add(models.Product(sku=SKU, name="Item", cost_price=4.0, selling_price=10.0, stock_quantity=5, category="TEST"))
+        session.commit()
+    yield engine, os.path.join(path, "snapshot")
+    engine.dispose()
+
+
+def sell(engine, *ids, quantity=1, days_ago=0):
+    """Record one sale line of SKU per transaction id, timestamped `days_ago` (batch sales arrive backdated)."""
+    at = datetime.datetime.utcnow() - datetime.timedelta(days=days_ago)
+    with Session(engine) as session:
+        for tid in ids:
+            session.add(models.Transaction(id=tid, total_amount=10.0 * quantity, payment_method="Cash", timestamp=at))
+            session.add(models.TransactionItem(transaction_id=tid, product_sku=SKU, quantity=quantity, price_at_sale=10.0))
+        session.commit()
+
+
+def exported_ids(directory, state):
+    import pandas as pd
+    frames = [pd.read_parquet(os.path.join(directory, "sales", p)) for p in state["parts"]]
+    return sorted(pd.concat(frames)["transaction_id"]) if frames else []
+
+
+def test_export_is_incremental(db):
+    engine, directory = db
+    sell(engine, 1, 2, 3)
+    first = analytics.export(engine, directory)
+    assert (first["last_transaction_id"], first["sales_rows"], first["gaps"]) == (3, 3, [])
+    sell(engine, 4, quantity=2)
+    second = analytics.export(engine, directory)
+    assert (second["version"], second["last_transaction_id"], second["sales_rows"], len(second["parts"])) == (2, 4, 4, 2)
+    assert exported_ids(directory, second) == [1, 2, 3, 4]
+    report = analytics.margin(directory, second, models.DEFAULT_STORE_ID, days=30)
+    assert report["total"] == {"units": 5, "revenue": 50.0, "cost": 20.0, "gross_margin": 30.0, "margin_pct": 60.0}
+
+
+def test_sale_committed_below_the_exported_id_is_exported_later(db):
+    engine, directory = db
+    sell(engine, 1, 2, 4)  # 3 was handed out first but hasn't committed yet
+    state = analytics.export(engine, directory)
+    assert state["last_transaction_id"] == 4
+    assert [gap[:2] for gap in state["gaps"]] == [[3, 3]]
+    sell(engine, 3, days_ago=2)  # a backdated batch sale, so no settle window on its timestamp would have held 4 back
+    state = analytics.export(engine, directory)
+    assert (exported_ids(directory, state), state["sales_rows"], state["gaps"]) == ([1, 2, 3, 4], 4, [])
+    assert analytics.margin(directory, state, models.DEFAULT_STORE_ID, days=30)["total"]["units"] == 4
+
+
+def test_gaps_are_given_up_after_gap_retry(db, monkeypatch):
+    engine, directory = db
+    sell(engine, 1, 3)
+    assert len(analytics.export(engine, directory)["gaps"]) == 1
+    monkeypatch.setattr(analytics, "GAP_RETRY", datetime.timedelta(0))
+    assert analytics.export(engine, directory)["gaps"] == []  # 2 was rolled back for good
+
+
+def test_small_parts_are_merged(db, monkeypatch):
+    engine, directory = db
+    monkeypatch.setattr(analytics, "COMPACT_PARTS", 3)
+    sell(engine, 1)
+    analytics.export(engine, directory)
+    sell(engine, 2)
+    analytics.export(engine, directory)
+    sell(engine, 3)
+    merged = analytics.export(engine, directory)
+    assert len(merged["parts"]) == 1 and len(merged["retired"]) == 3
+    assert exported_ids(directory, merged) == [1, 2, 3] and merged["sales_rows"] == 3
+    # The merged-away files stay for readers of the previous state until the next run
+    assert all(os.path.exists(os.path.join(directory, "sales", p)) for p in merged["retired"])
+    sell(engine, 4)
+    state = analytics.export(engine, directory)
+    assert not any(os.path.exists(os.path.join(directory, "sales", p)) for p in merged["retired"])
+    assert sorted(os.listdir(os.path.join(directory, "sales"))) == sorted(state["parts"])
+    assert exported_ids(directory, state) == [1, 2, 3, 4]
+
+
+def test_full_export_rebuilds(db):
+    engine, directory = db
+    sell(engine, 1, 2)
+    analytics.export(engine, directory)
+    open(os.path.join(directory, "sales", "part-stale.parquet"), "w").close()  # e.g. left from deleted sales history
+    state = analytics.export(engine, directory, full=True)
+    assert (state["version"], state["sales_rows"], exported_ids(directory, state)) == (2, 2, [1, 2])
+    assert state["retired"] == ["part-stale.parquet"]
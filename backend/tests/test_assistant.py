@@ -0,0 +1,69 @@
+import datetime
+import uuid
+
+import pytest
+
+import assistant
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("what did we sell yesterday", "revenue"),
+    ("what did we sell this week", "revenue"),
+    ("how much did we sell today", "revenue"),
+    ("revenue yesterday by payment method", "revenue"),
+    ("how much stock of zodiac", "stock_level"),
+    ("how many zodiac pumps do we have", "stock_level"),
+    ("is zodiac in stock", "stock_level"),
+    ("stock level of chlorine", "stock_level"),
+    ("top sellers this wk", "top_sellers"),
+    ("whats running low in filter boxes", "low_stock"),
+    ("items under 5 left", "low_stock"),
+    ("sell", "open_pos"),
+    ("open the till", "open_pos"),
+    ("show reports", "open_reports"),
+    ("add a product", "add_product"),
+])
+def test_routes(text, intent):
+    assert assistant.route(text)[0] == intent
+
+
+def test_questions_naming_a_period_never_navigate():
+    for text in ("sell yesterday", "sell today", "point of sale this month"):
+        assert assistant.route(text)[0] not in assistant.NAVIGATION
+
+
+def test_unrelated_text_gets_help():
+    assert assistant.route("the quick brown fox")[0] is None
+
+
+def test_product_terms_drop_the_phrasing():
+    assert assistant.product_terms("How much stock of Zodiac?") == "zodiac"
+    assert assistant.product_terms("how many zodiac pumps do we have") == "zodiac pumps"
+
+
+def test_date_range_slots():
+    now = datetime.datetime(2025, 3, 12, 15, 30)  # a Wednesday
+    label, start, end = assistant.date_range("what did we sell yesterday", now, "today")
+    assert (label, start, end) == ("yesterday", datetime.datetime(2025, 3, 11), datetime.datetime(2025, 3, 12))
+    assert assistant.date_range("top sellers this wk", now, "today")[1] == datetime.datetime(2025, 3, 10)
+
+
+def test_chat_answers_stock_level(client):
+    tag = uuid.uuid4().hex[:8]
+    sku, name = f"ZP-{tag}", f"Zodiac pump {tag}"
+    client.post("/products/", json={"sku": sku, "name": name, "cost_price": 5, "selling_price": 10, "stock_quantity": 7, "category": "PUMPS"})
+    question = {"text": f"how much stock of zodiac pump {tag}"}
+    answer = client.post("/ai/chat", json=question).json()
+    assert answer["intent"] == "stock_level"
+    assert answer["data"][0] == {"sku": sku, "name": name, "stock_quantity": 7}
+
+    client.put(f"/products/{sku}/stock", json={"quantity": 3})  # a stock edit must not leave the cached answer behind
+    assert client.post("/ai/chat", json=question).json()["data"][0]["stock_quantity"] == 3
+
+
+def test_chat_sales_question_is_answered_not_navigated(client, add_products):
+    (sku,) = add_products(1, stock=5, price=20.0)
+    client.post("/transactions/", json={"payment_method": "CASH", "items": [{"product_sku": sku, "quantity": 2}]})
+    answer = client.post("/ai/chat", json={"text": "what did we sell today"}).json()
+    assert answer["intent"] == "revenue" and answer["action"] is None
+    assert answer["data"]["revenue"] >= 40.0
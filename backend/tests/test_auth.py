@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import auth
+import main
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "REQUIRE_AUTH", True)
+    with TestClient(main.app) as client: yield client
+
+
+def bearer(role="Manager", ttl=None):
+    token = auth.issue_session_token({"email": "till@example.com", "name": "Till", "role": role}, ttl=ttl)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_session_token_round_trip():
+    claims = auth.decode_session_token(auth.issue_session_token({"email": "a@b.c", "role": "Viewer"}))
+    assert claims["sub"] == "a@b.c" and claims["role"] == "Viewer"
+    with pytest.raises(auth.AuthError): auth.decode_session_token(auth.issue_session_token({"email": "a@b.c"}, secret="other"))
+    with pytest.raises(auth.AuthError): auth.decode_session_token(auth.issue_session_token({"email": "a@b.c"}, ttl=-60))
+
+
+def test_routes_require_a_session(client):
+    assert client.get("/staff/").status_code == 401
+    assert client.get("/staff/", headers={"Authorization": "Bearer nonsense"}).status_code == 401
+    assert client.get("/staff/", headers=bearer()).status_code == 200
+    assert client.get("/staff/", params={"token": bearer()["Authorization"][7:]}).status_code == 200  # EventSource can't set headers
+    assert client.get("/staff/", headers=bearer(ttl=-60)).status_code == 401
+
+
+def test_login_stays_public(client):
+    assert client.post("/auth/admin-login", json={"username": "nobody", "password": "x"}).status_code == 401  # bad credentials, not missing session
+    res = client.post("/auth/admin-login", json={"username": main.ADMIN_USER, "password": main.ADMIN_PASS_1})
+    assert res.status_code == 200 and res.json()["token"]
+
+
+def test_refresh_issues_a_new_token(client):
+    res = client.post("/auth/refresh", headers=bearer())
+    assert res.status_code == 200
+    assert auth.decode_session_token(res.json()["token"])["sub"] == "till@example.com"
+
+
+def test_development_lets_anonymous_requests_through(monkeypatch):
+    monkeypatch.setattr(main, "REQUIRE_AUTH", False)
+    with TestClient(main.app) as client:
+        assert client.get("/staff/").status_code == 200
+        assert client.get("/staff/", headers={"Authorization": "Bearer nonsense"}).status_code == 401  # a bad token is still rejected
+
+
+def forged(kid):
+    return auth._b64encode(json.dumps({"alg": "RS256", "kid": kid}).encode()) + ".e30.c2ln"
+
+
+def test_unknown_key_ids_refetch_at_most_once_per_interval():
+    certs = auth.CertCache(fetcher=lambda: ({"real": "pem"}, 3600))
+    assert not certs.ready("real")  # cold: the first verification goes to the threadpool
+    certs.get()
+    assert certs.ready("real") and not certs.ready("made-up")  # a made-up kid may still force one refetch
+    with pytest.raises(auth.AuthError): auth.verify_google_token(forged("made-up"), "client", certs)
+    assert certs.fetches == 2 and certs.ready("made-up")  # ...and after that it's rejected without network I/O
+    for _ in range(5):
+        with pytest.raises(auth.AuthError): auth.verify_google_token(forged("another"), "client", certs)
+    assert certs.fetches == 2
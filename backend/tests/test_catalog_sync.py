@@ -0,0 +1,65 @@
+import datetime
+
+from sqlalchemy import update
+
+import main
+
+
+def age(skus, days=1):
+    """Backdate products, so they are older than any catalog version handed out during the test."""
+    with main.SessionLocal() as db:
+        db.execute(update(main.Product).where(main.Product.sku.in_(skus))
+                   .values(updated_at=datetime.datetime.utcnow() - datetime.timedelta(days=days)))
+        db.commit()
+
+
+def test_full_catalog_etag_revalidates_until_a_write(client, add_products):
+    (sku,) = add_products(1)
+    first = client.get("/products/")
+    assert first.status_code == 200 and sku in {p["sku"] for p in first.json()}
+    etag = first.headers["ETag"]
+
+    cached = client.get("/products/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+    client.put(f"/products/{sku}/stock", json={"quantity": 99})
+    changed = client.get("/products/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert next(p for p in changed.json() if p["sku"] == sku)["stock_quantity"] == 99
+
+
+def test_etag_depends_on_the_query(client, add_products):
+    add_products(3)
+    page = client.get("/products/", params={"limit": 2, "fields": "sku,stock_quantity"})
+    other = client.get("/products/", params={"limit": 2, "fields": "sku"})
+    assert page.headers["ETag"] != other.headers["ETag"]
+    assert set(page.json()[0]) == {"id", "sku", "stock_quantity"}
+    assert client.get("/products/", params={"limit": 2, "fields": "sku,stock_quantity"},
+                      headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+
+
+def test_delta_sync_returns_only_changed_products(client, add_products):
+    skus = add_products(3)
+    age(skus)
+    version = client.get("/products/").headers["X-Catalog-Version"]
+
+    client.put(f"/products/{skus[1]}/stock", json={"quantity": 1})
+    client.post("/transactions/", json={"payment_method": "CASH", "items": [{"product_sku": skus[2], "quantity": 1}]})
+    delta = client.get("/products/", params={"since": version})
+    assert delta.status_code == 200
+    changed = {p["sku"]: p["stock_quantity"] for p in delta.json() if p["sku"] in skus}
+    assert changed == {skus[1]: 1, skus[2]: 9}
+    assert int(delta.headers["X-Catalog-Version"]) >= int(version)
+
+
+def test_keyset_pagination_walks_the_whole_catalog(client, add_products):
+    skus = set(add_products(5))
+    seen, after = [], None
+    while True:
+        params = {"limit": 2, "fields": "sku", **({"after": after} if after else {})}
+        res = client.get("/products/", params=params)
+        seen += [p["sku"] for p in res.json()]
+        after = res.headers.get("X-Next-Cursor")
+        if not after: break
+    assert skus <= set(seen) and len(seen) == len(set(seen))
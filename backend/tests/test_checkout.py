@@ -0,0 +1,102 @@
+import threading
+import uuid
+
+import main
+
+
+def sale(*lines, key=None, **extra):
+    return {"payment_method": "CASH", "idempotency_key": key, "items": [{"product_sku": sku, "quantity": qty} for sku, qty in lines], **extra}
+
+
+def sales_for(key):
+    with main.SessionLocal() as db:
+        return db.query(main.Transaction).filter(main.Transaction.idempotency_key == key).count()
+
+
+def test_checkout_decrements_stock_and_prices_the_basket(client, add_products, stock_of):
+    a, b = add_products(2, stock=5, price=10.0)
+    res = client.post("/transactions/", json=sale((a, 2), (b, 1), (a, 1)))
+    assert res.status_code == 200
+    assert res.json()["status"] == "success" and res.json()["total_amount"] == 40.0
+    assert stock_of([a, b]) == {a: 2, b: 4}
+
+
+def test_short_line_rolls_back_the_whole_basket(client, add_products, stock_of):
+    a, b = add_products(2, stock=3)
+    key = str(uuid.uuid4())
+    res = client.post("/transactions/", json=sale((a, 1), (b, 4), key=key))
+    assert res.status_code == 409 and b in res.json()["detail"]
+    assert stock_of([a, b]) == {a: 3, b: 3}
+    assert sales_for(key) == 0
+
+
+def test_unknown_sku_is_rejected_before_any_decrement(client, add_products, stock_of):
+    (a,) = add_products(1, stock=3)
+    assert client.post("/transactions/", json=sale((a, 1), ("NO-SUCH-SKU", 1))).status_code == 404
+    assert stock_of([a]) == {a: 3}
+
+
+def test_retried_checkout_is_recorded_once(client, add_products, stock_of):
+    (a,) = add_products(1, stock=5)
+    key = str(uuid.uuid4())
+    first = client.post("/transactions/", json=sale((a, 2), key=key)).json()
+    again = client.post("/transactions/", json=sale((a, 2), key=key)).json()
+    assert first["status"] == "success"
+    assert again["status"] == "duplicate" and again["transaction_id"] == first["transaction_id"]
+    assert stock_of([a]) == {a: 3}
+    assert sales_for(key) == 1
+
+
+def test_concurrent_lanes_never_oversell(client, add_products, stock_of):
+    (hot,) = add_products(1, stock=25)
+    statuses, lock = [], threading.Lock()
+
+    def lane():
+        for _ in range(10):
+            code = client.post("/transactions/", json=sale((hot, 1))).status_code
+            with lock: statuses.append(code)
+
+    threads = [threading.Thread(target=lane) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert set(statuses) <= {200, 409}
+    assert statuses.count(200) == 25
+    assert stock_of([hot]) == {hot: 0}
+
+
+def test_batch_upload_is_idempotent(client, add_products, stock_of):
+    a, b = add_products(2, stock=4)
+    k1, k2, k3 = (str(uuid.uuid4()) for _ in range(3))
+    batch = {"sales": [sale((a, 1), key=k1), sale((b, 5), key=k2), sale((a, 1), key=k1), sale((b, 2), key=k3)]}
+    first = client.post("/transactions/batch", json=batch).json()
+    assert [r["status"] for r in first["results"]] == ["created", "failed", "duplicate", "created"]
+    assert stock_of([a, b]) == {a: 3, b: 2}
+
+    again = client.post("/transactions/batch", json=batch).json()  # the till never saw the response and re-sends
+    assert [r["status"] for r in again["results"]] == ["duplicate", "failed", "duplicate", "duplicate"]
+    assert again["results"][0]["transaction_id"] == first["results"][0]["transaction_id"]
+    assert stock_of([a, b]) == {a: 3, b: 2}
+
+
+def test_batch_key_already_sold_online_is_a_duplicate(client, add_products, stock_of):
+    (a,) = add_products(1, stock=4)
+    key = str(uuid.uuid4())
+    online = client.post("/transactions/", json=sale((a, 1), key=key)).json()
+    result = client.post("/transactions/batch", json={"sales": [sale((a, 1), key=key)]}).json()["results"][0]
+    assert result["status"] == "duplicate" and result["transaction_id"] == online["transaction_id"]
+    assert stock_of([a]) == {a: 3}
+
+
+def test_idempotency_keys_are_scoped_to_the_store(client, add_products, stock_of):
+    code = f"BR-{uuid.uuid4().hex[:6]}"
+    branch = client.post("/stores/", json={"code": code, "name": code}).json()["id"]
+    (main_sku,) = add_products(1, stock=5)
+    (branch_sku,) = add_products(1, stock=5, store_id=branch)
+    key = str(uuid.uuid4())
+    here = client.post("/transactions/", json=sale((main_sku, 1), key=key)).json()
+    there = client.post("/transactions/", json=sale((branch_sku, 1), key=key), headers={"X-Store-Id": str(branch)}).json()
+    assert here["status"] == there["status"] == "success"  # another till's key is not this store's sale
+    assert there["transaction_id"] != here["transaction_id"]
+    batch = client.post("/transactions/batch", json={"sales": [sale((branch_sku, 1), key=key)]}, headers={"X-Store-Id": str(branch)}).json()
+    assert batch["results"][0]["status"] == "duplicate" and batch["results"][0]["transaction_id"] == there["transaction_id"]
+    assert stock_of([main_sku]) == {main_sku: 4} and stock_of([branch_sku], store_id=branch) == {branch_sku: 4}
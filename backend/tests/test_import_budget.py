@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+
+from conftest import BACKEND_DIR
+
+
+def test_api_imports_stay_light_and_fast():
+    """benchmarks/import_budget.py as a test: no analytics stack, no database access, within budget."""
+    script = os.path.join(BACKEND_DIR, "benchmarks", "import_budget.py")
+    res = subprocess.run([sys.executable, script, "--runs", "3"], capture_output=True, text=True)
+    assert res.returncode == 0, res.stdout + res.stderr
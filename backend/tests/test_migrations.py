@@ -0,0 +1,108 @@
+"""ensure_schema() upgrading a database created by the original (pre-store, pre-sync) schema."""
+import datetime
+import os
+
+import pytest
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, declarative_base
+
+import models
+from conftest import TEST_DIR
+
+Baseline = declarative_base()
+
+
+class BaselineProduct(Baseline):
+    __tablename__ = "products"
+    id = Column(Integer, primary_key=True, index=True)
+    sku = Column(String, unique=True, index=True)
+    name = Column(String)
+    cost_price = Column(Float)
+    selling_price = Column(Float)
+    stock_quantity = Column(Integer, default=0)
+    category = Column(String)
+
+
+class BaselineProductImage(Baseline):
+    __tablename__ = "product_images"
+    id = Column(Integer, primary_key=True, index=True)
+    product_sku = Column(String, ForeignKey("products.sku"))
+    image_url = Column(String)
+    is_primary = Column(Boolean, default=False)
+
+
+class BaselineTransaction(Baseline):
+    __tablename__ = "transactions"
+    id = Column(Integer, primary_key=True, index=True)
+    total_amount = Column(Float)
+    payment_method = Column(String)
+    timestamp = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class BaselineTransactionItem(Baseline):
+    __tablename__ = "transaction_items"
+    id = Column(Integer, primary_key=True, index=True)
+    transaction_id = Column(Integer, ForeignKey("transactions.id"))
+    product_sku = Column(String)
+    quantity = Column(Integer)
+    price_at_sale = Column(Float)
+
+
+class BaselineStaff(Baseline):
+    __tablename__ = "staff"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String)
+    role = Column(String)
+    passcode = Column(String)
+
+
+@pytest.fixture
+def baseline_engine(request):
+    path = os.path.join(TEST_DIR, f"baseline-{request.node.name}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Baseline.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO products (sku, name, cost_price, selling_price, stock_quantity, category) "
+                          "VALUES ('6009626403787', 'Zodiac pump', 900, 1500, 4, 'PUMPS')"))
+        conn.execute(text("INSERT INTO product_images (product_sku, image_url, is_primary) VALUES ('6009626403787', 'https://cdn/z.jpg', 1)"))
+        conn.execute(text("INSERT INTO transactions (id, total_amount, payment_method, timestamp) VALUES (1, 1500, 'CASH', '2025-01-02 10:00:00')"))
+        conn.execute(text("INSERT INTO transaction_items (transaction_id, product_sku, quantity, price_at_sale) VALUES (1, '6009626403787', 1, 1500)"))
+        conn.execute(text("INSERT INTO staff (name, role, passcode) VALUES ('Sam', 'Cashier', '1234')"))
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_keeps_rows_and_backfills_new_columns(baseline_engine):
+    models.ensure_schema(baseline_engine)
+    with baseline_engine.connect() as conn:
+        product = conn.execute(text("SELECT sku, stock_quantity, store_id, updated_at FROM products")).one()
+        assert product[:3] == ("6009626403787", 4, models.DEFAULT_STORE_ID) and product.updated_at is not None
+        assert conn.execute(text("SELECT store_id, idempotency_key FROM transactions")).one() == (models.DEFAULT_STORE_ID, None)
+        assert conn.execute(text("SELECT store_id FROM staff")).scalar() == models.DEFAULT_STORE_ID
+        assert conn.execute(text("SELECT image_url, updated_at IS NOT NULL FROM product_images")).one() == ("https://cdn/z.jpg", 1)
+        assert conn.execute(text("SELECT code FROM stores WHERE id = :id"), {"id": models.DEFAULT_STORE_ID}).scalar() == models.DEFAULT_STORE_CODE
+
+
+def test_upgrade_narrows_uniqueness_to_the_store(baseline_engine):
+    models.ensure_schema(baseline_engine)
+    indexes = {ix["name"]: ix["unique"] for ix in inspect(baseline_engine).get_indexes("products")}
+    assert indexes["uq_products_store_sku"] and not indexes.get("ix_products_sku", False)
+    with Session(baseline_engine) as db:
+        branch = models.Store(code="BR2", name="Branch 2")
+        db.add(branch)
+        db.flush()
+        db.add(models.Product(store_id=branch.id, sku="6009626403787", name="Zodiac pump", stock_quantity=2))
+        db.commit()  # the same barcode in a second store
+        db.add(models.Product(store_id=branch.id, sku="6009626403787", name="Duplicate"))
+        with pytest.raises(IntegrityError): db.commit()
+
+
+def test_upgrade_is_idempotent(baseline_engine):
+    models.ensure_schema(baseline_engine)
+    before = {t: inspect(baseline_engine).get_columns(t) for t in ("products", "transactions")}
+    models.ensure_schema(baseline_engine)
+    after = {t: inspect(baseline_engine).get_columns(t) for t in ("products", "transactions")}
+    assert [c["name"] for c in before["products"]] == [c["name"] for c in after["products"]]
+    with baseline_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM stores")).scalar() == 1
@@ -0,0 +1,30 @@
+from sku_cache import SkuCache
+
+
+def test_hits_after_store():
+    cache = SkuCache()
+    found, missing, generation = cache.lookup(["A", "B"])
+    assert found == {} and missing == ["A", "B"]
+    cache.store({"A": {"sku": "A"}}, generation)
+    found, missing, _ = cache.lookup(["A", "B"])
+    assert found == {"A": {"sku": "A"}} and missing == ["B"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_load_started_before_invalidate_is_not_cached():
+    cache = SkuCache()
+    _, missing, generation = cache.lookup(["A"])
+    cache.invalidate(["A"])  # a sale changed A while the load was still reading the old row
+    cache.store({"A": {"sku": "A", "stock_quantity": 5}}, generation)
+    assert cache.lookup(["A"])[1] == ["A"]
+
+
+def test_lru_eviction():
+    cache = SkuCache(maxsize=2)
+    generation = cache.lookup([])[2]
+    cache.store({"A": 1, "B": 2}, generation)
+    cache.lookup(["A"])
+    cache.store({"C": 3}, generation)
+    found, missing, _ = cache.lookup(["A", "B", "C"])
+    assert found == {"A": 1, "C": 3} and missing == ["B"]
+    assert cache.stats()["evictions"] == 1
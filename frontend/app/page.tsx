@@ -12,21 +12,58 @@ import {
 // --- CONFIGURATION ---
 const GOOGLE_CLIENT_ID = "499075396456-25b2eqf24q74fp84v0gr7bivsudhit3l.apps.googleusercontent.com"; // Ensure this is real
 const API_BASE_URL = "https://nexus-retail-ai.onrender.com";
+// POS tiles are a third of the two-thirds-wide grid; the API returns the smallest image variant that still fills one
+const tileImageWidth = () => Math.round((window.innerWidth * 2 / 9) * (window.devicePixelRatio || 1));
 
 // --- TYPES ---
 interface ProductImage { id: number; image_url: string; is_primary: boolean; }
 interface Product { 
   id: number; sku: string; name: string; cost_price: number; selling_price: number; 
   stock_quantity: number; category: string; 
+  image_url?: string | null; // primary image; the full list comes with ?fields=...,images
   images?: ProductImage[]; // Images Array
 }
 interface CartItem extends Product { qty: number; }
 interface Transaction { id: number; total_amount: number; payment_method: string; timestamp: string; }
-interface UserProfile { email: string; name: string; picture: string; role: string; }
+interface SalesSummary { revenue: number; units: number; transactions: number; by_payment: Record<string, { units: number; revenue: number; transactions: number }>; }
+interface RollupRow { bucket: string; key: string; units: number; revenue: number; transactions: number; }
+interface UserProfile { email: string; name: string; picture: string; role: string; token?: string; expires_at?: number; }
 interface Staff { id: number; name: string; role: string; passcode: string; }
 interface Supplier { id: number; name: string; contact_email: string; phone: string; }
-interface AIPrediction { sku: string; predicted_weekly_demand: number; trend: "Growing" | "Declining"; recommendation: string; }
+interface AIPrediction { sku: string; predicted_weekly_demand: number; trend: "Growing" | "Declining" | "Stable" | "No Data"; recommendation: string; }
 interface ChatMessage { sender: "user" | "nexus"; text: string; }
+interface QueuedSale { idempotency_key: string; payment_method: string; timestamp: string; items: { product_sku: string; quantity: number }[]; }
+interface BatchResult { idempotency_key: string; status: "created" | "duplicate" | "failed"; detail?: string; }
+
+// --- SESSION ---
+// Every API call carries the session token issued at login; the app renews it before it expires.
+const USER_KEY = "nexus_user";
+const sessionToken = (): string | undefined => { try { return JSON.parse(localStorage.getItem(USER_KEY) || "null")?.token; } catch { return undefined; } };
+const apiFetch = (path: string, init: RequestInit = {}) => {
+  const headers = new Headers(init.headers);
+  const token = sessionToken();
+  if (token) headers.set("Authorization", `Bearer ${token}`);
+  return fetch(`${API_BASE_URL}${path}`, { ...init, headers });
+};
+const sessionUser = (data: { user: UserProfile; token: string; expires_in: number }): UserProfile => ({ ...data.user, token: data.token, expires_at: Date.now() + data.expires_in * 1000 });
+
+// --- OFFLINE SALE QUEUE ---
+// Sales rung up while the API is unreachable wait in localStorage and go up in one
+// /transactions/batch call; idempotency keys make re-sending after a timeout safe.
+const SALE_QUEUE_KEY = "nexus_sale_queue";
+const loadSaleQueue = (): QueuedSale[] => { try { return JSON.parse(localStorage.getItem(SALE_QUEUE_KEY) || "[]"); } catch { return []; } };
+const saveSaleQueue = (queue: QueuedSale[]) => localStorage.setItem(SALE_QUEUE_KEY, JSON.stringify(queue));
+async function flushSaleQueue(): Promise<BatchResult[]> {
+  const queue = loadSaleQueue().slice(0, 500);
+  if (queue.length === 0) return [];
+  const res = await apiFetch(`/transactions/batch`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ sales: queue }) });
+  if (!res.ok) return [];
+  const data: { results: BatchResult[] } = await res.json();
+  // Every result is final (created, already recorded, or rejected), so all of them leave the queue
+  const settled = new Set(data.results.map((r) => r.idempotency_key));
+  saveSaleQueue(loadSaleQueue().filter((s) => !settled.has(s.idempotency_key)));
+  return data.results;
+}
 
 export default function NexusApp() {
   const [user, setUser] = useState<UserProfile | null>(null);
@@ -38,7 +75,7 @@ export default function NexusApp() {
   const [adminPass, setAdminPass] = useState("");
 
   useEffect(() => {
-    const savedUser = localStorage.getItem("nexus_user");
+    const savedUser = localStorage.getItem(USER_KEY);
     if (savedUser) setUser(JSON.parse(savedUser));
     const savedName = localStorage.getItem("storeName");
     if (savedName) setStoreName(savedName);
@@ -46,24 +83,68 @@ export default function NexusApp() {
     if (savedUser && !onboardingDone) setShowOnboarding(true);
   }, []);
 
+  const catalogVersion = useRef<string | null>(null);
+  const catalogEtag = useRef<string | null>(null);
+
+  // Delta sync: after the first full load only products changed since our last version come back
   const fetchProducts = () => {
     if (!user) return; 
-    fetch(`${API_BASE_URL}/products/`)
-      .then((res) => { if (!res.ok) throw new Error("Backend Error"); return res.json(); })
-      .then((data) => setProducts(data))
+    const since = catalogVersion.current;
+    const headers: Record<string, string> = {};
+    if (since && catalogEtag.current) headers["If-None-Match"] = catalogEtag.current;
+    apiFetch(`/products/?image_width=${tileImageWidth()}${since ? `&since=${since}` : ""}`, { headers })
+      .then((res) => {
+        if (res.status === 304) return null;
+        if (!res.ok) throw new Error("Backend Error");
+        catalogVersion.current = res.headers.get("X-Catalog-Version");
+        catalogEtag.current = res.headers.get("ETag");
+        return res.json();
+      })
+      .then((data: Product[] | null) => {
+        if (!data) return;
+        if (!since) { setProducts(data); return; }
+        setProducts((prev) => {
+          const changed = new Map(data.map((p) => [p.id, p]));
+          const merged = prev.map((p) => changed.get(p.id) ?? p);
+          const known = new Set(prev.map((p) => p.id));
+          return merged.concat(data.filter((p) => !known.has(p.id)));
+        });
+      })
       .catch(err => console.warn("API Note: Backend sleeping?"));
   };
 
-  useEffect(() => { if (user) fetchProducts(); }, [user]);
+  // Live catalog: the server pushes per-SKU patches after sales, stock edits and imports.
+  // `resync` (first connect, or a gap it can't replay) catches up with a ?since= delta fetch.
+  const feedLive = useRef(false);
+  useEffect(() => {
+    if (!user) return;
+    if (typeof EventSource === "undefined") { fetchProducts(); return; }
+    const feed = new EventSource(`${API_BASE_URL}/products/stream${user.token ? `?token=${encodeURIComponent(user.token)}` : ""}`);  // EventSource can't send headers
+    feed.onopen = () => { feedLive.current = true; };
+    feed.onerror = () => { feedLive.current = false; };
+    feed.addEventListener("resync", () => fetchProducts());
+    feed.addEventListener("products", (e) => {
+      const patches: Product[] = JSON.parse((e as MessageEvent).data);
+      setProducts((prev) => {
+        const bySku = new Map(patches.map((p) => [p.sku, p]));
+        const merged = prev.map((p) => (bySku.has(p.sku) ? { ...p, ...bySku.get(p.sku) } : p));
+        const known = new Set(prev.map((p) => p.sku));
+        return merged.concat(patches.filter((p) => !known.has(p.sku)).map((p) => ({ ...p, image_url: null })));
+      });
+    });
+    return () => { feedLive.current = false; feed.close(); };
+  }, [user]);
+  // With the feed connected, writes come back as patches; only poll when it is down
+  const refreshCatalog = () => { if (!feedLive.current) fetchProducts(); };
 
   const handleGoogleSuccess = async (credentialResponse: any) => {
     const token = credentialResponse.credential;
     try {
-      const res = await fetch(`${API_BASE_URL}/auth/login`, {
+      const res = await apiFetch(`/auth/login`, {
         method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ credential: token })
       });
       const data = await res.json();
-      if (data.status === "success") loginUser(data.user);
+      if (data.status === "success") loginUser(sessionUser(data));
       else throw new Error(data.detail);
     } catch (err) {
       console.warn("Dev Mode Login");
@@ -74,18 +155,36 @@ export default function NexusApp() {
 
   const handleAdminLogin = async () => {
     try {
-      const res = await fetch(`${API_BASE_URL}/auth/admin-login`, {
+      const res = await apiFetch(`/auth/admin-login`, {
         method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ username: adminUser, password: adminPass })
       });
-      if (res.ok) { const data = await res.json(); loginUser(data.user); } else { alert("Invalid Admin Credentials"); }
+      if (res.ok) { const data = await res.json(); loginUser(sessionUser(data)); } else { alert("Invalid Admin Credentials"); }
     } catch (err) { alert("Network Error"); }
   };
 
   const handleSkipDev = () => { loginUser({ name: "Guest Developer", email: "guest@dev.local", picture: "", role: "Viewer" }); };
-  const loginUser = (userData: UserProfile) => { setUser(userData); localStorage.setItem("nexus_user", JSON.stringify(userData)); if (!localStorage.getItem("nexus_onboarding_complete")) setShowOnboarding(true); }
-  const handleLogout = () => { setUser(null); localStorage.removeItem("nexus_user"); setActiveTab("dashboard"); };
+  const saveUser = (userData: UserProfile) => { setUser(userData); localStorage.setItem(USER_KEY, JSON.stringify(userData)); };
+  const loginUser = (userData: UserProfile) => { saveUser(userData); if (!localStorage.getItem("nexus_onboarding_complete")) setShowOnboarding(true); }
+  const handleLogout = () => { setUser(null); localStorage.removeItem(USER_KEY); setActiveTab("dashboard"); };
   const completeOnboarding = () => { localStorage.setItem("nexus_onboarding_complete", "true"); setShowOnboarding(false); if(user) fetchProducts(); };
 
+  // Renew the session a minute before it lapses. A refused refresh (expired, or signed with a secret the
+  // server no longer has) logs out; a network failure keeps retrying so an offline till stays signed in.
+  useEffect(() => {
+    if (!user?.token) return;
+    let timer: ReturnType<typeof setTimeout>;
+    const refresh = async () => {
+      try {
+        const res = await apiFetch("/auth/refresh", { method: "POST" });
+        if (res.status === 401) { handleLogout(); return; }
+        if (!res.ok) throw new Error("Refresh failed");
+        saveUser(sessionUser(await res.json()));
+      } catch { timer = setTimeout(refresh, 30000); }
+    };
+    timer = setTimeout(refresh, user.expires_at ? Math.max(0, user.expires_at - Date.now() - 60000) : 0);  // logins saved before expires_at: renew now
+    return () => clearTimeout(timer);
+  }, [user]);
+
   if (!user) {
     return (
       <GoogleOAuthProvider clientId={GOOGLE_CLIENT_ID}>
@@ -113,10 +212,10 @@ export default function NexusApp() {
       <main className="flex-1 overflow-hidden relative">
         <div className="h-full overflow-y-auto custom-scrollbar">
           {activeTab === "dashboard" && <DashboardView products={products} navigate={setActiveTab} role={user.role} />}
-          {activeTab === "pos" && <POSView products={products} refresh={fetchProducts} />}
+          {activeTab === "pos" && <POSView products={products} refresh={refreshCatalog} />}
           {activeTab === "chat" && <ChatView navigate={setActiveTab} />}
-          {activeTab === "add-product" && (user.role === "Manager" ? <AddProductView refresh={fetchProducts} navigate={setActiveTab} /> : <AccessDenied/>)}
-          {activeTab === "inventory" && <InventoryView products={products} refresh={fetchProducts} />}
+          {activeTab === "add-product" && (user.role === "Manager" ? <AddProductView refresh={refreshCatalog} navigate={setActiveTab} /> : <AccessDenied/>)}
+          {activeTab === "inventory" && <InventoryView products={products} refresh={refreshCatalog} />}
           {activeTab === "reports" && (user.role === "Manager" ? <ReportsView /> : <AccessDenied/>)}
           {activeTab === "staff" && (user.role === "Manager" ? <StaffView /> : <AccessDenied/>)}
           {activeTab === "suppliers" && <SuppliersView />}
@@ -152,22 +251,30 @@ function POSView({ products, refresh }: { products: Product[], refresh: Function
   const [predictions, setPredictions] = useState<Record<string, AIPrediction>>({}); 
   const [search, setSearch] = useState("");
   
-  const filteredProducts = products.filter(p => p.name.toLowerCase().includes(search.toLowerCase()) || p.sku.toLowerCase().includes(search.toLowerCase()) || p.category?.toLowerCase().includes(search.toLowerCase()));
+  const [searchHits, setSearchHits] = useState<string[] | null>(null);
+  // Typo-tolerant server-side search (ranked SKUs); the plain substring filter covers the moment before it answers
+  useEffect(() => { const q = search.trim(); if (!q) { setSearchHits(null); return; } const timer = setTimeout(() => { apiFetch(`/products/search?q=${encodeURIComponent(q)}&limit=50`).then(r => r.json()).then((rows: Product[]) => setSearchHits(rows.map((r) => r.sku))).catch(() => setSearchHits(null)); }, 150); return () => clearTimeout(timer); }, [search]);
+  const bySku = new Map(products.map((p) => [p.sku, p]));
+  const filteredProducts = searchHits ? searchHits.map((sku) => bySku.get(sku)).filter((p): p is Product => !!p) : products.filter(p => p.name.toLowerCase().includes(search.toLowerCase()) || p.sku.toLowerCase().includes(search.toLowerCase()) || p.category?.toLowerCase().includes(search.toLowerCase()));
   const addToCart = (product: Product) => { setCart((prev) => { const existing = prev.find((item) => item.sku === product.sku); if (existing) return prev.map((item) => item.sku === product.sku ? { ...item, qty: item.qty + 1 } : item); return [...prev, { ...product, qty: 1 }]; }); };
-  const fetchAI = async (sku: string) => { try { const res = await fetch(`${API_BASE_URL}/ai/predict/${sku}`); const data = await res.json(); setPredictions((prev) => ({ ...prev, [sku]: data })); } catch (err) { console.error(err); } };
-  const handleCheckout = async () => { if (cart.length === 0) { alert("Cart is empty!"); return; } const payload = { payment_method: "CASH", items: cart.map((item) => ({ product_sku: item.sku, quantity: item.qty })) }; try { const res = await fetch(`${API_BASE_URL}/transactions/`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(payload) }); if (res.ok) { alert("✅ Sale Successful!"); setCart([]); refresh(); } else { const err = await res.json(); alert(`❌ Failed: ${err.detail}`); } } catch (err) { alert("Network Error"); } };
+  // One batch call fills in predictions for every visible tile, not just the one clicked
+  const fetchAI = async (sku: string) => { const skus = Array.from(new Set([sku, ...filteredProducts.map((p) => p.sku).filter((s) => !predictions[s])])); try { const res = await apiFetch(`/ai/predict/batch`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ skus }) }); const data = await res.json(); setPredictions((prev) => ({ ...prev, ...Object.fromEntries(data.predictions.map((p: AIPrediction) => [p.sku, p])) })); } catch (err) { console.error(err); } };
+  const [queued, setQueued] = useState(0);
+  const syncQueue = async () => { try { const results = await flushSaleQueue(); const failed = results.filter((r) => r.status === "failed"); if (results.length) refresh(); if (failed.length) alert(`⚠️ ${failed.length} offline sale(s) could not be recorded: ${failed.map((r) => r.detail).join(", ")}`); } catch (err) { /* still offline */ } setQueued(loadSaleQueue().length); };
+  useEffect(() => { syncQueue(); window.addEventListener("online", syncQueue); const timer = setInterval(() => { if (loadSaleQueue().length) syncQueue(); }, 30000); return () => { window.removeEventListener("online", syncQueue); clearInterval(timer); }; }, []);
+  const handleCheckout = async () => { if (cart.length === 0) { alert("Cart is empty!"); return; } const payload: QueuedSale = { idempotency_key: crypto.randomUUID(), payment_method: "CASH", timestamp: new Date().toISOString(), items: cart.map((item) => ({ product_sku: item.sku, quantity: item.qty })) }; try { const res = await apiFetch(`/transactions/`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(payload) }); if (res.ok) { alert("✅ Sale Successful!"); setCart([]); refresh(); } else { const err = await res.json(); alert(`❌ Failed: ${err.detail}`); } } catch (err) { saveSaleQueue([...loadSaleQueue(), payload]); setQueued(loadSaleQueue().length); setCart([]); alert("📴 Offline: sale saved on this till and will upload when the connection is back."); } };
   const totalAmount = cart.reduce((sum, item) => sum + item.selling_price * item.qty, 0);
   
   return (
     <div className="flex h-full bg-[#F3F4F6]">
         <div className="w-2/3 p-8 overflow-y-auto">
-            <header className="mb-8 flex justify-between items-center"><div><h2 className="text-3xl font-bold text-gray-900">Point of Sale</h2><p className="text-gray-500 mt-1">{products.length} Items</p></div><div className="relative"><Search className="absolute left-4 top-3 text-gray-400" size={20} /><input type="text" placeholder="Search products..." className="pl-12 pr-6 py-3 rounded-full border border-gray-200 bg-white shadow-sm w-64" onChange={(e) => setSearch(e.target.value)} /></div></header>
+            <header className="mb-8 flex justify-between items-center"><div><h2 className="text-3xl font-bold text-gray-900">Point of Sale</h2><p className="text-gray-500 mt-1">{products.length} Items{queued > 0 && <span className="text-amber-600 font-bold"> · {queued} offline sale{queued === 1 ? "" : "s"} waiting to upload</span>}</p></div><div className="relative"><Search className="absolute left-4 top-3 text-gray-400" size={20} /><input type="text" placeholder="Search products..." className="pl-12 pr-6 py-3 rounded-full border border-gray-200 bg-white shadow-sm w-64" onChange={(e) => setSearch(e.target.value)} /></div></header>
             <div className="grid grid-cols-3 gap-5">
                 {filteredProducts.map((p) => (
                     <div key={p.sku} className="bg-white rounded-2xl border border-gray-100 shadow-sm overflow-hidden hover:shadow-lg transition-all cursor-pointer flex flex-col group" onClick={() => addToCart(p)}>
                         <div className="h-40 bg-gray-50 relative flex items-center justify-center overflow-hidden">
-                            {p.images && p.images.length > 0 ? (
-                                <img src={p.images[0].image_url} alt={p.name} className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-500" />
+                            {p.image_url ? (
+                                <img src={p.image_url} alt={p.name} className="w-full h-full object-cover group-hover:scale-110 transition-transform duration-500" />
                             ) : (<div className="text-gray-300"><Package size={48} /></div>)}
                             <div className="absolute top-2 right-2 bg-black/50 text-white text-[10px] px-2 py-1 rounded-full backdrop-blur-sm">{p.stock_quantity} left</div>
                         </div>
@@ -183,13 +290,13 @@ function POSView({ products, refresh }: { products: Product[], refresh: Function
 }
 
 // ... (Rest of modules StaffView, SuppliersView etc. - same as before)
-function StaffView() { const [staff, setStaff] = useState<Staff[]>([]); const [form, setForm] = useState({ name: "", role: "Cashier", passcode: "" }); const fetchStaff = () => { fetch(`${API_BASE_URL}/staff/`).then(r => r.json()).then(setStaff).catch(console.error); }; useEffect(() => { fetchStaff(); }, []); const handleAdd = async () => { await fetch(`${API_BASE_URL}/staff/`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(form) }); alert("Staff Member Added"); fetchStaff(); setForm({ name: "", role: "Cashier", passcode: "" }); }; return (<div className="p-10 max-w-5xl mx-auto"><div className="flex justify-between items-center mb-8"><h2 className="text-3xl font-bold">Staff Management</h2><div className="bg-white p-4 rounded-xl border border-gray-200 flex gap-2"><input placeholder="Name" value={form.name} onChange={e => setForm({...form, name: e.target.value})} className="border p-2 rounded text-sm"/><select value={form.role} onChange={e => setForm({...form, role: e.target.value})} className="border p-2 rounded text-sm"><option>Cashier</option><option>Manager</option></select><input placeholder="Passcode" value={form.passcode} onChange={e => setForm({...form, passcode: e.target.value})} className="border p-2 rounded text-sm w-24"/><button onClick={handleAdd} className="bg-indigo-600 text-white p-2 rounded hover:bg-indigo-700"><UserPlus size={20}/></button></div></div><div className="grid grid-cols-3 gap-6">{staff.map(s => (<div key={s.id} className="bg-white p-6 rounded-2xl border border-gray-100 shadow-sm flex items-center justify-between"><div className="flex items-center gap-4"><div className="w-12 h-12 bg-gray-100 rounded-full flex items-center justify-center font-bold text-gray-500">{s.name.charAt(0)}</div><div><h4 className="font-bold text-lg">{s.name}</h4><p className="text-sm text-gray-500">{s.role}</p></div></div><div className="text-xs bg-gray-50 px-2 py-1 rounded text-gray-400">ID: {s.passcode}</div></div>))}{staff.length === 0 && <p className="text-gray-400 col-span-3 text-center py-10">No staff members found.</p>}</div></div>); }
-function SuppliersView() { const [suppliers, setSuppliers] = useState<Supplier[]>([]); const [form, setForm] = useState({ name: "", contact_email: "", phone: "" }); const fetchSuppliers = () => { fetch(`${API_BASE_URL}/suppliers/`).then(r => r.json()).then(setSuppliers).catch(console.error); }; useEffect(() => { fetchSuppliers(); }, []); const handleAdd = async () => { await fetch(`${API_BASE_URL}/suppliers/`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(form) }); alert("Supplier Added"); fetchSuppliers(); setForm({ name: "", contact_email: "", phone: "" }); }; return (<div className="p-10 max-w-5xl mx-auto"><div className="flex justify-between items-center mb-8"><h2 className="text-3xl font-bold">Suppliers</h2><div className="bg-white p-4 rounded-xl border border-gray-200 flex gap-2"><input placeholder="Company Name" value={form.name} onChange={e => setForm({...form, name: e.target.value})} className="border p-2 rounded text-sm"/><input placeholder="Email" value={form.contact_email} onChange={e => setForm({...form, contact_email: e.target.value})} className="border p-2 rounded text-sm"/><input placeholder="Phone" value={form.phone} onChange={e => setForm({...form, phone: e.target.value})} className="border p-2 rounded text-sm w-32"/><button onClick={handleAdd} className="bg-indigo-600 text-white p-2 rounded hover:bg-indigo-700"><Plus size={20}/></button></div></div><div className="bg-white rounded-[20px] shadow-sm border border-gray-200 overflow-hidden"><table className="w-full text-left"><thead className="bg-gray-50 text-gray-500 text-sm"><tr><th className="p-5">Company</th><th className="p-5">Email</th><th className="p-5">Phone</th></tr></thead><tbody className="divide-y divide-gray-100">{suppliers.map(s => (<tr key={s.id}><td className="p-5 font-bold">{s.name}</td><td className="p-5 text-gray-600">{s.contact_email}</td><td className="p-5 text-gray-600">{s.phone}</td></tr>))}</tbody></table>{suppliers.length === 0 && <p className="p-8 text-center text-gray-400">No suppliers registered.</p>}</div></div>); }
+function StaffView() { const [staff, setStaff] = useState<Staff[]>([]); const [form, setForm] = useState({ name: "", role: "Cashier", passcode: "" }); const fetchStaff = () => { apiFetch(`/staff/`).then(r => r.json()).then(setStaff).catch(console.error); }; useEffect(() => { fetchStaff(); }, []); const handleAdd = async () => { await apiFetch(`/staff/`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(form) }); alert("Staff Member Added"); fetchStaff(); setForm({ name: "", role: "Cashier", passcode: "" }); }; return (<div className="p-10 max-w-5xl mx-auto"><div className="flex justify-between items-center mb-8"><h2 className="text-3xl font-bold">Staff Management</h2><div className="bg-white p-4 rounded-xl border border-gray-200 flex gap-2"><input placeholder="Name" value={form.name} onChange={e => setForm({...form, name: e.target.value})} className="border p-2 rounded text-sm"/><select value={form.role} onChange={e => setForm({...form, role: e.target.value})} className="border p-2 rounded text-sm"><option>Cashier</option><option>Manager</option></select><input placeholder="Passcode" value={form.passcode} onChange={e => setForm({...form, passcode: e.target.value})} className="border p-2 rounded text-sm w-24"/><button onClick={handleAdd} className="bg-indigo-600 text-white p-2 rounded hover:bg-indigo-700"><UserPlus size={20}/></button></div></div><div className="grid grid-cols-3 gap-6">{staff.map(s => (<div key={s.id} className="bg-white p-6 rounded-2xl border border-gray-100 shadow-sm flex items-center justify-between"><div className="flex items-center gap-4"><div className="w-12 h-12 bg-gray-100 rounded-full flex items-center justify-center font-bold text-gray-500">{s.name.charAt(0)}</div><div><h4 className="font-bold text-lg">{s.name}</h4><p className="text-sm text-gray-500">{s.role}</p></div></div><div className="text-xs bg-gray-50 px-2 py-1 rounded text-gray-400">ID: {s.passcode}</div></div>))}{staff.length === 0 && <p className="text-gray-400 col-span-3 text-center py-10">No staff members found.</p>}</div></div>); }
+function SuppliersView() { const [suppliers, setSuppliers] = useState<Supplier[]>([]); const [form, setForm] = useState({ name: "", contact_email: "", phone: "" }); const fetchSuppliers = () => { apiFetch(`/suppliers/`).then(r => r.json()).then(setSuppliers).catch(console.error); }; useEffect(() => { fetchSuppliers(); }, []); const handleAdd = async () => { await apiFetch(`/suppliers/`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(form) }); alert("Supplier Added"); fetchSuppliers(); setForm({ name: "", contact_email: "", phone: "" }); }; return (<div className="p-10 max-w-5xl mx-auto"><div className="flex justify-between items-center mb-8"><h2 className="text-3xl font-bold">Suppliers</h2><div className="bg-white p-4 rounded-xl border border-gray-200 flex gap-2"><input placeholder="Company Name" value={form.name} onChange={e => setForm({...form, name: e.target.value})} className="border p-2 rounded text-sm"/><input placeholder="Email" value={form.contact_email} onChange={e => setForm({...form, contact_email: e.target.value})} className="border p-2 rounded text-sm"/><input placeholder="Phone" value={form.phone} onChange={e => setForm({...form, phone: e.target.value})} className="border p-2 rounded text-sm w-32"/><button onClick={handleAdd} className="bg-indigo-600 text-white p-2 rounded hover:bg-indigo-700"><Plus size={20}/></button></div></div><div className="bg-white rounded-[20px] shadow-sm border border-gray-200 overflow-hidden"><table className="w-full text-left"><thead className="bg-gray-50 text-gray-500 text-sm"><tr><th className="p-5">Company</th><th className="p-5">Email</th><th className="p-5">Phone</th></tr></thead><tbody className="divide-y divide-gray-100">{suppliers.map(s => (<tr key={s.id}><td className="p-5 font-bold">{s.name}</td><td className="p-5 text-gray-600">{s.contact_email}</td><td className="p-5 text-gray-600">{s.phone}</td></tr>))}</tbody></table>{suppliers.length === 0 && <p className="p-8 text-center text-gray-400">No suppliers registered.</p>}</div></div>); }
 function SettingsView({ storeName, setStoreName }: any) { const [localName, setLocalName] = useState(storeName); const handleSave = () => { setStoreName(localName); localStorage.setItem("storeName", localName); alert("Settings Saved!"); }; return (<div className="p-10 max-w-xl mx-auto"><h2 className="text-2xl font-bold mb-6">System Settings</h2><div className="bg-white p-8 rounded-[20px] border border-gray-200 space-y-6 shadow-sm"><div><label className="block text-sm font-bold text-gray-700 mb-2">Store Name</label><input value={localName} onChange={e => setLocalName(e.target.value)} className="w-full border border-gray-200 p-3 rounded-lg bg-gray-50"/><p className="text-xs text-gray-400 mt-1">This name will appear on the sidebar.</p></div><div><label className="block text-sm font-bold text-gray-700 mb-2">Currency</label><select className="w-full border border-gray-200 p-3 rounded-lg bg-gray-50"><option>South African Rand (ZAR)</option><option>US Dollar ($)</option></select></div><button onClick={handleSave} className="w-full bg-gray-900 text-white p-4 rounded-xl font-bold flex items-center justify-center gap-2"><Save size={18}/> Save Changes</button></div></div>); }
-function AddProductView({ refresh, navigate }: any) { const [form, setForm] = useState({ sku: "", name: "", cost_price: 0, selling_price: 0, stock_quantity: 0, category: "General" }); const handleSubmit = async () => { const res = await fetch(`${API_BASE_URL}/products/`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(form) }); if (res.ok) { alert("Product Added!"); refresh(); navigate('dashboard'); } else alert("Error. SKU might already exist."); }; return (<div className="p-10 max-w-2xl mx-auto"><h2 className="text-3xl font-bold mb-8">Register New Product</h2><div className="bg-white p-8 rounded-2xl shadow-sm border border-gray-100 space-y-6"><div><label className="block text-sm font-bold text-gray-700 mb-2">Barcode / SKU</label><input placeholder="e.g. BAR-001" className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, sku: e.target.value})} /></div><div><label className="block text-sm font-bold text-gray-700 mb-2">Product Name</label><input placeholder="e.g. Nike Air Max" className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, name: e.target.value})} /></div><div className="grid grid-cols-2 gap-6"><div><label className="block text-sm font-bold text-gray-700 mb-2">Cost (R)</label><input type="number" className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, cost_price: parseFloat(e.target.value)})} /></div><div><label className="block text-sm font-bold text-gray-700 mb-2">Selling (R)</label><input type="number" className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, selling_price: parseFloat(e.target.value)})} /></div></div><div className="grid grid-cols-2 gap-6"><div><label className="block text-sm font-bold text-gray-700 mb-2">Stock</label><input type="number" className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, stock_quantity: parseInt(e.target.value)})} /></div><div><label className="block text-sm font-bold text-gray-700 mb-2">Category</label><input className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, category: e.target.value})} /></div></div><button onClick={handleSubmit} className="w-full bg-indigo-600 text-white p-4 rounded-xl font-bold hover:bg-indigo-700">Save to Database</button></div></div>); }
+function AddProductView({ refresh, navigate }: any) { const [form, setForm] = useState({ sku: "", name: "", cost_price: 0, selling_price: 0, stock_quantity: 0, category: "General" }); const handleSubmit = async () => { const res = await apiFetch(`/products/`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(form) }); if (res.ok) { alert("Product Added!"); refresh(); navigate('dashboard'); } else alert("Error. SKU might already exist."); }; return (<div className="p-10 max-w-2xl mx-auto"><h2 className="text-3xl font-bold mb-8">Register New Product</h2><div className="bg-white p-8 rounded-2xl shadow-sm border border-gray-100 space-y-6"><div><label className="block text-sm font-bold text-gray-700 mb-2">Barcode / SKU</label><input placeholder="e.g. BAR-001" className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, sku: e.target.value})} /></div><div><label className="block text-sm font-bold text-gray-700 mb-2">Product Name</label><input placeholder="e.g. Nike Air Max" className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, name: e.target.value})} /></div><div className="grid grid-cols-2 gap-6"><div><label className="block text-sm font-bold text-gray-700 mb-2">Cost (R)</label><input type="number" className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, cost_price: parseFloat(e.target.value)})} /></div><div><label className="block text-sm font-bold text-gray-700 mb-2">Selling (R)</label><input type="number" className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, selling_price: parseFloat(e.target.value)})} /></div></div><div className="grid grid-cols-2 gap-6"><div><label className="block text-sm font-bold text-gray-700 mb-2">Stock</label><input type="number" className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, stock_quantity: parseInt(e.target.value)})} /></div><div><label className="block text-sm font-bold text-gray-700 mb-2">Category</label><input className="w-full p-4 border border-gray-200 rounded-xl bg-gray-50" onChange={e => setForm({...form, category: e.target.value})} /></div></div><button onClick={handleSubmit} className="w-full bg-indigo-600 text-white p-4 rounded-xl font-bold hover:bg-indigo-700">Save to Database</button></div></div>); }
 function InventoryView({ products, refresh }: any) {
   const updateStock = async (sku: string, newQty: number) => {
-    await fetch(`${API_BASE_URL}/products/${sku}/stock`, {
+    await apiFetch(`/products/${sku}/stock`, {
       method: "PUT", headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ quantity: newQty })
     });
@@ -215,8 +322,8 @@ function InventoryView({ products, refresh }: any) {
               <tr key={p.sku} className="hover:bg-gray-50">
                 {/* IMAGE COLUMN */}
                 <td className="p-5">
-                  {p.images && p.images.length > 0 ? (
-                    <img src={p.images[0].image_url} alt={p.name} className="w-12 h-12 object-cover rounded-lg border border-gray-200" />
+                  {p.image_url ? (
+                    <img src={p.image_url} alt={p.name} className="w-12 h-12 object-cover rounded-lg border border-gray-200" />
                   ) : (
                     <div className="w-12 h-12 bg-gray-100 rounded-lg flex items-center justify-center text-gray-400">
                       <Package size={20} />
@@ -246,9 +353,9 @@ function InventoryView({ products, refresh }: any) {
       </div>
     </div>
   );
-}function ReportsView() { const [txns, setTxns] = useState<Transaction[]>([]); useEffect(() => { fetch(`${API_BASE_URL}/transactions/`).then(r => r.json()).then(setTxns); }, []); return (<div className="p-10"><h2 className="text-3xl font-bold mb-8">Sales Reports</h2><div className="grid grid-cols-1 md:grid-cols-3 gap-6 mb-8"><div className="bg-white p-6 rounded-[20px] border border-gray-200 shadow-sm"><p className="text-gray-500 text-sm font-bold">Total Revenue (Last 50)</p><p className="text-3xl font-bold text-indigo-600 mt-2">R {txns.reduce((sum, t) => sum + t.total_amount, 0).toFixed(2)}</p></div></div><div className="bg-white rounded-[20px] shadow-sm border border-gray-200 overflow-hidden"><table className="w-full text-left"><thead className="bg-gray-50 text-gray-500 text-sm"><tr><th className="p-5">Date</th><th className="p-5">ID</th><th className="p-5">Method</th><th className="p-5">Total</th></tr></thead><tbody className="divide-y divide-gray-100">{txns.map(t => (<tr key={t.id}><td className="p-5 text-gray-600">{new Date(t.timestamp).toLocaleDateString()}</td><td className="p-5 font-mono text-xs">#{t.id}</td><td className="p-5"><span className="bg-blue-50 text-blue-700 px-3 py-1 rounded-full text-xs font-bold">{t.payment_method}</span></td><td className="p-5 font-bold text-gray-900">R {t.total_amount.toFixed(2)}</td></tr>))}</tbody></table></div></div>); }
-function ChatView({ navigate }: { navigate: Function }) { const [input, setInput] = useState(""); const [messages, setMessages] = useState<ChatMessage[]>([{ sender: "nexus", text: "I am Nexus. How can I help?" }]); const messagesEndRef = useRef<HTMLDivElement>(null); const sendMessage = async () => { if (!input.trim()) return; const userMsg = input; setMessages(prev => [...prev, { sender: "user", text: userMsg }]); setInput(""); try { const res = await fetch(`${API_BASE_URL}/ai/chat`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ text: userMsg }) }); const data = await res.json(); setMessages(prev => [...prev, { sender: "nexus", text: data.text }]); if (data.action === "NAVIGATE_POS") navigate("pos"); if (data.action === "NAVIGATE_REPORTS") navigate("reports"); if (data.action === "NAVIGATE_ADD_PRODUCT") navigate("add-product"); } catch (err) { setMessages(prev => [...prev, { sender: "nexus", text: "Connection error." }]); } }; useEffect(() => { messagesEndRef.current?.scrollIntoView({ behavior: "smooth" }); }, [messages]); return (<div className="h-full flex flex-col bg-white"><div className="flex-1 overflow-y-auto p-8 space-y-6 bg-[#F9FAFB]">{messages.map((msg, i) => (<div key={i} className={`flex ${msg.sender === "user" ? "justify-end" : "justify-start"}`}><div className={`max-w-[70%] p-5 rounded-2xl text-sm shadow-sm ${msg.sender === "user" ? "bg-indigo-600 text-white rounded-br-none" : "bg-white text-gray-800 rounded-bl-none border border-gray-100"}`}>{msg.text}</div></div>))}<div ref={messagesEndRef} /></div><div className="p-6 bg-white border-t border-gray-100 flex gap-3 max-w-4xl mx-auto w-full"><input className="flex-1 bg-gray-50 border border-gray-200 rounded-xl px-6 py-4 outline-none focus:ring-2 focus:ring-indigo-500" placeholder="Ask Nexus..." value={input} onChange={(e) => setInput(e.target.value)} onKeyDown={(e) => e.key === "Enter" && sendMessage()} /><button onClick={sendMessage} className="bg-indigo-600 text-white p-4 rounded-xl shadow-lg"><Send size={20} /></button></div></div>); }
-function OnboardingWizard({ onComplete, setStoreName }: any) { const [step, setStep] = useState(1); const [loading, setLoading] = useState(false); const handleStoreSetup = () => { setStep(2); }; const handleExcelUpload = async () => { setLoading(true); setTimeout(async () => { try { await fetch(`${API_BASE_URL}/products/`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ sku: "IMP-001", name: "Imported Item (Excel)", cost_price: 50, selling_price: 100, stock_quantity: 500, category: "Bulk Import" }) }); } catch (e) { console.error("Simulated upload failed"); } setLoading(false); setStep(3); }, 2000); }; const handleIQSync = () => { setLoading(true); setTimeout(() => { setLoading(false); setStep(4); }, 2000); }; return (<div className="absolute inset-0 z-50 bg-black/60 backdrop-blur-sm flex items-center justify-center"><div className="bg-white w-[600px] rounded-3xl shadow-2xl overflow-hidden flex flex-col animate-in fade-in zoom-in duration-300"><div className="bg-indigo-600 p-8 text-white text-center"><div className="mx-auto w-12 h-12 bg-white/20 rounded-full flex items-center justify-center mb-4 font-bold text-xl">{step}/4</div><h2 className="text-2xl font-bold">Welcome to NexusRetail</h2><p className="text-indigo-100 mt-2">Let's get your store running in minutes.</p></div><div className="p-10 flex-1">{step === 1 && (<div className="space-y-6"><h3 className="text-xl font-bold text-gray-800">1. Store Setup</h3><div><label className="block text-sm font-bold text-gray-600 mb-2">Store Name</label><input placeholder="My Retail Store" className="w-full border p-3 rounded-xl" onChange={(e) => { setStoreName(e.target.value); localStorage.setItem("storeName", e.target.value); }} /></div><div><label className="block text-sm font-bold text-gray-600 mb-2">Currency</label><select className="w-full border p-3 rounded-xl"><option>ZAR (South Africa)</option><option>USD (United States)</option></select></div><button onClick={handleStoreSetup} className="w-full bg-indigo-600 text-white p-4 rounded-xl font-bold mt-4">Next Step</button></div>)}{step === 2 && (<div className="space-y-6 text-center"><h3 className="text-xl font-bold text-gray-800">2. Import Stock</h3><p className="text-gray-500">Upload your Excel spreadsheet to auto-populate inventory.</p><div className="border-2 border-dashed border-gray-300 rounded-2xl p-10 flex flex-col items-center justify-center bg-gray-50 hover:bg-indigo-50 hover:border-indigo-300 transition-colors cursor-pointer" onClick={handleExcelUpload}>{loading ? <div className="animate-spin rounded-full h-10 w-10 border-b-2 border-indigo-600"></div> : <><UploadCloud size={48} className="text-gray-400 mb-4"/><p className="font-bold text-gray-600">Click to Upload .XLSX</p></>}</div>{loading && <p className="text-xs text-indigo-600 font-bold">AI is categorizing products...</p>}</div>)}{step === 3 && (<div className="space-y-6 text-center"><h3 className="text-xl font-bold text-gray-800">3. Connect IQ Retail</h3><p className="text-gray-500">Sync with your existing legacy system.</p><div className="bg-blue-50 p-6 rounded-2xl border border-blue-100 flex items-center gap-4"><div className="bg-white p-3 rounded-lg shadow-sm font-bold text-blue-800">IQ</div><div className="flex-1 h-2 bg-gray-200 rounded-full overflow-hidden">{loading ? <div className="h-full bg-blue-500 animate-pulse w-full"></div> : <div className="h-full w-0"></div>}</div><div className="bg-white p-3 rounded-lg shadow-sm"><Sparkles className="text-indigo-600"/></div></div><button onClick={handleIQSync} disabled={loading} className="w-full bg-blue-600 text-white p-4 rounded-xl font-bold mt-4 flex items-center justify-center gap-2">{loading ? "Syncing..." : <><LinkIcon size={18}/> Connect API</>}</button></div>)}{step === 4 && (<div className="space-y-6 text-center"><div className="w-20 h-20 bg-green-100 rounded-full flex items-center justify-center mx-auto text-green-600 mb-6"><Check size={40} /></div><h3 className="text-2xl font-bold text-gray-800">Setup Complete!</h3><p className="text-gray-500">Your store is configured, stock is imported, and AI is active.</p><button onClick={onComplete} className="w-full bg-gray-900 text-white p-4 rounded-xl font-bold mt-6 hover:scale-105 transition-transform">Enter Dashboard</button></div>)}</div></div></div>); }
+}function ReportsView() { const [summary, setSummary] = useState<SalesSummary | null>(null); const [rows, setRows] = useState<RollupRow[]>([]); useEffect(() => { const start = new Date(Date.now() - 30 * 86400000).toISOString().slice(0, 10); apiFetch(`/reports/summary?start=${start}`).then(r => r.json()).then(setSummary); apiFetch(`/reports/sales?dimension=payment&granularity=day&start=${start}`).then(r => r.json()).then((data: RollupRow[]) => setRows(data.reverse())); }, []); return (<div className="p-10"><h2 className="text-3xl font-bold mb-8">Sales Reports</h2><div className="grid grid-cols-1 md:grid-cols-3 gap-6 mb-8"><div className="bg-white p-6 rounded-[20px] border border-gray-200 shadow-sm"><p className="text-gray-500 text-sm font-bold">Total Revenue (Last 30 Days)</p><p className="text-3xl font-bold text-indigo-600 mt-2">R {(summary?.revenue ?? 0).toFixed(2)}</p></div><div className="bg-white p-6 rounded-[20px] border border-gray-200 shadow-sm"><p className="text-gray-500 text-sm font-bold">Transactions</p><p className="text-3xl font-bold text-gray-900 mt-2">{summary?.transactions ?? 0}</p></div><div className="bg-white p-6 rounded-[20px] border border-gray-200 shadow-sm"><p className="text-gray-500 text-sm font-bold">Units Sold</p><p className="text-3xl font-bold text-gray-900 mt-2">{summary?.units ?? 0}</p></div></div><div className="bg-white rounded-[20px] shadow-sm border border-gray-200 overflow-hidden"><table className="w-full text-left"><thead className="bg-gray-50 text-gray-500 text-sm"><tr><th className="p-5">Date</th><th className="p-5">Method</th><th className="p-5">Transactions</th><th className="p-5">Revenue</th></tr></thead><tbody className="divide-y divide-gray-100">{rows.map(r => (<tr key={`${r.bucket}-${r.key}`}><td className="p-5 text-gray-600">{new Date(r.bucket).toLocaleDateString()}</td><td className="p-5"><span className="bg-blue-50 text-blue-700 px-3 py-1 rounded-full text-xs font-bold">{r.key}</span></td><td className="p-5 font-mono text-xs">{r.transactions}</td><td className="p-5 font-bold text-gray-900">R {r.revenue.toFixed(2)}</td></tr>))}</tbody></table></div></div>); }
+function ChatView({ navigate }: { navigate: Function }) { const [input, setInput] = useState(""); const [messages, setMessages] = useState<ChatMessage[]>([{ sender: "nexus", text: "I am Nexus. How can I help?" }]); const messagesEndRef = useRef<HTMLDivElement>(null); const sendMessage = async () => { if (!input.trim()) return; const userMsg = input; setMessages(prev => [...prev, { sender: "user", text: userMsg }]); setInput(""); try { const res = await apiFetch(`/ai/chat`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ text: userMsg }) }); const data = await res.json(); setMessages(prev => [...prev, { sender: "nexus", text: data.text }]); if (data.action === "NAVIGATE_POS") navigate("pos"); if (data.action === "NAVIGATE_REPORTS") navigate("reports"); if (data.action === "NAVIGATE_ADD_PRODUCT") navigate("add-product"); } catch (err) { setMessages(prev => [...prev, { sender: "nexus", text: "Connection error." }]); } }; useEffect(() => { messagesEndRef.current?.scrollIntoView({ behavior: "smooth" }); }, [messages]); return (<div className="h-full flex flex-col bg-white"><div className="flex-1 overflow-y-auto p-8 space-y-6 bg-[#F9FAFB]">{messages.map((msg, i) => (<div key={i} className={`flex ${msg.sender === "user" ? "justify-end" : "justify-start"}`}><div className={`max-w-[70%] p-5 rounded-2xl text-sm shadow-sm whitespace-pre-line ${msg.sender === "user" ? "bg-indigo-600 text-white rounded-br-none" : "bg-white text-gray-800 rounded-bl-none border border-gray-100"}`}>{msg.text}</div></div>))}<div ref={messagesEndRef} /></div><div className="p-6 bg-white border-t border-gray-100 flex gap-3 max-w-4xl mx-auto w-full"><input className="flex-1 bg-gray-50 border border-gray-200 rounded-xl px-6 py-4 outline-none focus:ring-2 focus:ring-indigo-500" placeholder="Ask Nexus..." value={input} onChange={(e) => setInput(e.target.value)} onKeyDown={(e) => e.key === "Enter" && sendMessage()} /><button onClick={sendMessage} className="bg-indigo-600 text-white p-4 rounded-xl shadow-lg"><Send size={20} /></button></div></div>); }
+function OnboardingWizard({ onComplete, setStoreName }: any) { const [step, setStep] = useState(1); const [loading, setLoading] = useState(false); const handleStoreSetup = () => { setStep(2); }; const handleExcelUpload = async () => { setLoading(true); setTimeout(async () => { try { await apiFetch(`/products/`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ sku: "IMP-001", name: "Imported Item (Excel)", cost_price: 50, selling_price: 100, stock_quantity: 500, category: "Bulk Import" }) }); } catch (e) { console.error("Simulated upload failed"); } setLoading(false); setStep(3); }, 2000); }; const handleIQSync = () => { setLoading(true); setTimeout(() => { setLoading(false); setStep(4); }, 2000); }; return (<div className="absolute inset-0 z-50 bg-black/60 backdrop-blur-sm flex items-center justify-center"><div className="bg-white w-[600px] rounded-3xl shadow-2xl overflow-hidden flex flex-col animate-in fade-in zoom-in duration-300"><div className="bg-indigo-600 p-8 text-white text-center"><div className="mx-auto w-12 h-12 bg-white/20 rounded-full flex items-center justify-center mb-4 font-bold text-xl">{step}/4</div><h2 className="text-2xl font-bold">Welcome to NexusRetail</h2><p className="text-indigo-100 mt-2">Let's get your store running in minutes.</p></div><div className="p-10 flex-1">{step === 1 && (<div className="space-y-6"><h3 className="text-xl font-bold text-gray-800">1. Store Setup</h3><div><label className="block text-sm font-bold text-gray-600 mb-2">Store Name</label><input placeholder="My Retail Store" className="w-full border p-3 rounded-xl" onChange={(e) => { setStoreName(e.target.value); localStorage.setItem("storeName", e.target.value); }} /></div><div><label className="block text-sm font-bold text-gray-600 mb-2">Currency</label><select className="w-full border p-3 rounded-xl"><option>ZAR (South Africa)</option><option>USD (United States)</option></select></div><button onClick={handleStoreSetup} className="w-full bg-indigo-600 text-white p-4 rounded-xl font-bold mt-4">Next Step</button></div>)}{step === 2 && (<div className="space-y-6 text-center"><h3 className="text-xl font-bold text-gray-800">2. Import Stock</h3><p className="text-gray-500">Upload your Excel spreadsheet to auto-populate inventory.</p><div className="border-2 border-dashed border-gray-300 rounded-2xl p-10 flex flex-col items-center justify-center bg-gray-50 hover:bg-indigo-50 hover:border-indigo-300 transition-colors cursor-pointer" onClick={handleExcelUpload}>{loading ? <div className="animate-spin rounded-full h-10 w-10 border-b-2 border-indigo-600"></div> : <><UploadCloud size={48} className="text-gray-400 mb-4"/><p className="font-bold text-gray-600">Click to Upload .XLSX</p></>}</div>{loading && <p className="text-xs text-indigo-600 font-bold">AI is categorizing products...</p>}</div>)}{step === 3 && (<div className="space-y-6 text-center"><h3 className="text-xl font-bold text-gray-800">3. Connect IQ Retail</h3><p className="text-gray-500">Sync with your existing legacy system.</p><div className="bg-blue-50 p-6 rounded-2xl border border-blue-100 flex items-center gap-4"><div className="bg-white p-3 rounded-lg shadow-sm font-bold text-blue-800">IQ</div><div className="flex-1 h-2 bg-gray-200 rounded-full overflow-hidden">{loading ? <div className="h-full bg-blue-500 animate-pulse w-full"></div> : <div className="h-full w-0"></div>}</div><div className="bg-white p-3 rounded-lg shadow-sm"><Sparkles className="text-indigo-600"/></div></div><button onClick={handleIQSync} disabled={loading} className="w-full bg-blue-600 text-white p-4 rounded-xl font-bold mt-4 flex items-center justify-center gap-2">{loading ? "Syncing..." : <><LinkIcon size={18}/> Connect API</>}</button></div>)}{step === 4 && (<div className="space-y-6 text-center"><div className="w-20 h-20 bg-green-100 rounded-full flex items-center justify-center mx-auto text-green-600 mb-6"><Check size={40} /></div><h3 className="text-2xl font-bold text-gray-800">Setup Complete!</h3><p className="text-gray-500">Your store is configured, stock is imported, and AI is active.</p><button onClick={onComplete} className="w-full bg-gray-900 text-white p-4 rounded-xl font-bold mt-6 hover:scale-105 transition-transform">Enter Dashboard</button></div>)}</div></div></div>); }
 
 // --- SIDEBAR ---
 function Sidebar({ activeTab, setActiveTab, storeName, user, logout }: any) {